@@ -0,0 +1,109 @@
+// Long-lived script host (JavaScript for Automation).
+//
+// Reads one JSON request per line from stdin: {"id": 1, "script": "/path/x.scpt", "args": ["..."]}
+// and writes one JSON reply per line to stdout: {"id": 1, "ok": true, "output": "..."}
+// or {"id": 1, "ok": false, "error": "..."}.
+//
+// Each script is loaded and compiled once and then invoked through its run handler with the
+// request args as argv, so repeated calls skip the osascript start-up and compile cost.
+// Requests are ASCII-only JSON (the client escapes non-ASCII), so stdin chunks can be split safely.
+
+ObjC.import("Foundation");
+
+const EVENT_CLASS_AEVT = 0x61657674; // 'aevt'
+const EVENT_ID_OAPP = 0x6f617070; // 'oapp' (run handler)
+const KEY_DIRECT_OBJECT = 0x2d2d2d2d; // '----'
+const TYPE_UNICODE_TEXT = 0x75747874; // 'utxt'
+
+function errorMessage(errorInfo) {
+    if (!errorInfo || errorInfo.isNil()) {
+        return "Unknown AppleScript error";
+    }
+    const message = errorInfo.objectForKey("NSAppleScriptErrorMessage");
+    return message && !message.isNil() ? message.js : "Unknown AppleScript error";
+}
+
+function loadScript(path, compiled) {
+    if (compiled[path]) {
+        return compiled[path];
+    }
+    const errorInfo = Ref();
+    const script = $.NSAppleScript.alloc.initWithContentsOfURLError($.NSURL.fileURLWithPath(path), errorInfo);
+    if (!script || script.isNil()) {
+        throw new Error("Could not load script " + path + ": " + errorMessage(errorInfo[0]));
+    }
+    if (!script.compileAndReturnError(errorInfo)) {
+        throw new Error("Could not compile script " + path + ": " + errorMessage(errorInfo[0]));
+    }
+    compiled[path] = script;
+    return script;
+}
+
+function runScript(request, compiled) {
+    const script = loadScript(request.script, compiled);
+
+    const argv = $.NSAppleEventDescriptor.listDescriptor;
+    (request.args || []).forEach(function (arg, i) {
+        argv.insertDescriptorAtIndex($.NSAppleEventDescriptor.descriptorWithString(String(arg)), i + 1);
+    });
+
+    const event = $.NSAppleEventDescriptor.appleEventWithEventClassEventIDTargetDescriptorReturnIDTransactionID(
+        EVENT_CLASS_AEVT,
+        EVENT_ID_OAPP,
+        $.NSAppleEventDescriptor.currentProcessDescriptor,
+        -1,
+        0
+    );
+    event.setParamDescriptorForKeyword(argv, KEY_DIRECT_OBJECT);
+
+    const errorInfo = Ref();
+    const result = script.executeAppleEventError(event, errorInfo);
+    if (!result || result.isNil()) {
+        throw new Error(errorMessage(errorInfo[0]));
+    }
+
+    let text = result.stringValue;
+    if (!text || text.isNil()) {
+        const coerced = result.coerceToDescriptorType(TYPE_UNICODE_TEXT);
+        text = coerced && !coerced.isNil() ? coerced.stringValue : null;
+    }
+    return text && !text.isNil() ? text.js : "";
+}
+
+function write(handle, text) {
+    handle.writeData($(text).dataUsingEncoding($.NSUTF8StringEncoding));
+}
+
+function run() {
+    const stdin = $.NSFileHandle.fileHandleWithStandardInput;
+    const stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+    const compiled = {};
+    let buffer = "";
+
+    while (true) {
+        const data = stdin.availableData;
+        if (data.length === 0) {
+            break; // EOF: the client closed the pipe
+        }
+        buffer += $.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding).js;
+
+        let newline;
+        while ((newline = buffer.indexOf("\n")) >= 0) {
+            const line = buffer.slice(0, newline);
+            buffer = buffer.slice(newline + 1);
+            if (!line.trim()) {
+                continue;
+            }
+
+            let reply;
+            let request = {};
+            try {
+                request = JSON.parse(line);
+                reply = { id: request.id, ok: true, output: runScript(request, compiled) };
+            } catch (e) {
+                reply = { id: request.id, ok: false, error: String(e.message || e) };
+            }
+            write(stdout, JSON.stringify(reply) + "\n");
+        }
+    }
+}
@@ -1,112 +1,174 @@
+import codecs
 import csv
 import os
+import sys
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable, Iterator, Mapping
 
 import llm
 from config import USER_DATA_DIR
-from outlook_client import OutlookClient
+from lead_scoring import PRODUCT_PRIORITY, LeadScorer, domain_reply_rates, select_top_leads
+from mail_backend import MailBackend
+from outlook_client import AppleScriptError
+from sent_index import SentRecipientIndex
+from suppression import SuppressionList
 
-GENERIC_PREFIXES = {"info", "news", "contact", "support", "admin"}
+# Candidates selected per draft of the daily limit; the extra ones stand in for failed drafts
+_RESERVE_FACTOR = 2
 
 
-def is_generic_email(email: str) -> bool:
-    """Returns True for generic email prefixes like info@, news@, etc."""
-    local_part = email.split("@")[0].lower()
-    return local_part in GENERIC_PREFIXES
+# Bytes read to pick the CSV encoding
+_ENCODING_SAMPLE_BYTES = 1 << 20
 
+# Encodings tried in order; latin-1 decodes any byte sequence, so it is the last resort
+_ENCODINGS = ("utf-8-sig", "cp1252", "latin-1")
 
-def load_csv_leads(csv_path: str) -> list[dict[str, Any]]:
+
+def detect_csv_encoding(csv_path: str) -> str:
     """
-    Parse a Salesforce CSV export of leads.
-    Handles encoding issues, filters rows with no email, splits multi-email rows,
-    and groups by email so one contact with multiple products gets a single entry.
+    Picks the encoding of a CSV export from its first megabyte: UTF-8 (with or without BOM),
+    else cp1252 (Excel/Salesforce on Windows), else latin-1, which decodes anything.
     """
-    rows = []
-    for encoding in ("utf-8", "latin-1", "cp1252"):
+    with open(csv_path, "rb") as f:
+        sample = f.read(_ENCODING_SAMPLE_BYTES)
+    for encoding in _ENCODINGS[:-1]:
         try:
-            with open(csv_path, newline="", encoding=encoding) as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
-            break
+            # final=False: a multi-byte character cut off at the end of the sample is not an error
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
         except UnicodeDecodeError:
             continue
+    return _ENCODINGS[-1]
+
+
+def iter_csv_leads(csv_path: str) -> Iterator[dict[str, Any]]:
+    """
+    Parse a Salesforce CSV export of leads, one row at a time.
+    Filters rows with no email, splits multi-email rows, and groups by email so one contact
+    with multiple products gets a single entry. Only the merged fields of each contact are
+    kept, never the rows; leads are yielded (in first-seen order) once the file is read, and
+    each is released from the loader as it is handed out.
+
+    The encoding is guessed from a sample (detect_csv_encoding). If a byte past the sample
+    does not decode, the file is read again with the next, more permissive encoding rather
+    than silently replacing characters.
+    """
+    encoding = detect_csv_encoding(csv_path)
+    fallbacks = _ENCODINGS[_ENCODINGS.index(encoding) + 1 :]
+    while True:
+        try:
+            email_map, rows = _merge_csv_rows(csv_path, encoding)
+            break
+        except UnicodeDecodeError as e:
+            # latin-1 decodes any byte, so there is always a next encoding to try
+            print(
+                f"  -> Warning: CSV does not decode as {encoding} past the sampled start ({e.reason}); "
+                f"re-reading it as {fallbacks[0]}."
+            )
+            encoding, fallbacks = fallbacks[0], fallbacks[1:]
 
-    if not rows:
+    if not email_map:
         print("  -> CSV is empty or could not be read.")
-        return []
+        return
+    print(f"  -> Parsed {len(email_map)} unique leads from {rows} CSV rows ({encoding}).")
 
-    # Expand multi-email rows and collect per-email entries
-    email_map: dict[str, dict[str, Any]] = {}
+    for email in list(email_map):
+        lead = email_map.pop(email)
+        lead["products"] = list(lead["products"])
+        lead["opportunities"] = list(lead["opportunities"])
+        lead["opportunity_ids"] = list(lead["opportunity_ids"])
+        lead["latest_interaction"] = "; ".join(lead["latest_interaction"])
+        yield lead
 
-    for row in rows:
-        raw_email = (row.get("eMail") or "").strip()
-        if not raw_email:
-            continue
 
-        emails = [e.strip() for e in raw_email.split(",") if e.strip()]
+def _merge_csv_rows(csv_path: str, encoding: str) -> tuple[dict[str, dict[str, Any]], int]:
+    """Reads the CSV into one merged entry per email address. Returns (email -> lead, row count)."""
+    email_map: dict[str, dict[str, Any]] = {}
+    rows = 0
 
-        for email in emails:
-            email_lower = email.lower()
-            product = (row.get("Technology Solution") or "").strip()
+    with open(csv_path, newline="", encoding=encoding) as f:
+        for row in csv.DictReader(f):
+            rows += 1
+            raw_email = (row.get("eMail") or "").strip()
+            if not raw_email:
+                continue
+
+            # Repeated values (product names, accounts) share one string across leads
+            product = sys.intern((row.get("Technology Solution") or "").strip())
             opportunity = (row.get("Opportunity Name") or "").strip()
             opportunity_id = (row.get("Opportunity ID") or "").strip()
-            account = (row.get("Account Name") or "").strip()
+            account = sys.intern((row.get("Account Name") or "").strip())
             contact = (row.get("Authorized Signatory") or "").strip()
             latest_interaction = (row.get("Pipeline Comments/Next Steps") or "").strip()
             description = (row.get("Description") or "").strip()
             account_description = (row.get("Account Description") or "").strip()
 
-            if email_lower in email_map:
-                # Append product if not already listed
-                existing = email_map[email_lower]
-                if product and product not in existing["products"]:
-                    existing["products"].append(product)
-                if opportunity and opportunity not in existing["opportunities"]:
-                    existing["opportunities"].append(opportunity)
-                if opportunity_id and opportunity_id not in existing["opportunity_ids"]:
-                    existing["opportunity_ids"].append(opportunity_id)
-                # Merge latest interaction
-                if latest_interaction and latest_interaction not in existing["latest_interaction"]:
-                    existing["latest_interaction"] += f"; {latest_interaction}" if existing["latest_interaction"] else latest_interaction
+            for email in raw_email.split(","):
+                email_lower = email.strip().lower()
+                if not email_lower:
+                    continue
+
+                existing = email_map.get(email_lower)
+                if existing is None:
+                    # Multi-valued fields are insertion-ordered dicts used as sets until the lead is yielded
+                    email_map[email_lower] = {
+                        "email": email_lower,
+                        "account_name": account,
+                        "contact_name": contact,
+                        "products": dict.fromkeys([product] if product else []),
+                        "opportunities": dict.fromkeys([opportunity] if opportunity else []),
+                        "opportunity_ids": dict.fromkeys([opportunity_id] if opportunity_id else []),
+                        "latest_interaction": dict.fromkeys([latest_interaction] if latest_interaction else []),
+                        "description": description,
+                        "account_description": account_description,
+                    }
+                    continue
+
+                if product:
+                    existing["products"][product] = None
+                if opportunity:
+                    existing["opportunities"][opportunity] = None
+                if opportunity_id:
+                    existing["opportunity_ids"][opportunity_id] = None
+                if latest_interaction:
+                    existing["latest_interaction"][latest_interaction] = None
                 # Keep longest description
                 if len(description) > len(existing["description"]):
                     existing["description"] = description
                 if len(account_description) > len(existing["account_description"]):
                     existing["account_description"] = account_description
-            else:
-                email_map[email_lower] = {
-                    "email": email_lower,
-                    "account_name": account,
-                    "contact_name": contact,
-                    "products": [product] if product else [],
-                    "opportunities": [opportunity] if opportunity else [],
-                    "opportunity_ids": [opportunity_id] if opportunity_id else [],
-                    "latest_interaction": latest_interaction,
-                    "description": description,
-                    "account_description": account_description,
-                }
-
-    leads = list(email_map.values())
-    print(f"  -> Parsed {len(leads)} unique leads from CSV.")
-    return leads
+
+    return email_map, rows
+
+
+def load_csv_leads(csv_path: str) -> list[dict[str, Any]]:
+    """All leads of a Salesforce CSV export; see iter_csv_leads."""
+    return list(iter_csv_leads(csv_path))
 
 
 def process_cold_outreach(
-    client: OutlookClient,
+    client: MailBackend,
     llm_service: llm.LLMService,
     cold_prompt: str,
     preferred_model: str | None,
     csv_path: str,
     daily_limit: int,
     salesforce_bcc: str,
+    sent_index: SentRecipientIndex | None = None,
+    suppression: SuppressionList | None = None,
+    scoring_weights: Mapping[str, float] | None = None,
+    reply_senders: Iterable[str] | None = None,
 ) -> None:
     """
     Main cold outreach orchestration:
-    1. Load CSV leads
-    2. Sort personal emails first, generic last
-    3. Check Sent Items for each lead
-    4. Generate outreach drafts for un-contacted leads up to daily_limit
+    1. Refresh sent recipients and suppression lists
+    2. Stream CSV leads through a LeadScorer with scoring_weights, keeping the best ones not
+       contacted or suppressed
+    3. Generate outreach drafts for them in rank order up to daily_limit
+
+    If the reply_rate weight is set and there is a sent index, domain reply rates are computed
+    from the refreshed index and reply_senders (the From fields of received mail, e.g.
+    MessageStore.senders()); see lead_scoring.domain_reply_rates.
     """
     print("\n--- Cold Outreach ---")
 
@@ -118,40 +180,78 @@ def process_cold_outreach(
         print(f"  -> CSV file not found: {csv_path}")
         return
 
-    # 1. Load leads
-    leads = load_csv_leads(csv_path)
-    if not leads:
+    # 1. Fetch all sent recipients in one batch call (much faster than per-lead).
+    # With a sent index only messages sent since the last run are listed, and leads are looked up
+    # in it on disk instead of loading every recipient into memory.
+    # If Sent Items can't be read, nobody can be ruled out as already contacted: skip the run.
+    print("  -> Fetching sent recipients from Outlook...")
+    sent_recipients: SentRecipientIndex | set[str]
+    try:
+        if sent_index is not None:
+            added = sent_index.refresh(client)
+            sent_recipients = sent_index
+            print(f"  -> Sent recipient index: {added} new, {len(sent_index)} unique sent recipients.")
+        else:
+            sent_recipients = client.get_sent_recipients()
+            print(f"  -> Found {len(sent_recipients)} unique sent recipients.")
+    except AppleScriptError as e:
+        print(f"  -> Could not read Sent Items ({e}); skipping cold outreach so no lead is contacted twice.")
         return
 
-    # 2. Sort: personal emails first, generic last
-    leads.sort(key=lambda lead: is_generic_email(lead["email"]))
+    if suppression is not None:
+        if suppression.sync():
+            print(f"  -> Suppression lists imported: {len(suppression)} addresses/domains.")
 
-    # 3. Fetch all sent recipients in one batch call (much faster than per-lead)
-    print("  -> Fetching sent recipients from Outlook...")
-    sent_recipients = client.get_sent_recipients()
-    print(f"  -> Found {len(sent_recipients)} unique sent recipients.")
+    # 2. Score leads as they stream from the CSV and keep the best eligible ones. Runners-up are
+    # kept so a lead whose draft fails is replaced by the next best.
+    already_contacted = 0
+    suppressed = 0
+    total_leads = 0
 
-    # 4. Check against sent recipients and collect un-contacted leads
+    def counted(leads: Iterator[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        nonlocal total_leads
+        for lead in leads:
+            total_leads += 1
+            yield lead
+
+    def eligible(lead: dict[str, Any]) -> bool:
+        nonlocal already_contacted, suppressed
+        # Indexed lookup, or in-memory set without a sent index
+        if lead["email"] in sent_recipients:
+            already_contacted += 1
+            return False
+        if suppression is not None and lead["email"] in suppression:
+            suppressed += 1
+            return False
+        return True
+
+    reply_rates = None
+    if scoring_weights and scoring_weights.get("reply_rate") and sent_index is not None and reply_senders is not None:
+        reply_rates = domain_reply_rates(sent_index.domain_counts(), reply_senders)
+    scorer = LeadScorer(weights=scoring_weights, reply_rates=reply_rates)
+    candidates = select_top_leads(counted(iter_csv_leads(csv_path)), daily_limit * _RESERVE_FACTOR, scorer, eligible)
+    if not candidates:
+        print("  -> No eligible leads.")
+        return
+
+    print(f"  -> Top {len(candidates)} eligible leads:")
+    for rank, ranked in enumerate(candidates, 1):
+        lead = ranked.lead
+        print(f"    #{rank} {lead['email']} ({lead['account_name']}) score {ranked.score:.2f}: {ranked.explain()}")
+
+    # 3. Generate outreach drafts in rank order up to daily_limit
     drafts_created = 0
-    already_contacted = 0
 
-    for lead in leads:
+    for ranked in candidates:
         if drafts_created >= daily_limit:
             print(f"  -> Daily limit of {daily_limit} drafts reached.")
             break
 
+        lead = ranked.lead
         email = lead["email"]
-        print(f"\n  Checking: {email} ({lead['account_name']})")
-
-        # Check if already emailed (fast in-memory set lookup)
-        if email in sent_recipients:
-            print(f"    -> Already contacted. Skipping.")
-            already_contacted += 1
-            continue
+        print(f"\n  Drafting: {email} ({lead['account_name']}, score {ranked.score:.2f})")
 
-        # 4. Generate outreach email via LLM
-        # Priority: Portal and Analytics first, then the rest
-        PRODUCT_PRIORITY = {"Sensr Portal": 0, "Sensr Analytics": 1}
+        # Generate outreach email via LLM; products in priority order
         sorted_products = sorted(lead["products"], key=lambda p: PRODUCT_PRIORITY.get(p, 99))
         products_str = ", ".join(sorted_products) if sorted_products else "Gen II Solutions"
         lead_context = (
@@ -208,7 +308,9 @@ def process_cold_outreach(
 
     # Summary
     print(f"\n--- Cold Outreach Summary ---")
-    print(f"  Total leads in CSV: {len(leads)}")
+    print(f"  Total leads in CSV: {total_leads}")
     print(f"  Already contacted: {already_contacted}")
+    if suppression is not None:
+        print(f"  Suppressed: {suppressed} ({suppression.false_positives} filter false positives)")
     print(f"  Drafts created: {drafts_created}")
     print(f"  Daily limit: {daily_limit}")
@@ -30,6 +30,14 @@ SYSTEM_PROMPT_EXAMPLE_PATH = os.path.join(RESOURCE_DIR, "system_prompt.example.t
 COLD_OUTREACH_PROMPT_PATH = os.path.join(USER_DATA_DIR, "cold_outreach_prompt.txt")
 COLD_OUTREACH_PROMPT_EXAMPLE_PATH = os.path.join(RESOURCE_DIR, "cold_outreach_prompt.example.txt")
 OUTPUT_DIR = os.path.join(USER_DATA_DIR, "output")
+CACHE_DIR = os.path.join(USER_DATA_DIR, "cache")
+MESSAGE_STORE_PATH = os.path.join(CACHE_DIR, "message_store.db")
+SENT_INDEX_PATH = os.path.join(CACHE_DIR, "sent_recipients.db")
+SUPPRESSION_DB_PATH = os.path.join(CACHE_DIR, "suppression.db")
+LLM_CACHE_PATH = os.path.join(CACHE_DIR, "llm_responses.db")
+MODEL_CATALOG_PATH = os.path.join(CACHE_DIR, "model_catalog.json")
+LLM_METRICS_PATH = os.path.join(OUTPUT_DIR, "llm_metrics.jsonl")
+
 
 def _ensure_config_file_exists(source_path: str, dest_path: str) -> None:
     """Copies a source file to a destination if the destination does not exist."""
@@ -98,10 +106,81 @@ SALESFORCE_BCC: str = _config_data.get("salesforce_bcc", "")
 # Preferred model for LLM generation (None means use first available)
 PREFERRED_MODEL: Optional[str] = _config_data.get("preferred_model", None)
 
+# Maximum number of LLM requests in flight at once, shared by every caller (summaries, SF notes,
+# batch chunks, and both LLM stages of the pipelined follow-up)
+LLM_MAX_CONCURRENCY: int = _config_data.get("llm_max_concurrency", 4)
+
+# How long discovered model lists are reused before providers are listed again
+MODEL_CATALOG_TTL_HOURS: float = _config_data.get("model_catalog_ttl_hours", 24)
+
+# Circuit breakers: consecutive failures before a model/provider is skipped, and for how long
+LLM_BREAKER_FAILURES: int = _config_data.get("llm_breaker_failures", 3)
+LLM_BREAKER_RESET_SECONDS: float = _config_data.get("llm_breaker_reset_seconds", 60)
+
+# Retries for rate-limited/transient LLM failures, and optional per-provider budgets, e.g.
+# {"openai": {"requests_per_minute": 500, "tokens_per_minute": 200000}}
+LLM_MAX_RETRIES: int = _config_data.get("llm_max_retries", 3)
+LLM_RATE_LIMITS: dict[str, dict[str, float]] = _config_data.get("llm_rate_limits", {})
+
+# Shared HTTP connection pool used by all LLM provider clients
+HTTP_MAX_CONNECTIONS: int = _config_data.get("http_max_connections", 20)
+HTTP_MAX_KEEPALIVE: int = _config_data.get("http_max_keepalive", 10)
+HTTP_TIMEOUT_SECONDS: float = _config_data.get("http_timeout_seconds", 600)
+
+# On-disk LLM response cache
+LLM_CACHE_ENABLED: bool = _config_data.get("llm_cache_enabled", True)
+LLM_CACHE_TTL_HOURS: float = _config_data.get("llm_cache_ttl_hours", 168)
+LLM_CACHE_MAX_MB: float = _config_data.get("llm_cache_max_mb", 100)
+
+# Per-call LLM metrics and token estimation ('auto', 'tiktoken' or 'chars')
+LLM_METRICS_ENABLED: bool = _config_data.get("llm_metrics_enabled", True)
+TOKEN_ESTIMATOR: str = _config_data.get("token_estimator", "auto")
+
+# Keep one script host process alive instead of running osascript per call (macOS only)
+SCRIPT_WORKER_ENABLED: bool = _config_data.get("script_worker_enabled", True)
+
+# Drop quoted reply history that repeats earlier messages before summarising threads
+STRIP_QUOTED_HISTORY: bool = _config_data.get("strip_quoted_history", True)
+
+# Ask for the thread summary and SF Note in one JSON request (falls back to two requests)
+COMBINED_SUMMARY_REQUEST: bool = _config_data.get("combined_summary_request", True)
+
+# Footers, disclaimers and signatures removed from message bodies before LLM calls.
+# "end" may be omitted to remove only the "start" phrase itself.
+EMAIL_FOOTERS: list[dict[str, str]] = _config_data.get(
+    "email_footers",
+    [
+        {
+            "start": "NOTICE: Unless otherwise stated",
+            "end": "which can be found here.",
+        }
+    ],
+)
+
+# Incremental sync of flagged threads via the local message store
+INCREMENTAL_SYNC: bool = _config_data.get("incremental_sync", True)
+
+# Run follow-up as overlapping stages (scrape -> filter -> generate -> draft -> summarize) joined by
+# bounded queues of pipeline_queue_size; False runs each phase to completion before the next.
+# Scraping itself does not overlap: the Outlook export (and an incremental sync) completes before
+# the first thread moves on, so the overlap is between generation, drafting and summaries.
+PIPELINED_FOLLOW_UP: bool = _config_data.get("pipelined_follow_up", True)
+PIPELINE_QUEUE_SIZE: int = _config_data.get("pipeline_queue_size", 32)
+
 # Cold Outreach
 COLD_OUTREACH_ENABLED: bool = _config_data.get("cold_outreach_enabled", False)
 COLD_OUTREACH_DAILY_LIMIT: int = _config_data.get("cold_outreach_daily_limit", 10)
 COLD_OUTREACH_CSV_PATH: str = _config_data.get("cold_outreach_csv_path", "")
+# Lead ranking signal weights, merged over lead_scoring.DEFAULT_WEIGHTS (0 disables a signal)
+COLD_OUTREACH_SCORING_WEIGHTS: dict[str, float] = _config_data.get("cold_outreach_scoring_weights", {})
+
+# Keep Sent Items recipients in a local index and only list messages sent since the last run
+SENT_INDEX_ENABLED: bool = _config_data.get("sent_index_enabled", True)
+
+# Do-not-contact list files (bounces, unsubscribes, competitors) checked before every cold outreach
+# draft, through a memory-mapped Bloom filter backed by an exact SQLite copy
+SUPPRESSION_LISTS: list[str] = _config_data.get("suppression_lists", [])
+SUPPRESSION_FALSE_POSITIVE_RATE: float = _config_data.get("suppression_false_positive_rate", 0.001)
 
 # Parsing Delimiters
 MSG_DELIMITER: str = "\n///END_OF_MESSAGE///\n"
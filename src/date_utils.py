@@ -1,5 +1,6 @@
 import re
 from datetime import datetime
+from functools import lru_cache
 
 try:
     from dateutil import parser
@@ -7,49 +8,146 @@ except ImportError:
     import dateutil.parser as parser
 
 
+_MONTHS = {
+    name: i
+    for i, names in enumerate(
+        [
+            ("january", "jan"),
+            ("february", "feb"),
+            ("march", "mar"),
+            ("april", "apr"),
+            ("may",),
+            ("june", "jun"),
+            ("july", "jul"),
+            ("august", "aug"),
+            ("september", "sep", "sept"),
+            ("october", "oct"),
+            ("november", "nov"),
+            ("december", "dec"),
+        ],
+        start=1,
+    )
+    for name in names
+}
+
+# Fast path for the formats Outlook/macOS actually emit, with an optional leading weekday:
+#   "Thursday, December 18, 2025 at 12:45:49 PM", "Dec 18, 2025, at 12:45 PM", "Dec 18, 2025, 12:00 PM"
+_FAST_DATE = re.compile(
+    r"(?:[A-Za-z]+,\s+)?(?P<month>[A-Za-z]+)\.?\s+(?P<day>\d{1,2}),\s+(?P<year>\d{4}),?\s+(?:at\s+)?"
+    r"(?P<hour>\d{1,2}):(?P<minute>\d{2})(?::(?P<second>\d{2}))?\s*(?P<ampm>[AaPp]\.?[Mm]\.?)?",
+)
+
+# Outlook verbose format: "Thursday, December 18, 2025 at 12:45:49 PM"
+_VERBOSE = r"[A-Za-z]+,\s+[A-Za-z]+\s+\d+,\s+\d+\s+at\s+\d+:\d+:\d+\s+[APM]+"
+_VERBOSE_DATE = re.compile(_VERBOSE, re.IGNORECASE)
+
+# All header-date patterns in one pass (one alternative matches per position):
+#   line:    any line starting with "Date:" (whole remainder of the line)
+#   verbose: "Date: <verbose format>" anywhere, e.g. in quoted "> Date: ..." lines
+#   on:      standard reply header, e.g. "On Dec 18, 2025, at 12:45 PM"
+_DATE_SCANNER = re.compile(
+    r"^Date:\s+(?P<line>.*)$"
+    rf"|Date:\s+(?P<verbose>{_VERBOSE})"
+    r"|On\s+(?P<on>[A-Za-z]+\s+\d+,\s+\d+,\s+at\s+\d+:\d+\s+[APM]+)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def _parse_fast(clean_str: str) -> datetime | None:
+    """Parses the known Outlook formats without dateutil. Returns None if the string is not one of them."""
+    m = _FAST_DATE.fullmatch(clean_str)
+    if not m:
+        return None
+    month = _MONTHS.get(m.group("month").lower())
+    if month is None:
+        return None
+
+    hour = int(m.group("hour"))
+    ampm = m.group("ampm")
+    if ampm:
+        if hour > 12:
+            return None
+        is_pm = ampm[0] in "Pp"
+        hour = hour % 12 + (12 if is_pm else 0)
+
+    try:
+        return datetime(
+            int(m.group("year")), month, int(m.group("day")), hour, int(m.group("minute")), int(m.group("second") or 0)
+        )
+    except ValueError:
+        return None
+
+
+# Distinct normalized date strings remembered by parse_date_string. Quoted reply chains repeat the
+# same headers in every message of a thread, so most lookups in a run are repeats.
+DATE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_normalized(clean_str: str) -> datetime:
+    fast = _parse_fast(clean_str)
+    if fast is not None:
+        return fast
+
+    try:
+        return parser.parse(clean_str)
+    except Exception:
+        return datetime.min
+
+
 def parse_date_string(date_str: str | None) -> datetime:
     """
     Parses a single date string with cleaning for common Outlook/macOS oddities.
+    Known Outlook formats are parsed directly; anything else goes through dateutil.
+    Results are memoized per normalized string (bounded LRU, see date_cache_stats()).
     Returns datetime object or datetime.min on failure.
     """
     if not date_str:
         return datetime.min
 
-    # Clean narrow non-breaking spaces
-    clean_str = date_str.replace("\u202f", " ").strip()
+    # Clean narrow non-breaking spaces and collapse runs of whitespace
+    clean_str = " ".join(date_str.replace("\u202f", " ").split())
+    return _parse_normalized(clean_str)
 
-    try:
-        return parser.parse(clean_str)
-    except Exception:
-        return datetime.min
+
+def date_cache_stats() -> dict[str, int | float]:
+    """Returns hit/miss counters of the parse_date_string cache for this process."""
+    info = _parse_normalized.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize or 0,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+    }
+
+
+def clear_date_cache() -> None:
+    _parse_normalized.cache_clear()
 
 
 def extract_dates_from_text(text: str) -> list[datetime]:
     """
     Finds all date-like strings in the text, especially those following 'Date:' or 'On ...'.
+    Scans the text once with a precompiled pattern.
     Returns a list of datetime objects.
     """
     dates: list[datetime] = []
 
-    # Pattern 1: Outlook verbose format: "Date: Thursday, December 18, 2025 at 12:45:49 PM"
-    pattern1 = re.compile(r"Date:\s+([A-Za-z]+,\s+[A-Za-z]+\s+\d+,\s+\d+\s+at\s+\d+:\d+:\d+\s+[APM]+)", re.IGNORECASE)
-
-    # Pattern 2: Standard Outlook reply header: "On Dec 18, 2025, at 12:45 PM"
-    pattern2 = re.compile(r"On\s+([A-Za-z]+\s+\d+,\s+\d+,\s+at\s+\d+:\d+\s+[APM]+)", re.IGNORECASE)
-
-    # Pattern 3: Generic Date: line
-    pattern4 = re.compile(r"^Date:\s+(.*)$", re.MULTILINE | re.IGNORECASE)
+    for match in _DATE_SCANNER.finditer(text):
+        line = match.group("line")
+        if line is None:
+            dates.append(parse_date_string(match.group("verbose") or match.group("on")))
+            continue
 
-    # Try specific patterns first
-    for match in pattern1.finditer(text):
-        dates.append(parse_date_string(match.group(1)))
-
-    for match in pattern2.finditer(text):
-        dates.append(parse_date_string(match.group(1)))
-
-    # Also check every line that starts with Date:
-    for match in pattern4.finditer(text):
-        dates.append(parse_date_string(match.group(1)))
+        # A "Date:" line may carry trailing text after a verbose date; fall back to the verbose pattern
+        parsed = parse_date_string(line)
+        if parsed == datetime.min:
+            inner = _VERBOSE_DATE.search(line)
+            if inner:
+                parsed = parse_date_string(inner.group(0))
+        dates.append(parsed)
 
     # Filter out min dates
     return [d for d in dates if d != datetime.min]
@@ -65,6 +163,38 @@ def get_latest_date(text: str) -> datetime | None:
     return max(dates)
 
 
+# Dates typed into Salesforce notes: "3/12/25", "03/12/2025" (US month first) or "2025-03-12"
+_NOTE_DATE = re.compile(
+    r"\b(?:(?P<month>\d{1,2})/(?P<day>\d{1,2})/(?P<year>\d{4}|\d{2})"
+    r"|(?P<iso_year>\d{4})-(?P<iso_month>\d{2})-(?P<iso_day>\d{2}))\b"
+)
+
+
+def get_latest_note_date(text: str, not_after: datetime | None = None) -> datetime | None:
+    """
+    Returns the latest date written in free-text notes (e.g. Salesforce next steps such as
+    "3/12/25 sent pricing; 4/2/25 demo"), or None if none found.
+    Dates after not_after, if given, are ignored (e.g. planned follow-ups such as "follow up 12/1/27").
+    """
+    latest = None
+    for m in _NOTE_DATE.finditer(text):
+        if m.group("iso_year"):
+            year, month, day = int(m.group("iso_year")), int(m.group("iso_month")), int(m.group("iso_day"))
+        else:
+            year, month, day = int(m.group("year")), int(m.group("month")), int(m.group("day"))
+            if year < 100:
+                year += 2000
+        try:
+            found = datetime(year, month, day)
+        except ValueError:
+            continue
+        if not_after is not None and found > not_after:
+            continue
+        if latest is None or found > latest:
+            latest = found
+    return latest
+
+
 def get_current_date_context() -> str:
     """
     Returns a formatted string with the current date and time for the system prompt.
@@ -25,11 +25,13 @@ from config import (
     ENV_OPENAI_API_KEY,
     ENV_OPENROUTER_API_KEY,
     ENV_PATH,
+    MODEL_CATALOG_TTL_HOURS,
     SALESFORCE_BCC,
     SYSTEM_PROMPT_PATH,
     CredentialManager,
 )
 from date_utils import get_current_date_context
+from model_catalog import ModelCatalog
 
 # --- Configuration & Constants ---
 ctk.set_appearance_mode("System")
@@ -236,7 +238,9 @@ class OutlookBotGUI(ctk.CTk):
         self.combo_model.grid(row=7, column=1, padx=10, pady=10, sticky="ew")
 
         # Refresh Models Button
-        self.btn_refresh_models = ctk.CTkButton(tab, text="Refresh Models", command=self.refresh_models_list)
+        self.btn_refresh_models = ctk.CTkButton(
+            tab, text="Refresh Models", command=lambda: self.refresh_models_list(force_refresh=True)
+        )
         self.btn_refresh_models.grid(row=7, column=2, padx=10, pady=10, sticky="nw")
 
         # Store available models list for dropdown (list of dicts from llm service: {'id':..., 'provider':...})
@@ -600,7 +604,7 @@ class OutlookBotGUI(ctk.CTk):
             self.log("\n[Stopped]\n")
             self.process_finished()
 
-    def refresh_models_list(self, use_initial_pref=False):
+    def refresh_models_list(self, use_initial_pref=False, force_refresh=False):
         self.log("[Info] Detecting available models...\n")
         try:
             # Explicitly set ENV from UI before detecting.
@@ -608,7 +612,10 @@ class OutlookBotGUI(ctk.CTk):
             os.environ[ENV_OPENAI_API_KEY] = self.entry_openai_key.get().strip()
             os.environ[ENV_OPENROUTER_API_KEY] = self.entry_or_key.get().strip()
 
-            service = llm.LLMService()
+            # Reuse the persisted model catalog unless the user explicitly asked for a refresh
+            service = llm.LLMService(catalog=ModelCatalog(ttl_seconds=MODEL_CATALOG_TTL_HOURS * 3600))
+            if force_refresh:
+                service.refresh_models()
             # ACCESS RAW DATA instead of list strings, so we know provider
             models_data = service.available_models  # list of {'id':..., 'provider':...}
 
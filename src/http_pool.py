@@ -0,0 +1,123 @@
+"""
+Process-wide pooled HTTP clients for the LLM provider SDKs.
+
+Every OpenAI/OpenRouter/Gemini client built with its own httpx.Client opens fresh connections,
+so each LLMService (the GUI builds throwaway ones for model listing and connection tests) paid
+new TLS handshakes through the corporate proxy. get_http_client hands out one shared client per
+SSL verify setting, with keep-alive, bounded connections and HTTP/2 when the optional h2
+package is installed. get_async_http_client does the same for the async SDK clients, per
+event loop; close_async_http_clients releases a loop's pool before the loop ends.
+"""
+
+import asyncio
+import atexit
+import os
+import ssl
+import threading
+import weakref
+from typing import Any, Union
+
+import httpx
+
+from config import HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_TIMEOUT_SECONDS
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+VerifyOption = Union[ssl.SSLContext, str, bool]
+
+_clients: dict[object, httpx.Client] = {}
+# Async connections belong to the event loop that opened them, so async clients are pooled per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[object, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_lock = threading.Lock()
+
+
+def _normalize(verify: VerifyOption) -> VerifyOption:
+    # A CA bundle path that does not exist falls back to default verification, as the SDKs did
+    if isinstance(verify, str):
+        return verify if os.path.exists(verify) else True
+    return verify
+
+
+def _pool_key(verify: VerifyOption) -> object:
+    if isinstance(verify, ssl.SSLContext):
+        # get_ssl_verify_option builds a new context per call; all non-verifying ones are equivalent.
+        # Other contexts can't be compared by value and pool per object (kept alive by the client).
+        if verify.verify_mode == ssl.CERT_NONE and not verify.check_hostname:
+            return ("unverified",)
+        return ("context", id(verify))
+    return ("verify", verify)
+
+
+def _client_options(verify: VerifyOption) -> dict[str, Any]:
+    return {
+        "verify": ssl.create_default_context(cafile=verify) if isinstance(verify, str) else verify,
+        "http2": HTTP2_AVAILABLE,
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=60.0,
+        ),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=10.0),
+        "follow_redirects": True,
+    }
+
+
+def get_http_client(verify: VerifyOption = True) -> httpx.Client:
+    """
+    Returns the shared client for a verify option (SSLContext, CA bundle path or bool).
+
+    The client must not be closed by callers (in particular, do not use SDK clients built on it
+    as context managers); close_http_clients() runs at exit.
+    """
+    verify = _normalize(verify)
+    key = _pool_key(verify)
+    with _lock:
+        client = _clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.Client(**_client_options(verify))
+            _clients[key] = client
+        return client
+
+
+def get_async_http_client(verify: VerifyOption = True) -> httpx.AsyncClient:
+    """
+    Async counterpart of get_http_client, shared within the running event loop. Must be called
+    from a coroutine; the pool is dropped together with its loop.
+    """
+    loop = asyncio.get_running_loop()
+    verify = _normalize(verify)
+    key = _pool_key(verify)
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(**_client_options(verify))
+            clients[key] = client
+        return client
+
+
+async def close_async_http_clients() -> None:
+    """Closes the running event loop's pooled async clients; later calls get fresh ones."""
+    with _lock:
+        clients = list(_async_clients.pop(asyncio.get_running_loop(), {}).values())
+    for client in clients:
+        await client.aclose()
+
+
+def close_http_clients() -> None:
+    """Closes all pooled clients (their connections); later calls get fresh ones."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+atexit.register(close_http_clients)
@@ -0,0 +1,200 @@
+"""
+Lead prioritization for cold outreach.
+
+Cold outreach used to take leads in CSV order with generic addresses (info@, news@...) last
+and stop at the daily limit, so which leads got the day's drafts was mostly an accident of
+the export. LeadScorer rates every lead on weighted signals (product priority, how recent the
+latest interaction is, opportunity count, kind of address and, opt-in, a domain reply rate) and
+select_top_leads keeps the best k in a heap during one pass over the lead stream. Each score
+keeps its per-signal breakdown, so the run log can show why a lead was picked.
+
+More signals can be plugged in with LeadScorer.add_signal; a signal returns a value between
+0 and 1 and a short reason.
+"""
+
+import heapq
+import re
+from datetime import datetime
+from typing import Any, Callable, Iterable, Mapping, Optional
+
+from date_utils import get_latest_note_date
+
+# Signal function: lead -> (value between 0 and 1, reason shown in the run log)
+Signal = Callable[[dict[str, Any]], tuple[float, str]]
+
+GENERIC_PREFIXES = {"info", "news", "contact", "support", "admin"}
+
+# Personal mailboxes: reachable, but not a company contact
+WEBMAIL_DOMAINS = {"gmail.com", "yahoo.com", "hotmail.com", "outlook.com", "icloud.com", "aol.com", "me.com"}
+
+# Portal and Analytics first, then the rest
+PRODUCT_PRIORITY = {"Sensr Portal": 0, "Sensr Analytics": 1}
+
+# Weight of each built-in signal; cold_outreach_scoring_weights overrides them (0 disables one).
+# reply_rate is off by default: see domain_reply_rates for what it can and cannot measure.
+DEFAULT_WEIGHTS = {"product": 3.0, "recency": 2.0, "opportunities": 1.0, "domain": 2.0, "reply_rate": 0.0}
+
+# An interaction this many days old counts half as much as one from today
+RECENCY_HALF_LIFE_DAYS = 90
+
+# Opportunity count at which the opportunities signal is maxed out
+OPPORTUNITIES_CAP = 5
+
+_ADDRESS = re.compile(r"[\w.+'-]+@([\w-]+(?:\.[\w-]+)+)")
+
+
+def is_generic_email(email: str) -> bool:
+    """Returns True for generic email prefixes like info@, news@, etc."""
+    local_part = email.split("@")[0].lower()
+    return local_part in GENERIC_PREFIXES
+
+
+def email_domain(email: str) -> str:
+    return email.rsplit("@", 1)[-1].lower()
+
+
+def domain_reply_rates(sent_counts: Mapping[str, int], senders: Iterable[str]) -> dict[str, float]:
+    """
+    Share of contacted addresses per domain that appear among senders, smoothed towards 0.5
+    (add-one), from Sent Items recipient counts and a list of From fields.
+
+    The only local record of received mail is the message store, which holds the currently
+    flagged conversations and nothing else. With those senders this is "share of contacts at the
+    domain with a flagged thread", not a reply rate: a domain emailed often without a flagged
+    thread scores below an unknown one. Hence the signal is opt-in (weight 0 by default).
+    """
+    repliers: dict[str, set[str]] = {}
+    for sender in senders:
+        for match in _ADDRESS.finditer(sender or ""):
+            domain = match.group(1).lower()
+            if domain in sent_counts:
+                repliers.setdefault(domain, set()).add(match.group(0).lower())
+    return {domain: (min(len(repliers.get(domain, ())), sent) + 1) / (sent + 2) for domain, sent in sent_counts.items()}
+
+
+class ScoredLead:
+    """A lead with its total score and per-signal breakdown."""
+
+    def __init__(self, lead: dict[str, Any], score: float, contributions: list[tuple[str, float, str]]) -> None:
+        self.lead = lead
+        self.score = score
+        self.contributions = contributions
+
+    def explain(self) -> str:
+        """E.g. "product +3.00 (Sensr Portal), recency +1.10 (42 days ago), ..."."""
+        return ", ".join(f"{name} +{points:.2f} ({reason})" for name, points, reason in self.contributions)
+
+
+class LeadScorer:
+    """
+    Weighted sum of lead signals.
+
+    Args:
+        weights: Overrides of DEFAULT_WEIGHTS; a weight of 0 drops that signal
+        reply_rates: Rate per domain from domain_reply_rates; None disables the signal
+        now: Reference time for recency (defaults to the time of construction)
+    """
+
+    def __init__(
+        self,
+        weights: Optional[Mapping[str, float]] = None,
+        reply_rates: Optional[Mapping[str, float]] = None,
+        now: Optional[datetime] = None,
+    ) -> None:
+        self.now = now or datetime.now()
+        self.reply_rates = reply_rates
+        self.signals: list[tuple[str, float, Signal]] = []
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        builtin: dict[str, Signal] = {
+            "product": self._product,
+            "recency": self._recency,
+            "opportunities": self._opportunities,
+            "domain": self._domain,
+        }
+        if reply_rates is not None:
+            builtin["reply_rate"] = self._reply_rate
+        for name, signal in builtin.items():
+            self.add_signal(name, signal, weights.get(name, 0.0))
+
+    def add_signal(self, name: str, signal: Signal, weight: float = 1.0) -> "LeadScorer":
+        """Adds a signal to the sum; signals with a weight of 0 are ignored."""
+        if weight:
+            self.signals.append((name, weight, signal))
+        return self
+
+    def score(self, lead: dict[str, Any]) -> ScoredLead:
+        contributions = []
+        total = 0.0
+        for name, weight, signal in self.signals:
+            value, reason = signal(lead)
+            points = weight * value
+            total += points
+            contributions.append((name, points, reason))
+        return ScoredLead(lead, total, contributions)
+
+    @staticmethod
+    def _product(lead: dict[str, Any]) -> tuple[float, str]:
+        products = lead.get("products") or []
+        if not products:
+            return 0.0, "no product"
+        best = min(products, key=lambda p: PRODUCT_PRIORITY.get(p, len(PRODUCT_PRIORITY)))
+        rank = PRODUCT_PRIORITY.get(best)
+        return (1.0 / (rank + 1) if rank is not None else 0.25), best
+
+    def _recency(self, lead: dict[str, Any]) -> tuple[float, str]:
+        # The notes mix past interactions with planned follow-up dates; only the past counts
+        latest = get_latest_note_date(lead.get("latest_interaction") or "", not_after=self.now)
+        if latest is None:
+            return 0.0, "no dated interaction"
+        days = (self.now - latest).days
+        return 0.5 ** (days / RECENCY_HALF_LIFE_DAYS), f"{days} days ago"
+
+    @staticmethod
+    def _opportunities(lead: dict[str, Any]) -> tuple[float, str]:
+        count = max(len(lead.get("opportunity_ids") or []), len(lead.get("opportunities") or []))
+        return min(count, OPPORTUNITIES_CAP) / OPPORTUNITIES_CAP, f"{count} opportunities"
+
+    @staticmethod
+    def _domain(lead: dict[str, Any]) -> tuple[float, str]:
+        email = lead["email"]
+        if is_generic_email(email):
+            return 0.0, "generic address"
+        if email_domain(email) in WEBMAIL_DOMAINS:
+            return 0.5, "webmail address"
+        return 1.0, "company address"
+
+    def _reply_rate(self, lead: dict[str, Any]) -> tuple[float, str]:
+        assert self.reply_rates is not None
+        rate = self.reply_rates.get(email_domain(lead["email"]))
+        if rate is None:
+            return 0.5, "domain not contacted before"
+        return rate, f"domain reply rate {rate:.0%}"
+
+
+def select_top_leads(
+    leads: Iterable[dict[str, Any]],
+    k: int,
+    scorer: LeadScorer,
+    eligible: Optional[Callable[[dict[str, Any]], bool]] = None,
+) -> list[ScoredLead]:
+    """
+    Best k eligible leads, highest score first (ties keep stream order), in one pass with a
+    k-sized heap. eligible (e.g. not contacted yet) is only asked about leads that would make
+    the current top k, so expensive checks are skipped for most of a large stream.
+    """
+    if k <= 0:
+        return []
+    # Min-heap of (score, -position, scored): the root is the weakest lead kept so far
+    heap: list[tuple[float, int, ScoredLead]] = []
+    for position, lead in enumerate(leads):
+        scored = scorer.score(lead)
+        rank = (scored.score, -position)
+        if len(heap) >= k and rank <= heap[0][:2]:
+            continue
+        if eligible is not None and not eligible(lead):
+            continue
+        if len(heap) < k:
+            heapq.heappush(heap, (*rank, scored))
+        else:
+            heapq.heapreplace(heap, (*rank, scored))
+    return [scored for *_, scored in sorted(heap, key=lambda entry: entry[:2], reverse=True)]
@@ -1,17 +1,26 @@
 import json
-import os
 import re
-import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
 from google import genai
 from google.genai import types
 from openai import OpenAI
 
-from config import CredentialManager
+from config import LLM_MAX_CONCURRENCY, CredentialManager
+from http_pool import get_http_client
+from llm_cache import ResponseCache
+from llm_health import HealthTracker
+from llm_metrics import CharRatioEstimator, MetricsRecorder
+from llm_retry import RateLimiter, is_retryable, status_code
+from model_catalog import ModelCatalog, key_fingerprint
 from ssl_utils import get_ssl_verify_option, setup_ssl_environment
 
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
 # Model exclusion keywords for filtering out non-text/specialized models
 EXCLUDED_MODEL_KEYWORDS = [
     "image",
@@ -60,8 +69,259 @@ def _extract_json(text: str) -> Any:
     return json.loads(clean_text)
 
 
+# Batch sizing: fraction of a model's context window a sub-batch prompt may use,
+# the window assumed when a provider doesn't report one, reserved output per email, and an item cap.
+BATCH_CONTEXT_FRACTION = 0.5
+DEFAULT_CONTEXT_TOKENS = 32_000
+BATCH_REPLY_TOKENS_PER_EMAIL = 400
+BATCH_MAX_ITEMS = 15
+
+
+def _model_entry(model_id: str, provider: str, context_window: Any = None) -> Dict[str, Any]:
+    """Builds an available_models entry, recording the context window when the provider reports one."""
+    entry: Dict[str, Any] = {"id": model_id, "provider": provider}
+    if isinstance(context_window, int) and context_window > 0:
+        entry["context_window"] = context_window
+    return entry
+
+
+def _chunk_batch(
+    email_batch: List[Dict[str, Any]],
+    budget_tokens: int,
+    max_items: int,
+    count_tokens: Callable[[str], int] = CharRatioEstimator().count,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Greedily packs emails into sub-batches whose estimated prompt + reply tokens fit the budget.
+    An email larger than the budget on its own still gets a sub-batch of one.
+    """
+    chunks: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    used = 0
+    for item in email_batch:
+        cost = count_tokens(json.dumps(item, indent=2)) + BATCH_REPLY_TOKENS_PER_EMAIL
+        if current and (used + cost > budget_tokens or len(current) >= max_items):
+            chunks.append(current)
+            current = []
+            used = 0
+        current.append(item)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _is_valid_json(text: str) -> bool:
+    """Returns True if text parses with _extract_json."""
+    try:
+        _extract_json(text)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+def _sf_note_date() -> str:
+    """Today's date as SF notes start with it: MM/DD/YY without leading zeros (e.g. "1/10/25")."""
+    today = datetime.now()
+    return f"{today.month}/{today.day}/{str(today.year)[-2:]}"
+
+
+def _with_date_prefix(note: str, date_str: str) -> str:
+    """Ensures an SF note starts with the date (in case the LLM didn't include it)."""
+    note = note.strip()
+    return note if note.startswith(date_str) else f"{date_str} {note}"
+
+
+# Summaries and SF notes are only requested from these providers
+SUMMARY_PROVIDERS = ("gemini", "openai")
+
+
+def _reply_prompt(email_body: str, system_prompt: str) -> str:
+    return f"{system_prompt}\n\nEmail Thread:\n{email_body}\n\nResponse:"
+
+
+def _batch_prompt_intro(system_prompt: str) -> str:
+    return (
+        f"{system_prompt}\n\n"
+        "TASK: You are processing a batch of emails. For each email provided in the JSON list below, "
+        "generate a reply based on the persona.\n"
+        "OUTPUT FORMAT: You MUST return a raw JSON list of objects. "
+        "Each object must have exactly two fields:\n"
+        '  - "id": The exact id from the input.\n'
+        '  - "reply_text": Your generated response.\n\n'
+        "Do not output markdown formatting (like ```json), just the raw JSON.\n\n"
+        "INPUT DATA:\n"
+    )
+
+
+def _summary_prompt(thread_content: str) -> str:
+    return (
+        "You are summarizing an email thread. Create a concise, one-paragraph summary that covers:\n"
+        "- The main topic or purpose of the thread\n"
+        "- Current status and any key decisions made\n"
+        "- Next steps or action items (if any)\n\n"
+        "Keep it to one paragraph. Be clear and business-focused.\n\n"
+        f"Email Thread:\n{thread_content}\n\n"
+        "Summary (one paragraph):"
+    )
+
+
+def _sf_note_prompt(thread_content: str, date_str: str) -> str:
+    return (
+        f"Email Thread:\n{thread_content}\n\n"
+        f"Write a one-sentence Salesforce note starting with {date_str}. "
+        f"TL;DR style, punchy, straight to the point. "
+        f"Drop the subject pronoun — say 'reached out' not 'we reached out', 'pushing' not 'we're pushing'. "
+        f"Just the note, nothing else."
+    )
+
+
+def _summary_and_note_prompt(thread_content: str, date_str: str) -> str:
+    return (
+        "You are summarizing an email thread. Produce two things:\n"
+        '1. "summary": a concise, one-paragraph summary that covers the main topic or purpose of the thread, '
+        "the current status and any key decisions made, and next steps or action items (if any). "
+        "Be clear and business-focused.\n"
+        f'2. "sf_note": a one-sentence Salesforce note starting with {date_str}. '
+        "TL;DR style, punchy, straight to the point. "
+        "Drop the subject pronoun — say 'reached out' not 'we reached out', 'pushing' not 'we're pushing'.\n\n"
+        'OUTPUT FORMAT: Return a raw JSON object with exactly two string fields, "summary" and "sf_note". '
+        "Do not output markdown formatting (like ```json), just the raw JSON.\n\n"
+        f"Email Thread:\n{thread_content}"
+    )
+
+
+def _parse_batch_response(raw_text: str) -> Optional[Dict[str, str]]:
+    """
+    Maps a batch response to id -> reply text. Returns None if the text is not JSON.
+
+    The prompt asks for a list of {"id", "reply_text"} objects; OpenAI's json_object mode can only
+    return an object, so a root object wrapping the list (e.g. {"replies": [...]}) is unwrapped.
+    """
+    try:
+        parsed_data = _extract_json(raw_text)
+    except json.JSONDecodeError:
+        return None
+
+    if isinstance(parsed_data, list):
+        items = parsed_data
+    elif isinstance(parsed_data, dict):
+        values = list(parsed_data.values())
+        items = values[0] if values and isinstance(values[0], list) else []
+    else:
+        items = []
+
+    return {
+        item["id"]: item["reply_text"]
+        for item in items
+        if isinstance(item, dict) and "id" in item and "reply_text" in item
+    }
+
+
+def _fits_batch_budget(model_entry: Dict[str, Any], prompt_tokens: int) -> bool:
+    """False (with a note) if a sub-batch prompt exceeds the share of the model's context window it may use."""
+    context_window = model_entry.get("context_window")
+    if context_window and prompt_tokens > context_window * BATCH_CONTEXT_FRACTION:
+        print(f"  -> Skipping {model_entry['id']} for this sub-batch: ~{prompt_tokens} tokens exceeds its budget")
+        return False
+    return True
+
+
+# Provider error texts meaning the request was too big; a smaller sub-batch may then succeed
+_SIZE_ERROR_MARKERS = ("context length", "context_length", "context window", "too long", "too large", "token limit")
+
+
+def _is_size_error(error: BaseException) -> bool:
+    """True if a provider rejected a request for its size (HTTP 413 or a context-length message)."""
+    if status_code(error) == 413:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _SIZE_ERROR_MARKERS)
+
+
+def _is_provider_error(error: BaseException) -> bool:
+    """
+    True if a failed call says the provider itself is failing: a connection error, an auth
+    error, a rate limit that outlasted the retries, or a 5xx. Errors about one model or one
+    request (unknown model ID, prompt too large, bad request) are not.
+    """
+    if _is_size_error(error):
+        return False
+    status = status_code(error)
+    if status is None:
+        return is_retryable(error)
+    return status in (401, 403, 429) or status >= 500
+
+
+def _batch_retry_parts(
+    chunk: List[Dict[str, Any]], results: Dict[str, str], shrinkable: bool
+) -> List[List[Dict[str, Any]]]:
+    """
+    The halves of a sub-batch's unanswered emails to retry, shrinking until single emails.
+
+    Halving only helps when size was the problem: a model answered but left emails out, the
+    output did not parse, or the prompt was too big. If every model in the chain failed
+    otherwise (auth, outage, open breakers), smaller requests would fail the same way, so
+    nothing is retried.
+    """
+    missing = [item for item in chunk if item["id"] not in results]
+    if not missing or len(chunk) <= 1:
+        return []
+    if not shrinkable:
+        print(f"  -> {len(missing)}/{len(chunk)} emails unanswered; every model failed, not retrying")
+        return []
+    print(f"  -> {len(missing)}/{len(chunk)} emails unanswered; retrying in smaller sub-batches")
+    half = (len(missing) + 1) // 2
+    return [part for part in (missing[:half], missing[half:]) if part]
+
+
+def _parse_summary_and_note(text: str) -> tuple[Optional[str], Optional[str]]:
+    """Reads {"summary": ..., "sf_note": ...} from a combined response; missing or empty fields are None."""
+    try:
+        data = _extract_json(text)
+    except json.JSONDecodeError:
+        return None, None
+    if not isinstance(data, dict):
+        return None, None
+    fields = []
+    for key in ("summary", "sf_note"):
+        value = data.get(key)
+        fields.append(value.strip() if isinstance(value, str) and value.strip() else None)
+    return fields[0], fields[1]
+
+
+def _is_complete_summary_and_note(text: str) -> bool:
+    return all(_parse_summary_and_note(text))
+
+
 class LLMService:
-    def __init__(self):
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        catalog: Optional[ModelCatalog] = None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        metrics: Optional[MetricsRecorder] = None,
+        token_estimator=None,
+        health: Optional[HealthTracker] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        # Optional on-disk response cache; None disables caching (e.g. GUI model listing, tests)
+        self.cache = cache
+        # Optional persisted model catalog; None means models are always listed live (once, lazily)
+        self.catalog = catalog
+        # Upper bound on live requests in flight across all callers (batch sub-batches, pipeline
+        # stages, summary pools): each provider call holds one of the request slots
+        self.max_concurrency = max(1, max_concurrency)
+        self._request_slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._models_lock = threading.Lock()
+        # Optional per-call metrics; the token estimator is pluggable (any object with count(text) -> int)
+        self.metrics = metrics
+        self.token_estimator = token_estimator or (metrics.estimator if metrics else CharRatioEstimator())
+        # Circuit breakers and health scores for the fallback chain (in memory, per run)
+        self.health = health if health is not None else HealthTracker()
+        # Retries with backoff and per-provider request/token budgets, shared by all concurrent calls
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+
         self.gemini_key = CredentialManager.get_gemini_key()
         self.openai_key = CredentialManager.get_openai_key()
         self.openrouter_key = CredentialManager.get_openrouter_key()
@@ -71,12 +331,17 @@ class LLMService:
 
         # List of dicts: {'id': str, 'provider': str}
         # Sorted by preference if possible, but detection order is likely sufficient for now.
-        self.available_models: List[Dict[str, Any]] = []
+        # None until first needed; see the available_models property.
+        self._available_models: Optional[List[Dict[str, Any]]] = None
+        # Catalog entries (stale ones included) per provider, read once; see _catalog_models
+        self._catalog_snapshot: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._aio = None
 
         self._init_clients()
-        self._discover_models()
 
     def _init_clients(self):
+        # All provider clients share the process-wide connection pool (see http_pool).
+        # SDK-level retries are disabled (max_retries=0): self.rate_limiter retries with shared budgets
         disable_ssl = load_ssl_config_helper()
         if disable_ssl:
             print("[Security Warning] SSL Verification is DISABLED (hardcoded for Zscaler compatibility)")
@@ -89,7 +354,8 @@ class LLMService:
                 setup_ssl_environment(verify_option)
 
                 self.gemini_client = genai.Client(
-                    api_key=self.gemini_key, http_options=types.HttpOptions(client_args={"verify": verify_option})
+                    api_key=self.gemini_key,
+                    http_options=types.HttpOptions(httpx_client=get_http_client(verify_option)),
                 )
             except Exception as e:
                 print(f"Warning: Failed to initialize Gemini client: {e}")
@@ -97,24 +363,14 @@ class LLMService:
         # OpenAI
         if self.openai_key:
             try:
-                # Use the same SSL configuration approach as test_openai_connection
                 verify_option = get_ssl_verify_option(disable_ssl)
                 # Environment setup already handled above if gemini key existed, but duplicate call is safe/idempotent
                 if not self.gemini_key:
                     setup_ssl_environment(verify_option)
 
-                if isinstance(verify_option, str) and os.path.exists(verify_option):
-                    # Use certificate bundle via environment variables
-                    self.openai_client = OpenAI(api_key=self.openai_key)
-                elif isinstance(verify_option, ssl.SSLContext):
-                    # For CERT_NONE, use custom httpx client
-                    import httpx
-
-                    httpx_client = httpx.Client(verify=verify_option)
-                    self.openai_client = OpenAI(api_key=self.openai_key, http_client=httpx_client)
-                else:
-                    # Default initialization
-                    self.openai_client = OpenAI(api_key=self.openai_key)
+                self.openai_client = OpenAI(
+                    api_key=self.openai_key, http_client=get_http_client(verify_option), max_retries=0
+                )
             except Exception as e:
                 print(f"Warning: Failed to initialize OpenAI client: {e}")
 
@@ -126,225 +382,475 @@ class LLMService:
                 if not self.gemini_key and not self.openai_key:
                     setup_ssl_environment(verify_option)
 
-                OR_BASE_URL = "https://openrouter.ai/api/v1"
-
-                # Similar SSL handling for OpenRouter (via OpenAI SDK)
-                if isinstance(verify_option, str) and os.path.exists(verify_option):
-                    # Globals likely already set if OpenAI/Gemini init ran
-                    self.openrouter_client = OpenAI(base_url=OR_BASE_URL, api_key=self.openrouter_key)
-                elif isinstance(verify_option, ssl.SSLContext):
-                    import httpx
-
-                    httpx_client = httpx.Client(verify=verify_option)
-                    self.openrouter_client = OpenAI(
-                        base_url=OR_BASE_URL, api_key=self.openrouter_key, http_client=httpx_client
-                    )
-                else:
-                    self.openrouter_client = OpenAI(base_url=OR_BASE_URL, api_key=self.openrouter_key)
+                # OpenRouter is OpenAI-compatible and goes through the same SDK and pool
+                self.openrouter_client = OpenAI(
+                    base_url=OPENROUTER_BASE_URL,
+                    api_key=self.openrouter_key,
+                    http_client=get_http_client(verify_option),
+                    max_retries=0,
+                )
             except Exception as e:
                 print(f"Warning: Failed to initialize OpenRouter client: {e}")
                 self.openrouter_client = None
         else:
             self.openrouter_client = None
 
+    @property
+    def available_models(self) -> List[Dict[str, Any]]:
+        """Discovered models, loaded lazily (from the model catalog when fresh) on first access."""
+        if self._available_models is None:
+            with self._models_lock:
+                if self._available_models is None:
+                    self._load_models()
+        return self._available_models if self._available_models is not None else []
+
+    @available_models.setter
+    def available_models(self, models: List[Dict[str, Any]]) -> None:
+        self._available_models = models
+
+    @property
+    def aio(self):
+        """asyncio versions of the generate_* methods, sharing this service's models and state (see llm_async)."""
+        if self._aio is None:
+            from llm_async import AsyncLLMService  # llm_async builds on this module
+
+            self._aio = AsyncLLMService(self)
+        return self._aio
+
+    def _provider_sources(self):
+        """Yields (provider, api_key, discover_fn) for every provider with an initialized client."""
+        if self.gemini_client:
+            yield "gemini", self.gemini_key, self._discover_gemini_models
+        if self.openai_client:
+            yield "openai", self.openai_key, self._discover_openai_models
+        if self.openrouter_client:
+            yield "openrouter", self.openrouter_key, self._discover_openrouter_models
+
+    def _load_models(self, force_refresh: bool = False) -> None:
+        """
+        Builds the model list, reusing fresh per-provider catalogs and only listing models over
+        the network for providers whose catalog is missing, expired or was listed with another key.
+        """
+        models: List[Dict[str, Any]] = []
+        listed = False
+
+        for provider, api_key, discover in self._provider_sources():
+            fingerprint = key_fingerprint(api_key)
+            provider_models = None
+            if self.catalog is not None and not force_refresh:
+                provider_models = self.catalog.get(provider, fingerprint)
+
+            if provider_models is None:
+                if not listed:
+                    print("Detecting available LLM models...")
+                    listed = True
+                provider_models = discover()
+                if provider_models is not None and self.catalog is not None:
+                    self.catalog.put(provider, fingerprint, provider_models)
+
+            models.extend(provider_models or [])
+
+        self._available_models = models
+
+        if not models:
+            print("  -> No suitable cheap/fast models found. Please check API Keys.")
+        elif listed:
+            print(f"  -> Discovered {len(models)} suitable models: " + ", ".join([m["id"] for m in models]))
+        else:
+            print(f"  -> Loaded {len(models)} models from the model catalog.")
+
     def _discover_models(self):
         """
         Query providers to find available models, filtering for cheap/fast text generation.
         Aggressively filters out non-text, specialized, or expensive models.
+        Always lists over the network, refreshing the model catalog.
         """
-        self.available_models = []
-        print("Detecting available LLM models...")
-
-        # 1. Gemini Discovery
-        if self.gemini_client:
-            try:
-                for m in self.gemini_client.models.list():
-                    name = m.name
-                    if not name:
-                        continue
-                    model_id = name.split("/")[-1] if "/" in name else name
-                    lower_id = model_id.lower()
+        self._load_models(force_refresh=True)
 
-                    # Base checks
-                    if "gemini" not in lower_id:
-                        continue
-
-                    # 1. Aggressive Exclusion
-                    if any(k in lower_id for k in EXCLUDED_MODEL_KEYWORDS):
-                        continue
+    def _discover_gemini_models(self) -> Optional[List[Dict[str, Any]]]:
+        """Lists Gemini models. Returns None if the listing call failed."""
+        models: List[Dict[str, Any]] = []
+        try:
+            for m in self.gemini_client.models.list():
+                name = m.name
+                if not name:
+                    continue
+                model_id = name.split("/")[-1] if "/" in name else name
+                lower_id = model_id.lower()
 
-                    # Exclude Experimental/Unstable
-                    if "exp" in lower_id:
-                        continue
+                # Base checks
+                if "gemini" not in lower_id:
+                    continue
 
-                    # Filter out specific date-based versions (e.g. -2024-07-18, -0125)
-                    if re.search(r"-\d{4}-\d{2}-\d{2}", lower_id):
-                        continue
-                    if re.search(r"-\d{4}$", lower_id):
-                        continue
+                # 1. Aggressive Exclusion
+                if any(k in lower_id for k in EXCLUDED_MODEL_KEYWORDS):
+                    continue
 
-                    self.available_models.append({"id": model_id, "provider": "gemini"})
+                # Exclude Experimental/Unstable
+                if "exp" in lower_id:
+                    continue
 
-            except Exception as e:
-                print(f"  -> Gemini model discovery failed: {e}")
+                # Filter out specific date-based versions (e.g. -2024-07-18, -0125)
+                if re.search(r"-\d{4}-\d{2}-\d{2}", lower_id):
+                    continue
+                if re.search(r"-\d{4}$", lower_id):
+                    continue
 
-        # 2. OpenAI Discovery
-        if self.openai_client:
-            try:
-                print("  -> Querying OpenAI for available models...")
-                models_page = self.openai_client.models.list()
-                print(f"  -> Received {len(models_page.data)} models from OpenAI")
-                for m in models_page.data:
-                    mid = m.id
-                    lower_id = mid.lower()
+                models.append(_model_entry(model_id, "gemini", getattr(m, "input_token_limit", None)))
 
-                    # Must be a GPT model
-                    if not mid.startswith("gpt"):
-                        continue
+        except Exception as e:
+            print(f"  -> Gemini model discovery failed: {e}")
+            return None
+        return models
 
-                    # Aggressive Exclusion
-                    if any(k in lower_id for k in EXCLUDED_MODEL_KEYWORDS):
-                        continue
+    def _discover_openai_models(self) -> Optional[List[Dict[str, Any]]]:
+        """Lists OpenAI models. Returns None if the listing call failed."""
+        models: List[Dict[str, Any]] = []
+        try:
+            print("  -> Querying OpenAI for available models...")
+            models_page = self.openai_client.models.list()
+            print(f"  -> Received {len(models_page.data)} models from OpenAI")
+            for m in models_page.data:
+                mid = m.id
+                lower_id = mid.lower()
+
+                # Must be a GPT model
+                if not mid.startswith("gpt"):
+                    continue
 
-                    # Filter out specific date-based versions (e.g. -2024-07-18, -0125)
-                    if re.search(r"-\d{4}-\d{2}-\d{2}", lower_id):
-                        continue
-                    if re.search(r"-\d{4}$", lower_id):
-                        continue
+                # Aggressive Exclusion
+                if any(k in lower_id for k in EXCLUDED_MODEL_KEYWORDS):
+                    continue
 
-                    self.available_models.append({"id": mid, "provider": "openai"})
+                # Filter out specific date-based versions (e.g. -2024-07-18, -0125)
+                if re.search(r"-\d{4}-\d{2}-\d{2}", lower_id):
+                    continue
+                if re.search(r"-\d{4}$", lower_id):
+                    continue
 
-                if len(self.available_models) == 0:
-                    print("  -> Warning: No OpenAI models passed filtering criteria")
-                    print("  -> Consider checking filter rules if models are expected")
+                models.append({"id": mid, "provider": "openai"})
 
-            except Exception as e:
-                print(f"  -> OpenAI model discovery failed: {e}")
-                import traceback
+            if len(models) == 0:
+                print("  -> Warning: No OpenAI models passed filtering criteria")
+                print("  -> Consider checking filter rules if models are expected")
 
-                print(f"  -> Traceback: {traceback.format_exc()}")
+        except Exception as e:
+            print(f"  -> OpenAI model discovery failed: {e}")
+            import traceback
 
-        # 3. OpenRouter Discovery
-        if self.openrouter_client:
-            try:
-                print("  -> Querying OpenRouter for available models...")
-                models_page = self.openrouter_client.models.list()
+            print(f"  -> Traceback: {traceback.format_exc()}")
+            return None
+        return models
 
-                count = 0
-                for m in models_page.data:
-                    mid = m.id
-                    lower_id = mid.lower()
+    def _discover_openrouter_models(self) -> Optional[List[Dict[str, Any]]]:
+        """Lists OpenRouter models. Returns None if the listing call failed."""
+        models: List[Dict[str, Any]] = []
+        try:
+            print("  -> Querying OpenRouter for available models...")
+            models_page = self.openrouter_client.models.list()
 
-                    # Aggressive Exclusion
-                    if any(k in lower_id for k in EXCLUDED_MODEL_KEYWORDS):
-                        continue
+            for m in models_page.data:
+                mid = m.id
+                lower_id = mid.lower()
 
-                    self.available_models.append({"id": mid, "provider": "openrouter"})
-                    count += 1
+                # Aggressive Exclusion
+                if any(k in lower_id for k in EXCLUDED_MODEL_KEYWORDS):
+                    continue
 
-                print(f"  -> Discovered {count} suitable OpenRouter models.")
+                models.append(_model_entry(mid, "openrouter", getattr(m, "context_length", None)))
 
-            except Exception as e:
-                print(f"  -> OpenRouter model discovery failed: {e}")
+            print(f"  -> Discovered {len(models)} suitable OpenRouter models.")
 
-        if not self.available_models:
-            print("  -> No suitable cheap/fast models found. Please check API Keys.")
-        else:
-            print(
-                f"  -> Discovered {len(self.available_models)} suitable models: "
-                + ", ".join([m["id"] for m in self.available_models])
-            )
+        except Exception as e:
+            print(f"  -> OpenRouter model discovery failed: {e}")
+            return None
+        return models
 
     def get_models_list(self):
         """Returns list of model names for display."""
         return [m["id"] for m in self.available_models]
 
-    def _reorder_models(self, preferred_model: Optional[str]) -> List[Dict[str, Any]]:
+    def _catalog_models(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Models the catalog knows per provider, stale entries included, so a preferred model can be
+        placed before the model list is loaded. Read from disk once and kept until refresh_models.
+        """
+        if self._catalog_snapshot is None:
+            snapshot: Dict[str, List[Dict[str, Any]]] = {}
+            if self.catalog is not None:
+                for provider, api_key, _ in self._provider_sources():
+                    snapshot[provider] = self.catalog.get(provider, key_fingerprint(api_key), allow_stale=True) or []
+            self._catalog_snapshot = snapshot
+        return self._catalog_snapshot
+
+    def _infer_provider(self, model_id: str) -> Optional[str]:
         """
-        Reorders available models to try a preferred model first.
+        Guesses which provider serves a model ID without listing models, so a configured
+        preferred model can be tried before (or without) discovery. Returns None if unsure.
+        """
+        candidates = [
+            provider
+            for provider, known in self._catalog_models().items()
+            if any(m.get("id") == model_id for m in known)
+        ]
+        lower_id = model_id.lower()
+        if "/" in lower_id:
+            candidates.append("openrouter")
+        elif lower_id.startswith("gemini"):
+            candidates.append("gemini")
+        elif lower_id.startswith("gpt"):
+            candidates.append("openai")
+
+        clients = {"gemini": self.gemini_client, "openai": self.openai_client, "openrouter": self.openrouter_client}
+        for provider in candidates:
+            if clients.get(provider):
+                return provider
+        return None
+
+    def _has_models(self, preferred_model: Optional[str] = None) -> bool:
+        """True if there is at least one model to try, without forcing discovery for a known preferred model."""
+        if preferred_model and self._available_models is None and self._infer_provider(preferred_model):
+            return True
+        return bool(self.available_models)
+
+    def _reorder_models(
+        self, preferred_model: Optional[str], usable: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the models to try for one request: the preferred model first, then the rest ordered
+        by observed health (success rate and latency). Models whose circuit breaker, or whose
+        provider's breaker, is open are skipped without a request.
+
+        If the model list has not been loaded yet and the preferred model's provider can be inferred,
+        the preferred model is yielded before discovery runs; discovery only happens if it fails.
 
         Args:
             preferred_model: Optional model ID to prioritize
+            usable: Optional filter for the caller's own restrictions (providers, prompt budget).
+                It runs before the breakers are asked, so a half-open probe is only spent on a
+                model that will be called.
 
-        Returns:
-            List of model dictionaries with preferred model first (if found)
+        Yields:
+            Model dictionaries with preferred model first (if found)
         """
-        models_to_try = self.available_models.copy()
-        if preferred_model:
-            preferred_entry = None
-            for i, model_entry in enumerate(models_to_try):
-                if model_entry["id"] == preferred_model:
-                    preferred_entry = models_to_try.pop(i)
-                    break
-
-            if preferred_entry:
-                models_to_try.insert(0, preferred_entry)
+        preferred_entry = None
+        if preferred_model and self._available_models is None:
+            provider = self._infer_provider(preferred_model)
+            if provider:
+                preferred_entry = {"id": preferred_model, "provider": provider}
+
+        if preferred_model and preferred_entry is None:
+            preferred_entry = next((m for m in self.available_models if m["id"] == preferred_model), None)
+            if preferred_entry is None:
+                print(f"[Warning] Preferred model '{preferred_model}' not found. Using default order.")
+
+        if preferred_entry and (usable is None or usable(preferred_entry)):
+            if self.health.allow(preferred_entry["provider"], preferred_model):
                 print(f"[Info] Using preferred model: {preferred_model}")
+                yield preferred_entry
             else:
-                print(f"[Warning] Preferred model '{preferred_model}' not found. Using default order.")
-        return models_to_try
+                print(f"[Info] Preferred model {preferred_model} is failing; skipping it for now")
+
+        fallbacks = [m for m in self.available_models if m["id"] != preferred_model]
+        for model_entry in self.health.rank(fallbacks):
+            if usable is not None and not usable(model_entry):
+                continue
+            if self.health.allow(model_entry["provider"], model_entry["id"]):
+                yield model_entry
 
     def refresh_models(self):
-        """Re-initializes clients and rediscovers models (useful for GUI)."""
+        """Re-initializes clients and rediscovers models over the network (useful for GUI)."""
         # Reload env vars in case they changed in memory
         self.gemini_key = CredentialManager.get_gemini_key()
         self.openai_key = CredentialManager.get_openai_key()
         self.openrouter_key = CredentialManager.get_openrouter_key()
         self._init_clients()
-        self._discover_models()
+        self._catalog_snapshot = None
+        self._load_models(force_refresh=True)
         return self.get_models_list()
 
-    def generate_reply(self, email_body, system_prompt, preferred_model=None):
+    def generate_reply(self, email_body, system_prompt, preferred_model=None, label=None):
         """
         Tries to generate a reply using available models in order.
         If preferred_model is specified, tries that model first.
+        label optionally identifies the request in LLM metrics.
         """
-        if not self.available_models:
+        return self._run_steps(self._reply_steps(email_body, system_prompt, preferred_model, label))
+
+    # The generate_* logic is written once, as *_steps generators that yield each model call they
+    # need (the _call_model keyword arguments) and get back its response, or its exception thrown in.
+    # _run_steps makes the calls here; AsyncLLMService._run_steps awaits them on the event loop.
+
+    def _run_steps(self, steps):
+        """Drives a *_steps generator with blocking _call_model calls and returns its result."""
+        try:
+            request = next(steps)
+            while True:
+                try:
+                    response = self._call_model(**request)
+                except Exception as e:
+                    request = steps.throw(e)
+                else:
+                    request = steps.send(response)
+        except StopIteration as stop:
+            return stop.value
+
+    def _reply_steps(self, email_body, system_prompt, preferred_model, label):
+        if not self._has_models(preferred_model):
             print("Error: No available models to generate reply.")
             return None
 
-        prompt = f"{system_prompt}\n\nEmail Thread:\n{email_body}\n\nResponse:"
+        model_entry, result = yield from self._first_response_steps(
+            _reply_prompt(email_body, system_prompt), preferred_model, kind="reply", label=label, task="reply"
+        )
+        if model_entry is None:
+            print("Error: All models failed.")
+            return None
+        print(f"✓ Selected model: {model_entry['provider']}:{model_entry['id']}")
+        return result
 
-        # Reorder models to try preferred_model first if specified
-        models_to_try = self._reorder_models(preferred_model)
+    def _first_response_steps(
+        self, prompt, preferred_model, kind, label=None, providers=None, json_mode=False, validate=None, task="reply"
+    ):
+        """
+        Walks the fallback chain until a model returns a non-empty response.
+
+        Args:
+            providers: Optional providers to restrict the chain to
+            task: What is being generated, for log lines
 
-        for model_entry in models_to_try:
+        Returns:
+            (model entry, response text), or (None, None) if every model failed
+        """
+        usable = (lambda m: m["provider"] in providers) if providers else None
+        for model_entry in self._reorder_models(preferred_model, usable):
             model_id = model_entry["id"]
             provider = model_entry["provider"]
 
-            print(f"Attempting generate with {provider}:{model_id}...")
-
+            print(f"Attempting {task} with {provider}:{model_id}...")
             try:
-                if provider == "gemini":
-                    result = self._generate_gemini(model_id, prompt)
-                elif provider == "openai":
-                    result = self._generate_openai(model_id, prompt)
-                elif provider == "openrouter":
-                    result = self._generate_openrouter(model_id, prompt)
-                else:
-                    continue
-
-                if result:
-                    print(f"✓ Selected model: {provider}:{model_id}")
-                    return result
+                result = yield dict(
+                    provider=provider,
+                    model_id=model_id,
+                    prompt=prompt,
+                    json_mode=json_mode,
+                    validate=validate,
+                    kind=kind,
+                    label=label,
+                )
             except Exception as e:
-                print(f"  -> Failed with {model_id}: {e}")
+                print(f"  -> Failed to generate {task} with {model_id}: {e}")
                 continue
+            if result:
+                return model_entry, result
+        return None, None
 
-        print("Error: All models failed.")
-        return None
+    def _call_model(self, provider, model_id, prompt, json_mode=False, validate=None, kind="reply", label=None):
+        """
+        Single entry point for one request to one model, consulting the response cache first.
+        Each call (including cache hits and failures) is recorded to the metrics recorder if one is set.
+        Live calls go through the rate limiter (retries, per-provider budgets), wait for one of the
+        max_concurrency request slots and feed the health tracker; a call that still raises after
+        retries counts as a failure.
+
+        Args:
+            provider: 'gemini', 'openai' or 'openrouter'
+            model_id: Model ID to call
+            prompt: Full prompt text
+            json_mode: Ask the provider for a raw JSON response where supported
+            validate: Optional callable; a response is only cached if validate(response) is truthy
+            kind: Call type for metrics ('reply', 'batch', 'summary', 'sf_note', 'summary_sf_note')
+            label: Optional identifier for metrics (e.g. thread subject or batch message IDs)
+
+        Returns:
+            Response text ("" if the provider returned nothing), or None for an unknown provider
+        """
+        if provider not in ("gemini", "openai", "openrouter"):
+            return None
 
-    def _generate_gemini(self, model_id, prompt):
+        key, cached = self._cache_lookup(provider, model_id, prompt, json_mode, kind, label)
+        if cached is not None:
+            return cached
+
+        def generate():
+            # The slot is taken per attempt, so retry backoff does not hold one
+            with self._request_slots:
+                if provider == "gemini":
+                    return self._generate_gemini(model_id, prompt, json_mode=json_mode)
+                if provider == "openai":
+                    return self._generate_openai(model_id, prompt, json_mode=json_mode)
+                return self._generate_openrouter(model_id, prompt)
+
+        start = time.perf_counter()
+        try:
+            result = self.rate_limiter.call(provider, generate, tokens=self._budget_tokens(provider, prompt))
+        except Exception as e:
+            self._call_failed(provider, model_id, prompt, time.perf_counter() - start, kind, label, e)
+            raise
+        self._call_done(key, provider, model_id, prompt, result, time.perf_counter() - start, kind, label, validate)
+        return result
+
+    # Bookkeeping shared by _call_model and its async counterpart (llm_async.AsyncLLMService)
+
+    def _cache_lookup(self, provider, model_id, prompt, json_mode, kind, label):
+        """Returns (cache key or None, cached response or None); a hit is recorded in the metrics."""
+        if self.cache is None:
+            return None, None
+        key = ResponseCache.make_key(provider, model_id, prompt, json_mode=json_mode)
+        cached = self.cache.get(key)
+        if cached is not None:
+            print(f"  -> Cache hit for {provider}:{model_id}")
+            self._record(kind, provider, model_id, prompt, cached, 0.0, True, cached=True, label=label)
+        return key, cached
+
+    def _budget_tokens(self, provider, prompt):
+        """Prompt token estimate for the rate limiter, only computed when the provider has a token budget."""
+        return self.token_estimator.count(prompt) if self.rate_limiter.tracks_tokens(provider) else 0
+
+    def _call_done(self, key, provider, model_id, prompt, result, elapsed, kind, label, validate):
+        self.health.record(provider, model_id, True, elapsed)
+        self._record(kind, provider, model_id, prompt, result, elapsed, bool(result), label=label)
+        if key is not None and result and (validate is None or validate(result)):
+            self.cache.set(key, result)
+
+    def _call_failed(self, provider, model_id, prompt, elapsed, kind, label, error):
+        self.health.record(provider, model_id, False, elapsed, provider_fault=_is_provider_error(error))
+        self._record(kind, provider, model_id, prompt, None, elapsed, False, label=label, error=str(error))
+
+    def _record(self, kind, provider, model_id, prompt, output, latency_s, success, **extra):
+        if self.metrics is not None:
+            self.metrics.record(kind, provider, model_id, prompt, output, latency_s, success, **extra)
+
+    def _generate_gemini(self, model_id, prompt, json_mode=False):
         if not self.gemini_client:
             return ""
-        response = self.gemini_client.models.generate_content(model=model_id, contents=prompt)
+        if json_mode:
+            response = self.gemini_client.models.generate_content(
+                model=model_id, contents=prompt, config={"response_mime_type": "application/json"}
+            )
+        else:
+            response = self.gemini_client.models.generate_content(model=model_id, contents=prompt)
         if not response.text:
             return ""
         return response.text.strip()
 
-    def _generate_openai(self, model_id, prompt):
+    def _generate_openai(self, model_id, prompt, json_mode=False):
         if not self.openai_client:
             return ""
+        if json_mode:
+            # OpenAI supports json_object response format on newer models.
+            # Note: 'json_object' requires 'json' in the prompt, and returns a JSON object rather than a list;
+            # the batch parser unwraps a root object like {"replies": [...]}.
+            completion = self.openai_client.chat.completions.create(
+                model=model_id,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that outputs JSON."},
+                    {"role": "user", "content": prompt},
+                ],
+                response_format={"type": "json_object"},
+            )
+            content = completion.choices[0].message.content
+            return content.strip() if content else ""
         completion = self.openai_client.chat.completions.create(
             model=model_id,
             messages=[
@@ -365,235 +871,232 @@ class LLMService:
         """
         Generates batch replies. Tries to use the JSON-list prompting strategy.
         If preferred_model is specified, tries that model first.
+
+        The batch is split into token-budgeted sub-batches sized from the model's context window.
+        Sub-batches run concurrently (up to max_concurrency) and are merged into one id -> reply dict;
+        a sub-batch that fails is retried in smaller pieces.
         """
-        if not self.available_models:
+        if not email_batch or not self._has_models(preferred_model):
             return {}
 
-        # Reorder models to try preferred_model first if specified
-        models_to_try = self._reorder_models(preferred_model)
+        prompt_intro, chunks = self._plan_batch(email_batch, system_prompt, preferred_model)
+
+        results = {}
+        workers = min(self.max_concurrency, len(chunks))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for chunk_results in pool.map(
+                lambda chunk: self._generate_batch_adaptive(chunk, prompt_intro, preferred_model), chunks
+            ):
+                results.update(chunk_results)
+        return results
+
+    def _plan_batch(self, email_batch, system_prompt, preferred_model):
+        """Builds the shared prompt intro and splits the batch into token-budgeted sub-batches."""
         if preferred_model:
             print(f"[Info] Using preferred model for batch: {preferred_model}")
 
-        # Prepare the centralized prompt (same as in genai.py)
-        prompt_intro = (
-            f"{system_prompt}\n\n"
-            "TASK: You are processing a batch of emails. For each email provided in the JSON list below, "
-            "generate a reply based on the persona.\n"
-            "OUTPUT FORMAT: You MUST return a raw JSON list of objects. "
-            "Each object must have exactly two fields:\n"
-            '  - "id": The exact id from the input.\n'
-            '  - "reply_text": Your generated response.\n\n'
-            "Do not output markdown formatting (like ```json), just the raw JSON.\n\n"
-            "INPUT DATA:\n"
-        )
-
+        prompt_intro = _batch_prompt_intro(system_prompt)
         prompt_batch = [
             {"id": item["id"], "subject": item["subject"], "content": item["content"]} for item in email_batch
         ]
 
-        full_json_input = json.dumps(prompt_batch, indent=2)
-        full_prompt = prompt_intro + full_json_input
+        context_window = self._context_window(preferred_model)
+        budget = int(context_window * BATCH_CONTEXT_FRACTION) - self.token_estimator.count(prompt_intro)
+        chunks = _chunk_batch(prompt_batch, max(budget, 1), BATCH_MAX_ITEMS, count_tokens=self.token_estimator.count)
+        if len(chunks) > 1:
+            print(
+                f"[Info] Splitting {len(prompt_batch)} emails into {len(chunks)} sub-batches "
+                f"(~{budget} token budget each)"
+            )
+        return prompt_intro, chunks
+
+    def _context_window(self, model_id):
+        """Context window in tokens for a model, or DEFAULT_CONTEXT_TOKENS if unknown."""
+        entries = self._available_models or []
+        if model_id and self._available_models is None:
+            entries = [m for known in self._catalog_models().values() for m in known]
+        if model_id:
+            for entry in entries:
+                if entry["id"] == model_id:
+                    return entry.get("context_window", DEFAULT_CONTEXT_TOKENS)
+            return DEFAULT_CONTEXT_TOKENS
+        # No preferred model: size for the smallest window we might fall back to
+        windows = [m.get("context_window", DEFAULT_CONTEXT_TOKENS) for m in entries]
+        return min(windows) if windows else DEFAULT_CONTEXT_TOKENS
+
+    def _generate_batch_adaptive(self, chunk, prompt_intro, preferred_model):
+        """
+        Generates one sub-batch; emails the models did not answer are retried in halves
+        (see _batch_retry_parts), so one oversized or unlucky request can't sink the rest.
+        """
+        results, shrinkable = self._run_steps(self._batch_chunk_steps(chunk, prompt_intro, preferred_model))
+        for part in _batch_retry_parts(chunk, results, shrinkable):
+            results.update(self._generate_batch_adaptive(part, prompt_intro, preferred_model))
+        return results
+
+    def _batch_chunk_steps(self, chunk, prompt_intro, preferred_model):
+        """
+        Sends one sub-batch through the model fallback chain.
 
-        for model_entry in models_to_try:
+        Returns:
+            (id -> reply dict, whether a smaller sub-batch could do better: some model answered,
+            or failed on size or unparseable output)
+        """
+        full_prompt = prompt_intro + json.dumps(chunk, indent=2)
+        prompt_tokens = self.token_estimator.count(full_prompt)
+        shrinkable = False
+
+        def fits(model_entry):
+            nonlocal shrinkable
+            if _fits_batch_budget(model_entry, prompt_tokens):
+                return True
+            shrinkable = True
+            return False
+
+        for model_entry in self._reorder_models(preferred_model, fits):
             model_id = model_entry["id"]
             provider = model_entry["provider"]
 
-            print(f"Attempting batch generate with {provider}:{model_id}...")
-
+            print(f"Attempting batch generate with {provider}:{model_id} ({len(chunk)} emails)...")
             try:
-                raw_text = ""
-                if provider == "gemini":
-                    if not self.gemini_client:
-                        continue
-                    response = self.gemini_client.models.generate_content(
-                        model=model_id, contents=full_prompt, config={"response_mime_type": "application/json"}
-                    )
-                    raw_text = response.text if response.text else ""
-                elif provider == "openai":
-                    if not self.openai_client:
-                        continue
-                    # OpenAI supports json_object response format on newer models
-                    # We need to set the system message nicely if possible, or just dump it all in user.
-                    # For robust JSON, we ask for json_object type.
-                    completion = self.openai_client.chat.completions.create(
-                        model=model_id,
-                        messages=[
-                            {"role": "system", "content": "You are a helpful assistant that outputs JSON."},
-                            {"role": "user", "content": full_prompt},
-                        ],
-                        response_format={"type": "json_object"},
-                        # Note: 'json_object' requires 'json' in the prompt. prompt_intro has it.
-                        # Also, this returns a JSON object, but our prompt asks for a LIST.
-                        # OpenAI's 'json_object' mode ensures valid JSON,
-                        # but usually expects a root object { "data": [...] }
-                        # If our prompt asks for a list, it might complain or wrap it.
-                        # Let's adjust safety: If provider is OpenAI, we might wrap the request or just trust it.
-                        # For now, let's try standard mode if we aren't sure about the structure,
-                        # or strictly ask for an object.
-                    )
-                    content = completion.choices[0].message.content
-                    raw_text = content if content else ""
-                elif provider == "openrouter":
-                    # OpenRouter uses OpenAI client but might point to non-OpenAI models that don't support json_object
-                    if not self.openrouter_client:
-                        continue
-                    # Try standard generation without response_format first for max compatibility
-                    completion = self.openrouter_client.chat.completions.create(
-                        model=model_id,
-                        messages=[
-                            {"role": "user", "content": full_prompt},
-                        ],
-                    )
-                    content = completion.choices[0].message.content
-                    raw_text = content if content else ""
-
-                # Parse JSON
-                try:
-                    parsed_data = _extract_json(raw_text)
-                except json.JSONDecodeError:
-                    print(f"  -> JSON parse failed for {model_id} output.")
-                    continue
-
-                # OpenAI json_object mode might wrap it?
-                # If prompt asked for list, valid JSON is [].
-                # If parsed_data is dict, maybe it has a key?
-                results = {}
-
-                if isinstance(parsed_data, list):
-                    items = parsed_data
-                elif isinstance(parsed_data, dict):
-                    # Check values for list
-                    # Maybe it wrapped it in "replies": [...]?
-                    # Or maybe it's just a dict of id->reply?
-                    # Let's hope the model followed instructions.
-                    # If dict, keys might be IDs?
-                    # We'll try to walk it.
-                    values = list(parsed_data.values())
-                    if values and isinstance(values[0], list):
-                        items = values[0]
-                    else:
-                        # Maybe it returned {"id": "reply"} mapping?
-                        # Let's assume list of objects as requested.
-                        items = []
-                else:
-                    items = []
-
-                for item in items:
-                    if isinstance(item, dict) and "id" in item and "reply_text" in item:
-                        results[item["id"]] = item["reply_text"]
-
-                if results:
-                    print(f"✓ Selected model for batch: {provider}:{model_id}")
-                    return results
-
+                # OpenRouter may point to non-OpenAI models that don't support json_object,
+                # so it is called without response_format for max compatibility.
+                raw_text = yield dict(
+                    provider=provider,
+                    model_id=model_id,
+                    prompt=full_prompt,
+                    json_mode=True,
+                    validate=_is_valid_json,
+                    kind="batch",
+                    label=",".join(str(item["id"]) for item in chunk),
+                )
             except Exception as e:
                 print(f"  -> Failed batch with {model_id}: {e}")
+                shrinkable = shrinkable or _is_size_error(e)
+                continue
+            if not raw_text:
                 continue
 
-        return {}
+            shrinkable = True
+            results = _parse_batch_response(raw_text)
+            if results is None:
+                print(f"  -> JSON parse failed for {model_id} output.")
+            elif results:
+                print(f"✓ Selected model for batch: {provider}:{model_id}")
+                return results, True
 
-    def generate_thread_summary(self, thread_content, preferred_model=None):
+        return {}, shrinkable
+
+    def generate_thread_summary(self, thread_content, preferred_model=None, label=None):
         """
         Generates a concise, one-paragraph summary of an email thread.
 
         Args:
             thread_content: Formatted string containing the full email thread
             preferred_model: Optional model ID to use for generation
+            label: Optional identifier (e.g. thread subject) for LLM metrics
 
         Returns:
             Summary string, or None if generation fails
         """
-        if not self.available_models:
+        return self._run_steps(self._thread_summary_steps(thread_content, preferred_model, label))
+
+    def _thread_summary_steps(self, thread_content, preferred_model, label):
+        if not self._has_models(preferred_model):
             print("Error: No available models to generate summary.")
             return None
 
-        summary_prompt = (
-            "You are summarizing an email thread. Create a concise, one-paragraph summary that covers:\n"
-            "- The main topic or purpose of the thread\n"
-            "- Current status and any key decisions made\n"
-            "- Next steps or action items (if any)\n\n"
-            "Keep it to one paragraph. Be clear and business-focused.\n\n"
-            f"Email Thread:\n{thread_content}\n\n"
-            "Summary (one paragraph):"
+        _, result = yield from self._first_response_steps(
+            _summary_prompt(thread_content),
+            preferred_model,
+            kind="summary",
+            label=label,
+            providers=SUMMARY_PROVIDERS,
+            task="summary",
         )
+        if result is None:
+            print("Error: All models failed to generate summary.")
+            return None
+        return result.strip()
 
-        # Reorder models to try preferred_model first if specified
-        models_to_try = self._reorder_models(preferred_model)
-
-        for model_entry in models_to_try:
-            model_id = model_entry["id"]
-            provider = model_entry["provider"]
-
-            try:
-                if provider == "gemini":
-                    result = self._generate_gemini(model_id, summary_prompt)
-                elif provider == "openai":
-                    result = self._generate_openai(model_id, summary_prompt)
-                else:
-                    continue
-
-                if result:
-                    return result.strip()
-            except Exception as e:
-                print(f"  -> Failed to generate summary with {model_id}: {e}")
-                continue
-
-        print("Error: All models failed to generate summary.")
-        return None
-
-    def generate_sf_note(self, thread_content, preferred_model=None):
+    def generate_sf_note(self, thread_content, preferred_model=None, label=None):
         """
         Generates an SF Note (Salesforce note) for an email thread.
 
         Args:
             thread_content: Formatted string containing the full email thread
             preferred_model: Optional model ID to use for generation
+            label: Optional identifier (e.g. thread subject) for LLM metrics
 
         Returns:
             SF Note string, or None if generation fails
         """
-        if not self.available_models:
+        return self._run_steps(self._sf_note_steps(thread_content, preferred_model, label))
+
+    def _sf_note_steps(self, thread_content, preferred_model, label):
+        if not self._has_models(preferred_model):
             print("Error: No available models to generate SF Note.")
             return None
 
-        today = datetime.now()
-        # Format: MM/DD/YY without leading zeros (e.g., "1/10/25")
-        date_str = f"{today.month}/{today.day}/{str(today.year)[-2:]}"
-
-        sf_note_prompt = (
-            f"Email Thread:\n{thread_content}\n\n"
-            f"Write a one-sentence Salesforce note starting with {date_str}. "
-            f"TL;DR style, punchy, straight to the point. "
-            f"Drop the subject pronoun — say 'reached out' not 'we reached out', 'pushing' not 'we're pushing'. "
-            f"Just the note, nothing else."
+        date_str = _sf_note_date()
+        _, result = yield from self._first_response_steps(
+            _sf_note_prompt(thread_content, date_str),
+            preferred_model,
+            kind="sf_note",
+            label=label,
+            providers=SUMMARY_PROVIDERS,
+            task="SF Note",
         )
+        if result is None:
+            print("Error: All models failed to generate SF Note.")
+            return None
+        return _with_date_prefix(result, date_str)
 
-        # Reorder models to try preferred_model first if specified
-        models_to_try = self._reorder_models(preferred_model)
+    def generate_summary_and_sf_note(self, thread_content, preferred_model=None, label=None):
+        """
+        Generates the thread summary and the SF Note in one structured-output request, so the
+        thread is sent (and paid for) once instead of twice.
 
-        for model_entry in models_to_try:
-            model_id = model_entry["id"]
-            provider = model_entry["provider"]
+        A model that answers without both fields is not asked again in combined mode; whatever
+        is missing is then generated with generate_thread_summary / generate_sf_note.
 
-            try:
-                if provider == "gemini":
-                    result = self._generate_gemini(model_id, sf_note_prompt)
-                elif provider == "openai":
-                    result = self._generate_openai(model_id, sf_note_prompt)
-                else:
-                    continue
+        Args:
+            thread_content: Formatted string containing the full email thread
+            preferred_model: Optional model ID to use for generation
+            label: Optional identifier (e.g. thread subject) for LLM metrics
 
-                if result:
-                    # Ensure the date is at the start (in case LLM didn't include it)
-                    if not result.strip().startswith(date_str):
-                        result = f"{date_str} {result.strip()}"
-                    return result
-            except Exception as e:
-                print(f"  -> Failed to generate SF Note with {model_id}: {e}")
-                continue
+        Returns:
+            Tuple of (summary, sf_note); either may be None if generation fails
+        """
+        return self._run_steps(self._summary_and_sf_note_steps(thread_content, preferred_model, label))
 
-        print("Error: All models failed to generate SF Note.")
-        return None
+    def _summary_and_sf_note_steps(self, thread_content, preferred_model, label):
+        if not self._has_models(preferred_model):
+            print("Error: No available models to generate summary.")
+            return None, None
+
+        date_str = _sf_note_date()
+        model_entry, result = yield from self._first_response_steps(
+            _summary_and_note_prompt(thread_content, date_str),
+            preferred_model,
+            kind="summary_sf_note",
+            label=label,
+            providers=SUMMARY_PROVIDERS,
+            json_mode=True,
+            validate=_is_complete_summary_and_note,
+            task="summary and SF Note",
+        )
+        summary, sf_note = _parse_summary_and_note(result) if result else (None, None)
+        if model_entry is not None and not (summary and sf_note):
+            print(f"  -> {model_entry['id']} did not return both fields; falling back to separate requests")
+
+        if summary is None:
+            summary = yield from self._thread_summary_steps(thread_content, preferred_model, label)
+        if sf_note is None:
+            sf_note = yield from self._sf_note_steps(thread_content, preferred_model, label)
+        else:
+            sf_note = _with_date_prefix(sf_note, date_str)
+        return summary, sf_note
 
     @staticmethod
     def test_gemini_connection(api_key):
@@ -611,7 +1114,7 @@ class LLMService:
             setup_ssl_environment(verify_option)
 
             client = genai.Client(
-                api_key=api_key, http_options=types.HttpOptions(client_args={"verify": verify_option})
+                api_key=api_key, http_options=types.HttpOptions(httpx_client=get_http_client(verify_option))
             )
             # Lightweight call to list models
             list(client.models.list())
@@ -642,17 +1145,7 @@ class LLMService:
             verify_option = get_ssl_verify_option(disable_ssl)
             setup_ssl_environment(verify_option)
 
-            OR_BASE_URL = "https://openrouter.ai/api/v1"
-
-            if isinstance(verify_option, str) and os.path.exists(verify_option):
-                client = OpenAI(base_url=OR_BASE_URL, api_key=api_key)
-            elif isinstance(verify_option, ssl.SSLContext):
-                import httpx
-
-                httpx_client = httpx.Client(verify=verify_option)
-                client = OpenAI(base_url=OR_BASE_URL, api_key=api_key, http_client=httpx_client)
-            else:
-                client = OpenAI(base_url=OR_BASE_URL, api_key=api_key)
+            client = OpenAI(base_url=OPENROUTER_BASE_URL, api_key=api_key, http_client=get_http_client(verify_option))
 
             # Lightweight call
             client.models.list()
@@ -670,24 +1163,11 @@ class LLMService:
             return False, "API Key is empty."
 
         try:
-            # OpenAI respects SSL_CERT_FILE and REQUESTS_CA_BUNDLE env vars
-            # These are set in _init_clients when SSL is configured
-            # For CERT_NONE, we need to use custom httpx client
             disable_ssl = load_ssl_config_helper()
             verify_option = get_ssl_verify_option(disable_ssl)
             setup_ssl_environment(verify_option)
 
-            # Set env vars if using certificate bundle
-            if isinstance(verify_option, str) and os.path.exists(verify_option):
-                client = OpenAI(api_key=api_key)
-            elif isinstance(verify_option, ssl.SSLContext):
-                # For CERT_NONE, we need custom httpx client
-                import httpx
-
-                httpx_client = httpx.Client(verify=verify_option)
-                client = OpenAI(api_key=api_key, http_client=httpx_client)
-            else:
-                client = OpenAI(api_key=api_key)
+            client = OpenAI(api_key=api_key, http_client=get_http_client(verify_option))
 
             # Lightweight call to list models
             client.models.list()
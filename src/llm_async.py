@@ -0,0 +1,210 @@
+"""
+asyncio API for LLMService.
+
+LLMService blocks a thread per request, so callers serialize network-bound work or spend a
+thread pool on it. AsyncLLMService (service.aio) offers the same generate_* methods as
+coroutines built on the SDKs' async clients. It shares everything else with the wrapped
+service: model discovery, fallback order, circuit breakers, rate limiter, response cache and
+metrics, so sync and async calls can be mixed in one run.
+
+The fallback, batch and summary logic is not repeated here: LLMService writes it once as
+*_steps generators that yield the model calls they need, and AsyncLLMService._run_steps awaits
+each call where LLMService._run_steps blocks on it.
+
+Async SDK clients are bound to the event loop that opened their connections, so they are
+created per running loop (on top of http_pool's per-loop async connection pool). aclose()
+releases them before the loop ends.
+"""
+
+import asyncio
+import time
+import weakref
+from typing import Any, Dict
+
+from google import genai
+from google.genai import types
+from openai import AsyncOpenAI
+
+from http_pool import close_async_http_clients, get_async_http_client
+from llm import OPENROUTER_BASE_URL, _batch_retry_parts, load_ssl_config_helper
+from ssl_utils import get_ssl_verify_option
+
+
+class AsyncLLMService:
+    """
+    Coroutine versions of LLMService's generate_* methods. Obtain one with LLMService.aio.
+
+    Concurrent calls are limited by the service's rate limiter, and at most
+    service.max_concurrency requests are in flight per event loop.
+    """
+
+    def __init__(self, service) -> None:
+        self.service = service
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _request_slots(self) -> asyncio.Semaphore:
+        """The running loop's semaphore of service.max_concurrency request slots."""
+        loop = asyncio.get_running_loop()
+        if loop not in self._slots:
+            self._slots[loop] = asyncio.Semaphore(self.service.max_concurrency)
+        return self._slots[loop]
+
+    def _client(self, provider: str) -> Any:
+        """Async SDK client for provider in the running loop, or None if the provider is not configured."""
+        clients = self._clients.setdefault(asyncio.get_running_loop(), {})
+        if provider not in clients:
+            clients[provider] = self._make_client(provider)
+        return clients[provider]
+
+    def _make_client(self, provider: str) -> Any:
+        service = self.service
+        configured = {
+            "gemini": service.gemini_client,
+            "openai": service.openai_client,
+            "openrouter": service.openrouter_client,
+        }
+        if not configured.get(provider):
+            return None
+        http_client = get_async_http_client(get_ssl_verify_option(load_ssl_config_helper()))
+        if provider == "gemini":
+            return genai.Client(
+                api_key=service.gemini_key, http_options=types.HttpOptions(httpx_async_client=http_client)
+            ).aio
+        if provider == "openai":
+            return AsyncOpenAI(api_key=service.openai_key, http_client=http_client, max_retries=0)
+        return AsyncOpenAI(
+            base_url=OPENROUTER_BASE_URL, api_key=service.openrouter_key, http_client=http_client, max_retries=0
+        )
+
+    async def generate_reply(self, email_body, system_prompt, preferred_model=None, label=None):
+        """See LLMService.generate_reply."""
+        return await self._run_steps(self.service._reply_steps(email_body, system_prompt, preferred_model, label))
+
+    async def _run_steps(self, steps):
+        """See LLMService._run_steps; each model call is awaited instead of blocking a thread."""
+        try:
+            request = next(steps)
+            while True:
+                try:
+                    response = await self._call_model(**request)
+                except Exception as e:
+                    request = steps.throw(e)
+                else:
+                    request = steps.send(response)
+        except StopIteration as stop:
+            return stop.value
+
+    async def _call_model(self, provider, model_id, prompt, json_mode=False, validate=None, kind="reply", label=None):
+        """See LLMService._call_model; waits for rate-limit budget and retries without blocking the loop."""
+        if provider not in ("gemini", "openai", "openrouter"):
+            return None
+
+        service = self.service
+        key, cached = service._cache_lookup(provider, model_id, prompt, json_mode, kind, label)
+        if cached is not None:
+            return cached
+
+        async def generate():
+            # One of the loop's max_concurrency request slots per attempt, as in the sync path
+            async with self._request_slots():
+                if provider == "gemini":
+                    return await self._generate_gemini(model_id, prompt, json_mode=json_mode)
+                return await self._generate_openai(
+                    provider, model_id, prompt, json_mode=json_mode and provider == "openai"
+                )
+
+        start = time.perf_counter()
+        try:
+            result = await service.rate_limiter.acall(
+                provider, generate, tokens=service._budget_tokens(provider, prompt)
+            )
+        except Exception as e:
+            service._call_failed(provider, model_id, prompt, time.perf_counter() - start, kind, label, e)
+            raise
+        service._call_done(key, provider, model_id, prompt, result, time.perf_counter() - start, kind, label, validate)
+        return result
+
+    async def _generate_gemini(self, model_id, prompt, json_mode=False):
+        client = self._client("gemini")
+        if not client:
+            return ""
+        config = {"response_mime_type": "application/json"} if json_mode else None
+        response = await client.models.generate_content(model=model_id, contents=prompt, config=config)
+        return response.text.strip() if response.text else ""
+
+    async def _generate_openai(self, provider, model_id, prompt, json_mode=False):
+        """OpenAI and OpenRouter (OpenAI-compatible; called without response_format, as in the sync path)."""
+        client = self._client(provider)
+        if not client:
+            return ""
+        if json_mode:
+            completion = await client.chat.completions.create(
+                model=model_id,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that outputs JSON."},
+                    {"role": "user", "content": prompt},
+                ],
+                response_format={"type": "json_object"},
+            )
+        else:
+            completion = await client.chat.completions.create(
+                model=model_id, messages=[{"role": "user", "content": prompt}]
+            )
+        content = completion.choices[0].message.content
+        return content.strip() if content else ""
+
+    async def generate_batch_replies(self, email_batch, system_prompt, preferred_model=None):
+        """See LLMService.generate_batch_replies; sub-batches run as concurrent tasks."""
+        service = self.service
+        if not email_batch or not service._has_models(preferred_model):
+            return {}
+
+        prompt_intro, chunks = service._plan_batch(email_batch, system_prompt, preferred_model)
+
+        results: Dict[str, str] = {}
+        for chunk_results in await asyncio.gather(
+            *(self._generate_batch_adaptive(chunk, prompt_intro, preferred_model) for chunk in chunks)
+        ):
+            results.update(chunk_results)
+        return results
+
+    async def _generate_batch_adaptive(self, chunk, prompt_intro, preferred_model):
+        """See LLMService._generate_batch_adaptive; the halves are retried concurrently."""
+        results, shrinkable = await self._run_steps(
+            self.service._batch_chunk_steps(chunk, prompt_intro, preferred_model)
+        )
+        parts = _batch_retry_parts(chunk, results, shrinkable)
+        for part_results in await asyncio.gather(
+            *(self._generate_batch_adaptive(part, prompt_intro, preferred_model) for part in parts)
+        ):
+            results.update(part_results)
+        return results
+
+    async def generate_thread_summary(self, thread_content, preferred_model=None, label=None):
+        """See LLMService.generate_thread_summary."""
+        return await self._run_steps(self.service._thread_summary_steps(thread_content, preferred_model, label))
+
+    async def generate_sf_note(self, thread_content, preferred_model=None, label=None):
+        """See LLMService.generate_sf_note."""
+        return await self._run_steps(self.service._sf_note_steps(thread_content, preferred_model, label))
+
+    async def generate_summary_and_sf_note(self, thread_content, preferred_model=None, label=None):
+        """See LLMService.generate_summary_and_sf_note."""
+        return await self._run_steps(self.service._summary_and_sf_note_steps(thread_content, preferred_model, label))
+
+    async def aclose(self) -> None:
+        """
+        Closes the running loop's SDK clients and pooled connections. Call it before the loop
+        ends (e.g. at the end of the coroutine passed to asyncio.run); later calls in the same
+        loop open fresh ones.
+        """
+        loop = asyncio.get_running_loop()
+        # The SDK clients hold no connections of their own: they all sit on the pooled httpx clients
+        self._clients.pop(loop, None)
+        self._slots.pop(loop, None)
+        await close_async_http_clients()
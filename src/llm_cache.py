@@ -0,0 +1,138 @@
+"""
+On-disk response cache for LLM calls.
+
+Entries are content-addressed by a hash of provider, model ID and the full prompt, so
+re-running over unchanged threads (e.g. after a crash halfway through) costs nothing.
+The cache enforces a TTL and a total size cap with least-recently-used eviction.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from config import LLM_CACHE_PATH
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+"""
+
+
+class ResponseCache:
+    """
+    SQLite-backed LRU cache of LLM responses with a TTL and a size cap.
+    Thread-safe; the connection is opened lazily on first use.
+    """
+
+    def __init__(
+        self,
+        db_path: str = LLM_CACHE_PATH,
+        max_bytes: int = 100 * 1024 * 1024,
+        ttl_seconds: float = 7 * 24 * 3600,
+    ) -> None:
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(provider: str, model_id: str, prompt: str, json_mode: bool = False) -> str:
+        """Returns the content address for a request."""
+        h = hashlib.sha256()
+        for part in (provider, model_id, "json" if json_mode else "text", prompt):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def get(self, key: str) -> str | None:
+        """Returns the cached response, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """Stores a response and evicts least-recently-used entries beyond the size cap."""
+        size = len(value.encode("utf-8"))
+        if self.max_bytes and size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds:
+            cur = conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            self.evictions += max(cur.rowcount, 0)
+        if not self.max_bytes:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict[str, int | float]:
+        """Returns hit/miss counters for this process."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,231 @@
+"""
+Circuit breakers and health scores for LLM endpoints.
+
+LLMService walks a fallback chain of models for every request. Without memory between requests a
+dead provider (expired key, proxy blocking the host) is retried model by model on every call.
+HealthTracker keeps, for the lifetime of a run:
+- a circuit breaker per model and per provider, so failing endpoints are skipped without a request
+- a health score per model (smoothed success rate and latency), used to order the fallback chain
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Score of a model that has not been called yet: healthy models that answer within a few seconds
+# rank above it, failing or very slow ones below it.
+UNTRIED_SCORE = 0.5
+
+# Latency (seconds) at which a model's score is halved
+LATENCY_SCALE_S = 10.0
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    closed: requests pass; failure_threshold consecutive failures open the breaker.
+    open: requests are rejected until reset_timeout has passed, then one probe is let through.
+    half-open: the probe's success closes the breaker, its failure opens it again. A probe that
+    never reports back (the caller skipped the model) is replaced after another reset_timeout.
+    """
+
+    def __init__(
+        self, failure_threshold: int = 3, reset_timeout: float = 60.0, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        now = self._clock()
+        if self._probe_at is None or now - self._probe_at >= self.reset_timeout:
+            self._probe_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probe_at = None
+
+    def release_probe(self) -> None:
+        """Returns an unused half-open probe, so the next allow() can send one straight away."""
+        self._probe_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = self._clock()
+            self._probe_at = None
+
+
+class _ModelStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.failures = 0
+        self.success_rate: Optional[float] = None
+        self.latency_s: Optional[float] = None
+
+    def score(self) -> float:
+        if self.success_rate is None:
+            return UNTRIED_SCORE
+        latency = self.latency_s if self.latency_s is not None else LATENCY_SCALE_S
+        return self.success_rate / (1.0 + latency / LATENCY_SCALE_S)
+
+
+class HealthTracker:
+    """
+    Per-model and per-provider breakers plus per-model health scores. Thread-safe.
+
+    Args:
+        failure_threshold: Consecutive failures that open a model's breaker
+        reset_timeout: Seconds an open breaker rejects requests before a probe is allowed
+        provider_failure_threshold: Consecutive failures, across all of a provider's models,
+            that open the provider's breaker (defaults to failure_threshold)
+        smoothing: Weight of the newest observation in the success-rate and latency averages
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_timeout: float = 60.0,
+        provider_failure_threshold: Optional[int] = None,
+        smoothing: float = 0.3,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.provider_failure_threshold = provider_failure_threshold or failure_threshold
+        self.smoothing = smoothing
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._model_breakers: Dict[tuple[str, str], CircuitBreaker] = {}
+        self._provider_breakers: Dict[str, CircuitBreaker] = {}
+        self._stats: Dict[tuple[str, str], _ModelStats] = {}
+        self.skipped = 0
+
+    def _model_breaker(self, provider: str, model_id: str) -> CircuitBreaker:
+        key = (provider, model_id)
+        if key not in self._model_breakers:
+            self._model_breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout, self._clock)
+        return self._model_breakers[key]
+
+    def _provider_breaker(self, provider: str) -> CircuitBreaker:
+        if provider not in self._provider_breakers:
+            self._provider_breakers[provider] = CircuitBreaker(
+                self.provider_failure_threshold, self.reset_timeout, self._clock
+            )
+        return self._provider_breakers[provider]
+
+    def allow(self, provider: str, model_id: str) -> bool:
+        """
+        True if neither the provider's nor the model's breaker is open. Counts rejections in skipped.
+
+        The provider is asked first, so a half-open model's probe is not spent on a request the
+        provider rejects; a provider probe granted to a model whose own breaker is open is handed back.
+        """
+        with self._lock:
+            provider_breaker = self._provider_breaker(provider)
+            allowed = provider_breaker.allow()
+            if allowed and not self._model_breaker(provider, model_id).allow():
+                if provider_breaker.state == "half-open":
+                    provider_breaker.release_probe()
+                allowed = False
+            if not allowed:
+                self.skipped += 1
+            return allowed
+
+    def record(
+        self, provider: str, model_id: str, success: bool, latency_s: float, provider_fault: bool = True
+    ) -> None:
+        """
+        Records the outcome of one live request (cache hits should not be recorded).
+
+        Args:
+            provider_fault: For a failure, whether it says the provider is failing (transport, auth,
+                5xx). Failures that belong to one model or request, such as an unknown model ID or a
+                prompt that is too large, only count against the model's breaker.
+        """
+        with self._lock:
+            stats = self._stats.setdefault((provider, model_id), _ModelStats())
+            stats.calls += 1
+            outcome = 1.0 if success else 0.0
+            if stats.success_rate is None:
+                stats.success_rate = outcome
+            else:
+                stats.success_rate += self.smoothing * (outcome - stats.success_rate)
+
+            if success:
+                if stats.latency_s is None:
+                    stats.latency_s = latency_s
+                else:
+                    stats.latency_s += self.smoothing * (latency_s - stats.latency_s)
+                self._model_breaker(provider, model_id).record_success()
+                self._provider_breaker(provider).record_success()
+            else:
+                stats.failures += 1
+                self._model_breaker(provider, model_id).record_failure()
+                if provider_fault:
+                    self._provider_breaker(provider).record_failure()
+
+    def score(self, provider: str, model_id: str) -> float:
+        with self._lock:
+            stats = self._stats.get((provider, model_id))
+            return stats.score() if stats else UNTRIED_SCORE
+
+    def rank(self, entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Model entries ordered by health score, best first; ties keep their original order."""
+        return sorted(entries, key=lambda m: -self.score(m["provider"], m["id"]))
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-model stats and breaker states, for end-of-run reporting."""
+        with self._lock:
+            models = [
+                {
+                    "provider": provider,
+                    "model": model_id,
+                    "calls": stats.calls,
+                    "failures": stats.failures,
+                    "score": round(stats.score(), 3),
+                    "latency_s": stats.latency_s,
+                    "breaker": self._model_breaker(provider, model_id).state,
+                }
+                for (provider, model_id), stats in self._stats.items()
+            ]
+            providers = {name: breaker.state for name, breaker in self._provider_breakers.items()}
+        models.sort(key=lambda m: -m["score"])
+        return {"models": models, "providers": providers, "skipped": self.skipped}
+
+    def print_summary(self) -> None:
+        stats = self.summary()
+        if not stats["models"]:
+            return
+        print("\n--- LLM Endpoint Health ---")
+        for m in stats["models"]:
+            latency = f"{m['latency_s']:.1f}s" if m["latency_s"] is not None else "n/a"
+            print(
+                f"  {m['provider']}:{m['model']}: {m['calls']} calls, {m['failures']} failed, "
+                f"avg {latency}, score {m['score']:.2f} ({m['breaker']})"
+            )
+        open_providers = [name for name, state in stats["providers"].items() if state != "closed"]
+        if open_providers:
+            print(f"  Providers with open breakers: {', '.join(sorted(open_providers))}")
+        if stats["skipped"]:
+            print(f"  Requests skipped by open breakers: {stats['skipped']}")
@@ -0,0 +1,164 @@
+"""
+Token estimation and per-call instrumentation for LLM requests.
+
+Every request made through LLMService can be recorded (prompt size, estimated tokens, latency,
+model, provider) to a JSONL file and summarised at the end of a run.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Optional
+
+from config import LLM_METRICS_PATH
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+class CharRatioEstimator:
+    """Dependency-free estimate: a fixed number of characters per token (~4 for English text)."""
+
+    name = "chars"
+
+    def __init__(self, chars_per_token: float = 4.0) -> None:
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return int(len(text) / self.chars_per_token) + 1
+
+
+class TiktokenEstimator:
+    """BPE token counts via tiktoken (optional dependency). Close enough for non-OpenAI models too."""
+
+    name = "tiktoken"
+
+    def __init__(self, encoding_name: str = "o200k_base") -> None:
+        if tiktoken is None:
+            raise ImportError("tiktoken is not installed")
+        self._encoding = tiktoken.get_encoding(encoding_name)
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def get_token_estimator(name: str = "auto"):
+    """
+    Returns a token estimator by name: 'chars', 'tiktoken', or 'auto' (tiktoken if installed, else chars).
+    Any object with a count(text) -> int method can be used in place of these.
+    """
+    if name in ("tiktoken", "auto") and tiktoken is not None:
+        try:
+            return TiktokenEstimator()
+        except Exception as e:
+            print(f"Warning: tiktoken unavailable ({e}); falling back to character estimate.")
+    elif name == "tiktoken":
+        print("Warning: tiktoken is not installed; falling back to character estimate.")
+    return CharRatioEstimator()
+
+
+class MetricsRecorder:
+    """
+    Collects one record per LLM call and appends it to a JSONL file.
+    Thread-safe, so concurrent summary and batch calls can share a recorder.
+    """
+
+    def __init__(self, path: Optional[str] = LLM_METRICS_PATH, estimator=None) -> None:
+        self.path = path
+        self.estimator = estimator or get_token_estimator()
+        self.records: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        kind: str,
+        provider: str,
+        model: str,
+        prompt: str,
+        output: Optional[str],
+        latency_s: float,
+        success: bool,
+        cached: bool = False,
+        label: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> dict[str, Any]:
+        entry = {
+            "ts": time.time(),
+            "kind": kind,
+            "label": label,
+            "provider": provider,
+            "model": model,
+            "prompt_chars": len(prompt),
+            "prompt_tokens": self.estimator.count(prompt),
+            "output_chars": len(output or ""),
+            "output_tokens": self.estimator.count(output or ""),
+            "latency_s": round(latency_s, 3),
+            "success": success,
+            "cached": cached,
+            "estimator": getattr(self.estimator, "name", type(self.estimator).__name__),
+        }
+        if error:
+            entry["error"] = error[:500]
+
+        with self._lock:
+            self.records.append(entry)
+            if self.path:
+                try:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    print(f"Warning: Could not write LLM metrics: {e}")
+        return entry
+
+    def summary(self) -> dict[str, Any]:
+        """Aggregates the records collected in this process."""
+        with self._lock:
+            records = list(self.records)
+
+        by_kind: dict[str, dict[str, Any]] = {}
+        for r in records:
+            agg = by_kind.setdefault(r["kind"], {"calls": 0, "prompt_tokens": 0, "output_tokens": 0, "latency_s": 0.0})
+            agg["calls"] += 1
+            agg["prompt_tokens"] += r["prompt_tokens"]
+            agg["output_tokens"] += r["output_tokens"]
+            agg["latency_s"] += r["latency_s"]
+
+        live = [r for r in records if not r["cached"]]
+        return {
+            "calls": len(records),
+            "cached": len(records) - len(live),
+            "failed": sum(1 for r in records if not r["success"]),
+            "prompt_tokens": sum(r["prompt_tokens"] for r in live),
+            "output_tokens": sum(r["output_tokens"] for r in live),
+            "latency_s": sum(r["latency_s"] for r in live),
+            "by_kind": by_kind,
+            "largest": sorted(records, key=lambda r: r["prompt_tokens"], reverse=True)[:5],
+        }
+
+    def print_summary(self) -> None:
+        stats = self.summary()
+        if not stats["calls"]:
+            return
+        print("\n--- LLM Usage Summary ---")
+        print(f"  Calls: {stats['calls']} ({stats['cached']} cached, {stats['failed']} failed)")
+        print(
+            f"  Prompt tokens: ~{stats['prompt_tokens']:,} | Output tokens: ~{stats['output_tokens']:,} | "
+            f"Total latency: {stats['latency_s']:.1f}s"
+        )
+        for kind, agg in sorted(stats["by_kind"].items()):
+            avg = agg["latency_s"] / agg["calls"] if agg["calls"] else 0.0
+            print(f"    {kind}: {agg['calls']} calls, ~{agg['prompt_tokens']:,} prompt tokens, avg {avg:.1f}s")
+        print("  Largest prompts:")
+        for r in stats["largest"]:
+            label = f" [{r['label']}]" if r.get("label") else ""
+            print(f"    {r['kind']}{label}: ~{r['prompt_tokens']:,} tokens ({r['provider']}:{r['model']})")
+        if self.path:
+            print(f"  Per-call records: {self.path}")
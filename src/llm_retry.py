@@ -0,0 +1,268 @@
+"""
+Retries and client-side rate limiting for LLM requests.
+
+Without this a single 429 or transient 5xx makes LLMService fall over to the next model, and
+concurrent fan-out (summaries, batch sub-batches) keeps hitting a provider that already asked it
+to slow down. RateLimiter wraps each provider call with:
+- per-provider token buckets (requests and prompt tokens per minute), so concurrent callers queue
+  locally instead of tripping the provider's quota
+- retries with jittered exponential backoff for rate limits, overloads and connection errors,
+  honouring Retry-After and OpenAI-style x-ratelimit-reset-* headers when the error carries them
+- a provider-wide pause after a 429, so every thread backs off, not just the one that was refused
+"""
+
+import asyncio
+import email.utils
+import random
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying on the same model
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+# Exception class names (from openai, httpx, google-genai) that mean the request never got an answer
+_TRANSIENT_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "ConnectError",
+    "ConnectTimeout",
+    "ReadTimeout",
+    "RemoteProtocolError",
+    "ReadError",
+    "WriteError",
+    "PoolTimeout",
+}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a provider error (openai: status_code, google-genai: code), if any."""
+    for attr in ("status_code", "code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    return isinstance(error, (ConnectionError, TimeoutError)) or any(
+        cls.__name__ in _TRANSIENT_ERROR_NAMES for cls in type(error).__mro__
+    )
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Seconds from '20', '1.5s', '250ms', '6m0s' or '1h2m3s'; None if unparseable."""
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(n + u for n, u in parts) != value:
+        return None
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(n) * scale[u] for n, u in parts)
+
+
+def retry_after_seconds(error: BaseException, now: Optional[float] = None) -> Optional[float]:
+    """
+    Wait requested by the provider in an error response: retry-after-ms, Retry-After (seconds or
+    HTTP date), or the longer of x-ratelimit-reset-requests / x-ratelimit-reset-tokens.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        get = headers.get
+    except AttributeError:
+        return None
+
+    value = get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+
+    value = get("retry-after")
+    if value:
+        seconds = _parse_duration(value)
+        if seconds is not None:
+            return seconds
+        try:
+            when = email.utils.parsedate_to_datetime(value).timestamp()
+            return max(0.0, when - (now if now is not None else time.time()))
+        except (TypeError, ValueError):
+            pass
+
+    resets = [_parse_duration(get(h) or "") for h in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+class TokenBucket:
+    """
+    Refills at rate per second up to capacity. reserve() debits immediately (the level may go
+    negative) and returns how long the caller must wait, so waiting happens outside the lock and
+    concurrent callers are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        with self._lock:
+            now = self._clock()
+            self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+            self._updated = now
+            self.level -= amount
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+
+class _ProviderState:
+    def __init__(self, limits: Dict[str, Any], clock: Callable[[], float]) -> None:
+        self.requests: Optional[TokenBucket] = None
+        self.tokens: Optional[TokenBucket] = None
+        rpm = limits.get("requests_per_minute")
+        tpm = limits.get("tokens_per_minute")
+        if rpm:
+            self.requests = TokenBucket(rpm / 60.0, max(1.0, rpm / 60.0 * limits.get("burst_seconds", 10)), clock)
+        if tpm:
+            self.tokens = TokenBucket(tpm / 60.0, tpm / 60.0 * limits.get("burst_seconds", 10), clock)
+        self.paused_until = 0.0
+
+
+class RateLimiter:
+    """
+    Runs provider calls under per-provider budgets, retrying transient failures.
+
+    Args:
+        limits: {provider: {"requests_per_minute": n, "tokens_per_minute": n, "burst_seconds": s}};
+            providers without an entry are not throttled locally (retries still apply)
+        max_retries: Retries after the first attempt
+        base_delay: First backoff step in seconds (doubles per attempt, with full jitter)
+        max_delay: Longest wait accepted for one retry; a provider asking for longer fails
+            immediately so the caller can move on to another model
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, Any]]] = None,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.limits = limits or {}
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._providers: Dict[str, _ProviderState] = {}
+        self.retries = 0
+        self.throttled_s = 0.0
+
+    def _state(self, provider: str) -> _ProviderState:
+        with self._lock:
+            if provider not in self._providers:
+                self._providers[provider] = _ProviderState(self.limits.get(provider, {}), self._clock)
+            return self._providers[provider]
+
+    def tracks_tokens(self, provider: str) -> bool:
+        """True if calls to provider should pass a prompt token estimate."""
+        return bool(self.limits.get(provider, {}).get("tokens_per_minute"))
+
+    def _turn_delay(self, state: _ProviderState, tokens: int) -> float:
+        """Reserves budget for one request and returns how long to wait before sending it."""
+        wait = max(0.0, state.paused_until - self._clock())
+        if state.requests is not None:
+            wait = max(wait, state.requests.reserve(1))
+        if state.tokens is not None and tokens:
+            wait = max(wait, state.tokens.reserve(tokens))
+        if wait > 0:
+            with self._lock:
+                self.throttled_s += wait
+        return wait
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry (0-based)."""
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def _retry_delay(self, provider: str, state: _ProviderState, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying after error, or None if the error should be raised."""
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        requested = retry_after_seconds(error)
+        if requested is not None and requested > self.max_delay:
+            return None
+        if requested is not None:
+            delay = requested + self._rng.uniform(0, 0.1 * requested + 0.05)
+        else:
+            delay = self.backoff(attempt)
+        with self._lock:
+            if status_code(error) == 429:
+                # Hold back every caller for this provider, not only this one
+                state.paused_until = max(state.paused_until, self._clock() + delay)
+            self.retries += 1
+        print(f"  -> {provider} request failed ({error}); retrying in {delay:.1f}s")
+        return delay
+
+    def call(self, provider: str, fn: Callable[[], T], tokens: int = 0) -> T:
+        """
+        Calls fn() within provider's budget, retrying retryable errors.
+
+        Raises:
+            The last error, once retries are exhausted, the error is not retryable, or the
+            provider asks to wait longer than max_delay.
+        """
+        state = self._state(provider)
+        attempt = 0
+        while True:
+            wait = self._turn_delay(state, tokens)
+            if wait > 0:
+                self._sleep(wait)
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._retry_delay(provider, state, e, attempt)
+                if delay is None:
+                    raise
+                self._sleep(delay)
+                attempt += 1
+
+    async def acall(self, provider: str, fn: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        """asyncio version of call(): fn returns an awaitable and waits do not block the event loop."""
+        state = self._state(provider)
+        attempt = 0
+        while True:
+            wait = self._turn_delay(state, tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await fn()
+            except Exception as e:
+                delay = self._retry_delay(provider, state, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
@@ -0,0 +1,212 @@
+"""
+Mail backends.
+
+The pipeline talks to a mailbox through the MailBackend protocol. OutlookClient (AppleScript via
+osascript) is the production implementation; FakeMailbox is an in-process synthetic mailbox that
+produces the same wire format, so scraping, reply drafting and cold outreach can be tested and
+benchmarked end-to-end without a Mac. It is deliberately not selectable for real runs.
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Protocol, runtime_checkable
+
+from config import APPLESCRIPTS_DIR, BODY_END, BODY_START, MSG_DELIMITER
+from outlook_client import OutlookClient
+from script_host import ScriptWorker
+
+FLAGGED_SCRIPT = "get_flagged_threads.scpt"
+RECENT_SCRIPT = "get_recent_threads.scpt"
+
+
+@runtime_checkable
+class MailBackend(Protocol):
+    """Operations the pipeline needs from a mailbox."""
+
+    def activate_outlook(self) -> None: ...
+
+    def stream_script(
+        self, script_name: str, args: Optional[list[str]] = None, chunk_size: int = 64 * 1024
+    ) -> Iterator[str]:
+        """Yields a scrape export (MSG_DELIMITER-separated message blocks) in chunks."""
+        ...
+
+    def reply_to_messages(self, items: list[tuple[str, str, str]], max_per_call: int = 50) -> list[str]: ...
+
+    def create_draft(self, to_address: str, subject: str, content: str, bcc_address: str = "") -> Optional[str]: ...
+
+    def get_sent_recipients(self) -> set[str]: ...
+
+    def iter_sent_messages(self, since_seconds: Optional[int] = None) -> Iterator[tuple[datetime, list[str]]]:
+        """
+        Yields (sent time, recipient addresses) per Sent Items message, optionally only recent ones.
+        Raises if the listing fails part way, rather than ending early.
+        """
+        ...
+
+    def close(self) -> None: ...
+
+
+_FIRST_NAMES = ["Alex", "Jordan", "Sam", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Drew", "Avery"]
+_COMPANIES = ["Northwind", "Contoso", "Fabrikam", "Tailspin", "Litware", "Adatum", "Proseware", "Wingtip"]
+_TOPICS = ["Q3 capital call", "LP portal rollout", "Fund II reporting", "Data migration", "Quarterly review"]
+_SENTENCES = [
+    "Thanks for sending this over.",
+    "Could you confirm the numbers before Friday?",
+    "We are still waiting on the final figures from the administrator.",
+    "Happy to set up a call next week to walk through it.",
+    "Please see the attached summary and let me know if anything is missing.",
+    "Following up on the thread below.",
+    "The team has reviewed the draft and has a few comments.",
+]
+
+
+class FakeMailbox:
+    """
+    Deterministic synthetic mailbox implementing MailBackend.
+
+    Messages are generated on the fly while streaming (nothing is held in memory), grouped into
+    conversations of messages_per_thread, with every flag_every-th conversation flagged. Replies
+    and drafts are recorded in self.drafts instead of touching a mail client.
+    """
+
+    def __init__(
+        self,
+        message_count: int = 100_000,
+        messages_per_thread: int = 5,
+        flag_every: int = 10,
+        body_sentences: int = 6,
+        sent_recipient_count: int = 1_000,
+        seed: int = 0,
+        now: Optional[datetime] = None,
+    ) -> None:
+        self.message_count = message_count
+        self.messages_per_thread = max(1, messages_per_thread)
+        self.flag_every = max(1, flag_every)
+        self.body_sentences = body_sentences
+        self.sent_recipient_count = sent_recipient_count
+        self.seed = seed
+        self.now = (now or datetime.now()).replace(microsecond=0)
+        self.drafts: list[dict[str, str]] = []
+        self.scrape_calls = 0
+
+    @property
+    def conversation_count(self) -> int:
+        return -(-self.message_count // self.messages_per_thread)
+
+    def is_flagged(self, conversation: int) -> bool:
+        return conversation % self.flag_every == 0
+
+    def message_time(self, index: int) -> datetime:
+        """Message 0 is the oldest; messages are ten minutes apart up to self.now."""
+        return self.now - timedelta(minutes=10 * (self.message_count - 1 - index))
+
+    def _render(self, index: int, rng: random.Random, flagged: bool, omit_body: bool) -> str:
+        conversation = index // self.messages_per_thread
+        sender = _FIRST_NAMES[index % len(_FIRST_NAMES)]
+        company = _COMPANIES[conversation % len(_COMPANIES)]
+        topic = _TOPICS[conversation % len(_TOPICS)]
+        sent = self.message_time(index)
+        date_text = sent.strftime("%A, %B %d, %Y at %I:%M:%S %p").replace(" 0", " ")
+        prefix = "" if index % self.messages_per_thread == 0 else "Re: "
+
+        lines = [
+            f"ID: conv-{conversation}",
+            f"MessageID: {index + 1}",
+            f"From: {sender} {company} <{sender.lower()}@{company.lower()}.com>",
+            f"Date: {date_text}",
+            f"Subject: {prefix}{topic} - {company}",
+            f"FlagStatus: {'Active' if flagged else 'Not Flagged'}",
+        ]
+        if omit_body:
+            lines.append("BodyOmitted: true")
+        else:
+            body = " ".join(rng.choice(_SENTENCES) for _ in range(self.body_sentences))
+            if prefix:
+                quoted = " ".join(rng.choice(_SENTENCES) for _ in range(self.body_sentences))
+                body += f"\n\nOn {date_text}, {_FIRST_NAMES[(index - 1) % len(_FIRST_NAMES)]} wrote:\n> {quoted}"
+            lines += [BODY_START, f"Hi,\n\n{body}\n\nBest,\n{sender}", BODY_END]
+        return "\n".join(lines)
+
+    def iter_blocks(self, flagged_only: bool = False, args: Optional[list[str]] = None) -> Iterator[str]:
+        """
+        Yields one wire-format block per message, mirroring the AppleScript exports. For the flagged
+        export, args follow get_flagged_threads.scpt: [since_seconds, known conversation IDs...].
+        """
+        since: Optional[datetime] = None
+        known: set[str] = set()
+        if args:
+            since = self.now - timedelta(seconds=int(args[0]))
+            known = set(args[1:])
+
+        rng = random.Random(self.seed)
+        for index in range(self.message_count):
+            conversation = index // self.messages_per_thread
+            flagged = self.is_flagged(conversation)
+            if flagged_only and not flagged:
+                continue
+            omit_body = since is not None and f"conv-{conversation}" in known and self.message_time(index) < since
+            yield self._render(index, rng, flagged, omit_body)
+
+    # --- MailBackend ---
+
+    def activate_outlook(self) -> None:
+        pass
+
+    def stream_script(
+        self, script_name: str, args: Optional[list[str]] = None, chunk_size: int = 64 * 1024
+    ) -> Iterator[str]:
+        if script_name not in (FLAGGED_SCRIPT, RECENT_SCRIPT):
+            return
+        self.scrape_calls += 1
+
+        buffer: list[str] = []
+        size = 0
+        first = True
+        for block in self.iter_blocks(flagged_only=script_name == FLAGGED_SCRIPT, args=args):
+            piece = block if first else MSG_DELIMITER + block
+            first = False
+            buffer.append(piece)
+            size += len(piece)
+            if size >= chunk_size:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+
+    def reply_to_messages(self, items: list[tuple[str, str, str]], max_per_call: int = 50) -> list[str]:
+        statuses = []
+        for message_id, content, bcc_address in items:
+            if not str(message_id).isdigit() or not 0 < int(message_id) <= self.message_count:
+                statuses.append(f"Error: Message not found with ID {message_id}")
+                continue
+            self.drafts.append({"reply_to": str(message_id), "content": content, "bcc": bcc_address})
+            statuses.append("Success: Draft created.")
+        return statuses
+
+    def create_draft(self, to_address: str, subject: str, content: str, bcc_address: str = "") -> Optional[str]:
+        self.drafts.append({"to": to_address, "subject": subject, "content": content, "bcc": bcc_address})
+        return "Draft created"
+
+    def get_sent_recipients(self) -> set[str]:
+        return {address for _, addresses in self.iter_sent_messages() for address in addresses}
+
+    def iter_sent_messages(self, since_seconds: Optional[int] = None) -> Iterator[tuple[datetime, list[str]]]:
+        """One sent message per recipient, an hour apart, newest first."""
+        since = self.now - timedelta(seconds=since_seconds) if since_seconds is not None else None
+        for i in range(self.sent_recipient_count):
+            sent = self.now - timedelta(hours=i)
+            if since is not None and sent < since:
+                break
+            yield sent, [f"contact{i}@{_COMPANIES[i % len(_COMPANIES)].lower()}.com"]
+
+    def close(self) -> None:
+        pass
+
+
+def create_mail_backend(script_worker: bool = True) -> MailBackend:
+    """
+    Builds the production backend (Outlook via AppleScript). FakeMailbox is only for tests and
+    benchmarks, which construct it directly with their own stores and no real LLM calls.
+    """
+    return OutlookClient(APPLESCRIPTS_DIR, worker=ScriptWorker() if script_worker else None)
@@ -1,20 +1,57 @@
+import asyncio
 import os
 import re
 import time
 import traceback
 from collections import Counter
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable
 
 import yaml
 
 import llm
 from cold_outreach import process_cold_outreach
-from config import APPLESCRIPTS_DIR, COLD_OUTREACH_PROMPT_PATH, CONFIG_PATH, OUTPUT_DIR, SYSTEM_PROMPT_PATH
-from date_utils import get_current_date_context, get_latest_date
-from outlook_client import OutlookClient, get_outlook_version
-from scraper import run_scraper
-from word_doc import create_summary_document, format_thread_content
+from config import (
+    COLD_OUTREACH_PROMPT_PATH,
+    COLD_OUTREACH_SCORING_WEIGHTS,
+    COMBINED_SUMMARY_REQUEST,
+    CONFIG_PATH,
+    INCREMENTAL_SYNC,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_SECONDS,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_MB,
+    LLM_CACHE_TTL_HOURS,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_METRICS_ENABLED,
+    LLM_RATE_LIMITS,
+    MODEL_CATALOG_TTL_HOURS,
+    OUTPUT_DIR,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINED_FOLLOW_UP,
+    SCRIPT_WORKER_ENABLED,
+    SENT_INDEX_ENABLED,
+    STRIP_QUOTED_HISTORY,
+    SUPPRESSION_FALSE_POSITIVE_RATE,
+    SUPPRESSION_LISTS,
+    SYSTEM_PROMPT_PATH,
+    TOKEN_ESTIMATOR,
+)
+from date_utils import date_cache_stats, get_current_date_context, get_latest_date
+from llm_cache import ResponseCache
+from llm_health import HealthTracker
+from llm_metrics import MetricsRecorder, get_token_estimator
+from llm_retry import RateLimiter
+from mail_backend import MailBackend, create_mail_backend
+from message_store import MessageStore, thread_fingerprint
+from model_catalog import ModelCatalog
+from outlook_client import get_outlook_version
+from pipeline import Pipeline
+from scraper import iter_flagged_threads, run_scraper
+from sent_index import SentRecipientIndex
+from suppression import SuppressionList
+from word_doc import create_summary_document, format_thread_content_with_stats
 
 
 def print_separator(char: str = "-", length: int = 30) -> None:
@@ -62,63 +99,115 @@ def load_system_prompt() -> str:
         return "You are a helpful assistant."
 
 
-def filter_threads_for_replies(threads: list[list[dict[str, Any]]], days_threshold: int) -> list[dict[str, Any]]:
+def _latest_activity(thread: list[dict[str, Any]]) -> tuple[datetime | None, datetime | None]:
+    """Returns (latest header timestamp, latest date found in any body) for a thread."""
+    header_dates = [m["timestamp"] for m in thread if m.get("timestamp") and m.get("timestamp") != datetime.min]
+    body_dates = [d for d in (get_latest_date(m.get("content", "")) for m in thread) if d]
+    return (max(header_dates) if header_dates else None, max(body_dates) if body_dates else None)
+
+
+def filter_threads_for_replies(
+    threads: list[list[dict[str, Any]]], days_threshold: int, activity_index: MessageStore | None = None
+) -> list[dict[str, Any]]:
     """
     Identifies threads that need a reply based on flag status and activity date.
+    With an activity index, threads whose messages are unchanged since the last run reuse their
+    stored latest activity instead of rescanning every body.
     Returns a list of dicts: {'thread': thread, 'target_msg': msg, 'subject': subject}
     """
     candidates = []
+    fresh_activity: list[tuple[str, str, datetime | None, datetime | None]] = []
+    reused = 0
 
     for i, thread in enumerate(threads):
-        # 1. Check if thread has ANY active flag
-        has_active_flag = any(m.get("flag_status") == "Active" for m in thread)
+        candidate, was_reused = _reply_candidate(thread, i + 1, days_threshold, activity_index, fresh_activity)
+        reused += was_reused
+        if candidate:
+            candidates.append(candidate)
 
-        if not has_active_flag:
-            continue
+    _report_filter_stats(activity_index, reused, fresh_activity)
+    return candidates
+
+
+def _reply_candidate(
+    thread: list[dict[str, Any]],
+    number: int,
+    days_threshold: int,
+    activity_index: MessageStore | None,
+    fresh_activity: list[tuple[str, str, datetime | None, datetime | None]],
+) -> tuple[dict[str, Any] | None, bool]:
+    """
+    Checks one thread for filter_threads_for_replies.
+    Returns (candidate or None, whether its activity came from the index); rescanned activity for
+    the index is appended to fresh_activity.
+    """
+    # 1. Check if thread has ANY active flag
+    has_active_flag = any(m.get("flag_status") == "Active" for m in thread)
 
-        subject = thread[0].get("subject", "No Subject")
-        print(f"\nAnalyzing Thread {i + 1}: {subject}")
+    if not has_active_flag:
+        return None, False
 
-        # 2. Find the TRULY latest activity date
-        all_dates = []
-        for m in thread:
-            # Timestamp from header
-            if m.get("timestamp") and m.get("timestamp") != datetime.min:
-                all_dates.append(m.get("timestamp"))
+    subject = thread[0].get("subject", "No Subject")
+    print(f"\nAnalyzing Thread {number}: {subject}")
 
-            # Timestamp from body
-            buried_date = get_latest_date(m.get("content", ""))
-            if buried_date:
-                all_dates.append(buried_date)
+    # 2. Find the TRULY latest activity date (header timestamps and dates buried in bodies)
+    activity = None
+    reused = False
+    conversation_id = thread[0].get("id")
+    fingerprint = ""
+    if activity_index is not None and conversation_id:
+        fingerprint = thread_fingerprint(thread)
+        activity = activity_index.get_activity(conversation_id, fingerprint)
+        reused = activity is not None
+    if activity is None:
+        activity = _latest_activity(thread)
+        if fingerprint:
+            fresh_activity.append((conversation_id, fingerprint, *activity))
 
-        if not all_dates:
-            print("  -> Warning: Could not determine any activity date. Skipping.")
-            continue
+    all_dates = [d for d in activity if d]
+    if not all_dates:
+        print("  -> Warning: Could not determine any activity date. Skipping.")
+        return None, reused
 
-        latest_activity = max(all_dates)
-        days_ago = (datetime.now() - latest_activity).days
+    latest_activity = max(all_dates)
+    days_ago = (datetime.now() - latest_activity).days
 
-        print(f"  -> Latest activity: {latest_activity.strftime('%Y-%m-%d %H:%M:%S')} ({days_ago} days ago)")
+    print(f"  -> Latest activity: {latest_activity.strftime('%Y-%m-%d %H:%M:%S')} ({days_ago} days ago)")
 
-        # 3. Apply 7-day threshold
-        if days_ago <= days_threshold:
-            print(f"  -> Activity within {days_threshold} days. No reply needed yet.")
-            continue
+    # 3. Apply 7-day threshold
+    if days_ago <= days_threshold:
+        print(f"  -> Activity within {days_threshold} days. No reply needed yet.")
+        return None, reused
 
-        print(f"  -> No activity for > {days_threshold} days. Proceeding with draft.")
+    print(f"  -> No activity for > {days_threshold} days. Proceeding with draft.")
 
-        # 4. Find target message (latest in thread)
-        sorted_thread = sorted(thread, key=lambda m: m.get("timestamp", datetime.min))
-        target_msg = sorted_thread[-1]
+    # 4. Find target message (latest in thread)
+    sorted_thread = sorted(thread, key=lambda m: m.get("timestamp", datetime.min))
+    target_msg = sorted_thread[-1]
 
-        candidates.append({"thread": thread, "target_msg": target_msg, "subject": subject})
+    return {"thread": thread, "target_msg": target_msg, "subject": subject}, reused
 
-    return candidates
+
+def _report_filter_stats(
+    activity_index: MessageStore | None,
+    reused: int,
+    fresh_activity: list[tuple[str, str, datetime | None, datetime | None]],
+) -> None:
+    """Stores rescanned activity in the index and prints the filter's cache statistics."""
+    if activity_index is not None:
+        activity_index.put_activities(fresh_activity)
+        print(f"\nActivity index: {reused} unchanged threads reused, {len(fresh_activity)} rescanned.")
+
+    stats = date_cache_stats()
+    print(
+        f"Date parsing: {stats['misses']} distinct dates parsed, {stats['hits']} repeats served from cache "
+        f"({stats['hit_rate']:.0%} hit rate)"
+    )
 
 
 def process_replies(
     candidates: list[dict[str, Any]],
-    client: OutlookClient,
+    client: MailBackend,
     system_prompt: str,
     llm_service: llm.LLMService,
     preferred_model: str | None = None,
@@ -132,17 +221,7 @@ def process_replies(
         return
 
     # Prepare Batch
-    batch_jobs = []
-    for item in candidates:
-        target_msg = item["target_msg"]
-        msg_id = target_msg.get("message_id")
-
-        if not msg_id:
-            print(f"  -> Error: No Message ID found for target message in '{item['subject']}'.")
-            continue
-
-        batch_jobs.append({"id": msg_id, "subject": item["subject"], "content": target_msg.get("content", "")})
-
+    batch_jobs = [job for job in (_reply_job(item) for item in candidates) if job]
     if not batch_jobs:
         return
 
@@ -151,36 +230,62 @@ def process_replies(
 
     print(f"Received {len(batch_replies)} replies from LLM Service.")
 
-    for job in batch_jobs:
-        msg_id = job["id"]
-        subject = job["subject"]
-        reply_text = batch_replies.get(msg_id)
+    drafts = [draft for draft in (_draft_for(job, batch_replies) for job in batch_jobs) if draft]
+    create_draft_replies(client, drafts, salesforce_bcc)
 
-        if reply_text:
-            create_draft_reply(client, msg_id, subject, reply_text, salesforce_bcc)
-        else:
-            print(f"  -> Warning: No reply generated for '{subject}' (ID: {msg_id})")
 
+def _reply_job(candidate: dict[str, Any]) -> dict[str, Any] | None:
+    """Batch LLM job for a reply candidate, or None if its target message has no Message ID."""
+    target_msg = candidate["target_msg"]
+    msg_id = target_msg.get("message_id")
 
-def create_draft_reply(
-    client: OutlookClient, msg_id: str, subject: str, reply_text: str, bcc_address: str = ""
-) -> None:
-    """Creates the actual draft in Outlook."""
-    print(f"\nCreating draft for: {subject}")
-    print("#" * 30)
-    print(f"REPLY: {reply_text[:100]}...")
-    print("#" * 30)
+    if not msg_id:
+        print(f"  -> Error: No Message ID found for target message in '{candidate['subject']}'.")
+        return None
 
-    try:
+    return {"id": msg_id, "subject": candidate["subject"], "content": target_msg.get("content", "")}
+
+
+def _draft_for(job: dict[str, Any], batch_replies: dict[str, str]) -> tuple[str, str, str] | None:
+    """(message_id, subject, reply_text) for a batch job, or None (with a warning) if no reply came back."""
+    reply_text = batch_replies.get(job["id"])
+    if reply_text:
+        return (job["id"], job["subject"], reply_text)
+    print(f"  -> Warning: No reply generated for '{job['subject']}' (ID: {job['id']})")
+    return None
+
+
+def create_draft_replies(client: MailBackend, drafts: list[tuple[str, str, str]], bcc_address: str = "") -> None:
+    """Creates all drafts in Outlook in one batched script call.
+
+    Args:
+        client: Mail backend (Outlook or synthetic)
+        drafts: (message_id, subject, reply_text) tuples
+        bcc_address: Optional BCC added to every draft
+    """
+    if not drafts:
+        return
+
+    items = []
+    for msg_id, subject, reply_text in drafts:
+        print(f"\nCreating draft for: {subject}")
+        print("#" * 30)
+        print(f"REPLY: {reply_text[:100]}...")
+        print("#" * 30)
         # Prepare for AppleScript: convert newlines to <br> tags
         # The AppleScript will convert <br> back to newlines for typing
         # We don't need HTML escaping since we're using UI automation (keystrokes)
-        formatted_reply = reply_text.replace("\n", "<br>")
+        items.append((msg_id, reply_text.replace("\n", "<br>"), bcc_address))
 
-        result = client.reply_to_message(msg_id, formatted_reply, bcc_address=bcc_address)
-        print(f"  -> {result}")
+    print(f"\nCreating {len(items)} drafts in Outlook...")
+    try:
+        statuses = client.reply_to_messages(items)
     except Exception as e:
-        print(f"  -> Failed to create draft: {e}")
+        print(f"  -> Failed to create drafts: {e}")
+        return
+
+    for (_, subject, _), status in zip(drafts, statuses):
+        print(f"  -> {subject}: {status}")
 
 
 def is_gen_ii_email(from_address: str) -> bool:
@@ -283,10 +388,20 @@ def extract_client_name(thread: list[dict[str, Any]]) -> str:
 
 
 def generate_thread_summaries(
-    flagged_threads: list[list[dict[str, Any]]], llm_service: llm.LLMService, preferred_model: str | None = None
+    flagged_threads: list[list[dict[str, Any]]],
+    llm_service: llm.LLMService,
+    preferred_model: str | None = None,
+    max_workers: int = LLM_MAX_CONCURRENCY,
+    strip_quotes: bool = STRIP_QUOTED_HISTORY,
+    combined: bool = COMBINED_SUMMARY_REQUEST,
 ) -> None:
     """
     Generates summaries and SF Notes for all flagged threads and creates a Word document.
+    Summary and SF Note requests for all threads run concurrently on one event loop (llm_service.aio)
+    with at most max_workers in flight;
+    results are collected in thread order so the document layout is deterministic.
+    With strip_quotes, quoted history that repeats earlier messages is dropped from the prompts.
+    With combined, each thread's summary and SF Note come from one request instead of two.
     """
     if not flagged_threads:
         print("No flagged threads to summarize.")
@@ -294,50 +409,106 @@ def generate_thread_summaries(
 
     print(f"\n--- Generating Summaries for {len(flagged_threads)} Flagged Threads ---")
 
-    threads_with_summaries = []
-
+    jobs = []
+    total_saved = 0
     for idx, thread in enumerate(flagged_threads, 1):
         # Guard against empty threads
         if not thread:
             print(f"\nSkipping Thread {idx}/{len(flagged_threads)}: Empty thread")
             continue
 
-        subject = thread[0].get("subject", "No Subject")
-        print(f"\nProcessing Thread {idx}/{len(flagged_threads)}: {subject}")
-
-        # Extract client name
-        client_name = extract_client_name(thread)
-        print(f"  -> Client: {client_name}")
-
-        # Format thread content
-        thread_content = format_thread_content(thread)
-
-        # Generate summary
-        print("  -> Generating summary...")
-        summary = llm_service.generate_thread_summary(thread_content, preferred_model=preferred_model)
-
-        # Generate SF Note
-        print("  -> Generating SF Note...")
-        sf_note = llm_service.generate_sf_note(thread_content, preferred_model=preferred_model)
-
-        if summary:
-            threads_with_summaries.append(
-                {
-                    "subject": subject,
-                    "client_name": client_name,
-                    "summary": summary,
-                    "sf_note": sf_note if sf_note else "SF Note generation failed.",
-                    "thread": thread,
-                }
+        job = _summary_job(idx, thread, strip_quotes)
+        total_saved += job["saved"]
+        jobs.append(job)
+
+    if total_saved:
+        print(f"  -> Quoted history removed: {total_saved:,} bytes across {len(jobs)} threads")
+
+    requests_per_thread = 1 if combined else 2
+    workers = max(1, min(max_workers, len(jobs) * requests_per_thread)) if jobs else 1
+    print(f"  -> Submitting {len(jobs) * requests_per_thread} summary/SF Note requests ({workers} in flight max)...")
+
+    # One event loop instead of a thread per request in flight
+    aio = llm_service.aio
+
+    async def request(slots: asyncio.Semaphore, fn: Any, job: dict[str, Any]) -> Any:
+        async with slots:
+            try:
+                return await fn(job["content"], preferred_model=preferred_model, label=job["subject"])
+            except Exception as e:
+                print(f"  -> Warning: LLM job failed: {e}")
+                return None
+
+    async def summarize_all() -> list[Any]:
+        slots = asyncio.Semaphore(workers)
+        try:
+            if combined:
+                return await asyncio.gather(*(request(slots, aio.generate_summary_and_sf_note, job) for job in jobs))
+            return await asyncio.gather(
+                *(
+                    asyncio.gather(
+                        request(slots, aio.generate_thread_summary, job), request(slots, aio.generate_sf_note, job)
+                    )
+                    for job in jobs
+                )
             )
-            print("  -> Summary generated successfully")
-            if sf_note:
-                print("  -> SF Note generated successfully")
-            else:
-                print(f"  -> Warning: Failed to generate SF Note for '{subject}'")
-        else:
-            print(f"  -> Warning: Failed to generate summary for '{subject}'")
+        finally:
+            await aio.aclose()
+
+    threads_with_summaries = []
+    for job, result in zip(jobs, asyncio.run(summarize_all())):
+        summary, sf_note = (result or (None, None)) if combined else result
+        entry = _summary_entry(job, summary, sf_note, f"{job['idx']}/{len(flagged_threads)}")
+        if entry:
+            threads_with_summaries.append(entry)
+
+    _write_summary_document(threads_with_summaries)
+
+
+def _summary_job(idx: int, thread: list[dict[str, Any]], strip_quotes: bool) -> dict[str, Any]:
+    """Prompt content and metadata for summarising one thread."""
+    subject = thread[0].get("subject", "No Subject")
+    content, saved = format_thread_content_with_stats(thread, strip_quotes=strip_quotes)
+    if saved:
+        print(f"  -> Thread {idx} ({subject}): trimmed {saved:,} bytes of repeated quoted history")
+    return {
+        "idx": idx,
+        "subject": subject,
+        "client_name": extract_client_name(thread),
+        "content": content,
+        "thread": thread,
+        "saved": saved,
+    }
+
+
+def _summary_entry(
+    job: dict[str, Any], summary: str | None, sf_note: str | None, position: str
+) -> dict[str, Any] | None:
+    """Logs the outcome for one thread; returns its Word document entry, or None without a summary."""
+    subject = job["subject"]
+
+    print(f"\nProcessed Thread {position}: {subject}")
+    print(f"  -> Client: {job['client_name']}")
+
+    if not summary:
+        print(f"  -> Warning: Failed to generate summary for '{subject}'")
+        return None
 
+    print("  -> Summary generated successfully")
+    if sf_note:
+        print("  -> SF Note generated successfully")
+    else:
+        print(f"  -> Warning: Failed to generate SF Note for '{subject}'")
+    return {
+        "subject": subject,
+        "client_name": job["client_name"],
+        "summary": summary,
+        "sf_note": sf_note if sf_note else "SF Note generation failed.",
+        "thread": job["thread"],
+    }
+
+
+def _write_summary_document(threads_with_summaries: list[dict[str, Any]]) -> None:
     if threads_with_summaries:
         # Create Word document
         # Use OUTPUT_DIR from config instead of os.getcwd() for reliability
@@ -363,8 +534,8 @@ def _setup() -> dict[str, Any] | None:
     """
     print("--- Outlook Bot Setup ---")
 
-    # Initialize Client and Focus Outlook
-    client = OutlookClient(APPLESCRIPTS_DIR)
+    # Initialize Client and Focus Outlook (drafts go through one persistent script host when available)
+    client = create_mail_backend(script_worker=SCRIPT_WORKER_ENABLED)
     print("Launching/Focusing Outlook...")
     client.activate_outlook()
 
@@ -388,6 +559,10 @@ def _setup() -> dict[str, Any] | None:
     cold_outreach_enabled = config_data.get("cold_outreach_enabled", False)
     cold_outreach_csv_path = config_data.get("cold_outreach_csv_path", "")
     cold_outreach_daily_limit = config_data.get("cold_outreach_daily_limit", 10)
+    incremental_sync = config_data.get("incremental_sync", INCREMENTAL_SYNC)
+    sent_index_enabled = config_data.get("sent_index_enabled", SENT_INDEX_ENABLED)
+    suppression_lists = config_data.get("suppression_lists", SUPPRESSION_LISTS)
+    llm_max_concurrency = config_data.get("llm_max_concurrency", LLM_MAX_CONCURRENCY)
     print(
         f"Configuration Loaded: Days Threshold={days_threshold}, "
         f"Preferred Model={preferred_model}, BCC={salesforce_bcc}, "
@@ -401,9 +576,46 @@ def _setup() -> dict[str, Any] | None:
 
     print(f"System Prompt Context: {date_context}")
 
-    # Initialize LLM Service (Detects models)
+    # Response cache: identical prompts on re-runs are served from disk
+    cache = None
+    if config_data.get("llm_cache_enabled", LLM_CACHE_ENABLED):
+        cache = ResponseCache(
+            max_bytes=int(config_data.get("llm_cache_max_mb", LLM_CACHE_MAX_MB) * 1024 * 1024),
+            ttl_seconds=config_data.get("llm_cache_ttl_hours", LLM_CACHE_TTL_HOURS) * 3600,
+        )
+
+    # Model lists are reused from the catalog; a configured preferred model is tried before any listing
+    catalog = ModelCatalog(ttl_seconds=config_data.get("model_catalog_ttl_hours", MODEL_CATALOG_TTL_HOURS) * 3600)
+
+    # Per-call token/latency metrics, appended to output/llm_metrics.jsonl and summarised at the end of a run
+    estimator = get_token_estimator(config_data.get("token_estimator", TOKEN_ESTIMATOR))
+    metrics = None
+    if config_data.get("llm_metrics_enabled", LLM_METRICS_ENABLED):
+        metrics = MetricsRecorder(estimator=estimator)
+
+    # Failing models/providers are skipped for a while instead of being retried on every request
+    health = HealthTracker(
+        failure_threshold=config_data.get("llm_breaker_failures", LLM_BREAKER_FAILURES),
+        reset_timeout=config_data.get("llm_breaker_reset_seconds", LLM_BREAKER_RESET_SECONDS),
+    )
+
+    # Rate-limited and transient failures are retried on the same model within per-provider budgets
+    rate_limiter = RateLimiter(
+        limits=config_data.get("llm_rate_limits", LLM_RATE_LIMITS),
+        max_retries=config_data.get("llm_max_retries", LLM_MAX_RETRIES),
+    )
+
+    # Initialize LLM Service (models are detected lazily)
     try:
-        llm_service = llm.LLMService()
+        llm_service = llm.LLMService(
+            cache=cache,
+            catalog=catalog,
+            max_concurrency=llm_max_concurrency,
+            metrics=metrics,
+            token_estimator=estimator,
+            health=health,
+            rate_limiter=rate_limiter,
+        )
     except Exception as e:
         print(f"Error initializing LLM Service: {e}")
         return None
@@ -419,11 +631,130 @@ def _setup() -> dict[str, Any] | None:
         "cold_outreach_daily_limit": cold_outreach_daily_limit,
         "combined_system_prompt": combined_system_prompt,
         "llm_service": llm_service,
+        "message_store": MessageStore() if incremental_sync else None,
+        "sent_index": SentRecipientIndex() if sent_index_enabled else None,
+        "suppression": SuppressionList(
+            suppression_lists,
+            error_rate=config_data.get("suppression_false_positive_rate", SUPPRESSION_FALSE_POSITIVE_RATE),
+        )
+        if suppression_lists
+        else None,
+        "llm_max_concurrency": llm_max_concurrency,
     }
 
 
+def run_follow_up_pipeline(
+    threads: Iterable[list[dict[str, Any]]],
+    client: MailBackend,
+    system_prompt: str,
+    llm_service: llm.LLMService,
+    days_threshold: int,
+    preferred_model: str | None = None,
+    salesforce_bcc: str = "",
+    activity_index: MessageStore | None = None,
+    max_workers: int = LLM_MAX_CONCURRENCY,
+    strip_quotes: bool = STRIP_QUOTED_HISTORY,
+    combined: bool = COMBINED_SUMMARY_REQUEST,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+) -> Pipeline:
+    """
+    Follow-up run as overlapping stages joined by bounded queues:
+    scrape (threads) -> filter -> generate -> draft -> summarize.
+
+    Replies are generated in micro-batches of the candidates queued at the time, drafts are created
+    as replies arrive, and summaries are requested while later batches are still being generated.
+    Every candidate is summarized, with or without a draft, and the Word document keeps thread order.
+    Returns the finished pipeline (per-stage statistics are printed at the end).
+
+    The Outlook export arrives in one piece when the script returns (and an incremental sync must
+    finish before the store can answer), so scraping does not overlap the later stages: the gain
+    is in overlapping generation, drafting and summaries. The generate and summarize stages share
+    llm_service's request slots, so together they keep at most max_concurrency requests in flight;
+    max_workers only sizes the stage thread pools.
+    """
+    fresh_activity: list[tuple[str, str, datetime | None, datetime | None]] = []
+    reused = 0
+    scanned = 0
+
+    def filter_stage(thread: list[dict[str, Any]]) -> list[tuple[int, dict[str, Any]]]:
+        nonlocal reused, scanned
+        scanned += 1
+        candidate, was_reused = _reply_candidate(thread, scanned, days_threshold, activity_index, fresh_activity)
+        reused += was_reused
+        return [(scanned, candidate)] if candidate else []
+
+    def generate_stage(items: list[tuple[int, dict[str, Any]]]) -> list[tuple[int, dict[str, Any], Any]]:
+        jobs = [_reply_job(candidate) for _, candidate in items]
+        batch_jobs = [job for job in jobs if job]
+        batch_replies = {}
+        if batch_jobs:
+            print(f"\nProcessing batch of {len(batch_jobs)} emails with LLM Service...")
+            batch_replies = llm_service.generate_batch_replies(
+                batch_jobs, system_prompt, preferred_model=preferred_model
+            )
+        return [
+            (number, candidate, _draft_for(job, batch_replies) if job else None)
+            for (number, candidate), job in zip(items, jobs)
+        ]
+
+    def draft_stage(items: list[tuple[int, dict[str, Any], Any]]) -> list[tuple[int, list[dict[str, Any]]]]:
+        create_draft_replies(client, [draft for _, _, draft in items if draft], salesforce_bcc)
+        return [(number, candidate["thread"]) for number, candidate, _ in items]
+
+    def summarize_stage(item: tuple[int, list[dict[str, Any]]]) -> list[tuple[int, dict[str, Any]]]:
+        number, thread = item
+        job = _summary_job(number, thread, strip_quotes)
+        kwargs = {"preferred_model": preferred_model, "label": job["subject"]}
+        if combined:
+            summary, sf_note = llm_service.generate_summary_and_sf_note(job["content"], **kwargs)
+        else:
+            summary = llm_service.generate_thread_summary(job["content"], **kwargs)
+            sf_note = llm_service.generate_sf_note(job["content"], **kwargs)
+        entry = _summary_entry(job, summary, sf_note, str(number))
+        return [(number, entry)] if entry else []
+
+    pipeline = (
+        Pipeline(threads, queue_size=queue_size, source_name="scrape")
+        .add_stage("filter", filter_stage)
+        # Both LLM stages draw on the service's request slots; idle workers just wait for one
+        .add_stage("generate", generate_stage, workers=max_workers, batch_size=llm.BATCH_MAX_ITEMS, max_wait=0.5)
+        # Drafts go through one Outlook script call per batch; reply_to_messages takes up to 50 at a time
+        .add_stage("draft", draft_stage, batch_size=50)
+        .add_stage("summarize", summarize_stage, workers=max_workers)
+    )
+    summaries = pipeline.run()
+
+    if not scanned:
+        print("No flagged threads found.")
+        return pipeline
+
+    _report_filter_stats(activity_index, reused, fresh_activity)
+    _write_summary_document([entry for _, entry in sorted(summaries, key=lambda s: s[0])])
+    pipeline.print_summary()
+    return pipeline
+
+
 def _do_follow_up(ctx: dict[str, Any]) -> None:
     """Execute the flagged-email follow-up logic using an already-initialised context."""
+    config_data = ctx.get("config_data", {})
+    if config_data.get("pipelined_follow_up", PIPELINED_FOLLOW_UP):
+        print("\n" + "=" * 30 + "\n")
+        run_follow_up_pipeline(
+            iter_flagged_threads(store=ctx.get("message_store"), client=ctx["client"]),
+            ctx["client"],
+            ctx["combined_system_prompt"],
+            ctx["llm_service"],
+            ctx["days_threshold"],
+            preferred_model=ctx["preferred_model"],
+            salesforce_bcc=ctx["salesforce_bcc"],
+            activity_index=ctx.get("message_store"),
+            max_workers=ctx.get("llm_max_concurrency", LLM_MAX_CONCURRENCY),
+            strip_quotes=config_data.get("strip_quoted_history", STRIP_QUOTED_HISTORY),
+            combined=config_data.get("combined_summary_request", COMBINED_SUMMARY_REQUEST),
+            queue_size=config_data.get("pipeline_queue_size", PIPELINE_QUEUE_SIZE),
+        )
+        return
+
     client = ctx["client"]
     days_threshold = ctx["days_threshold"]
     preferred_model = ctx["preferred_model"]
@@ -433,13 +764,15 @@ def _do_follow_up(ctx: dict[str, Any]) -> None:
 
     # 1. Scrape Flagged
     print("\n" + "=" * 30 + "\n")
-    flagged_threads = run_scraper(mode="flagged")
+    flagged_threads = run_scraper(mode="flagged", store=ctx.get("message_store"), client=client)
 
     if flagged_threads:
         # 2. Process Active Flags
         print("\n--- Processing Active Flags ---")
 
-        candidates = filter_threads_for_replies(flagged_threads, days_threshold)
+        candidates = filter_threads_for_replies(
+            flagged_threads, days_threshold, activity_index=ctx.get("message_store")
+        )
         process_replies(
             candidates,
             client,
@@ -459,7 +792,14 @@ def _do_follow_up(ctx: dict[str, Any]) -> None:
             if thread_id not in seen_ids:
                 seen_ids.add(thread_id)
                 threads_needing_replies.append(thread)
-        generate_thread_summaries(threads_needing_replies, llm_service, preferred_model)
+        generate_thread_summaries(
+            threads_needing_replies,
+            llm_service,
+            preferred_model,
+            max_workers=ctx.get("llm_max_concurrency", LLM_MAX_CONCURRENCY),
+            strip_quotes=ctx.get("config_data", {}).get("strip_quoted_history", STRIP_QUOTED_HISTORY),
+            combined=ctx.get("config_data", {}).get("combined_summary_request", COMBINED_SUMMARY_REQUEST),
+        )
     else:
         print("No flagged threads found.")
 
@@ -486,6 +826,13 @@ def _do_cold_outreach(ctx: dict[str, Any]) -> None:
         if not cold_prompt:
             print("Warning: Cold outreach prompt is empty. Skipping cold outreach.")
         else:
+            # The opt-in reply_rate signal compares Sent Items recipients with the senders of the
+            # flagged threads in the message store (see lead_scoring.domain_reply_rates)
+            weights = ctx["config_data"].get("cold_outreach_scoring_weights", COLD_OUTREACH_SCORING_WEIGHTS)
+            message_store = ctx.get("message_store")
+            reply_senders = None
+            if weights.get("reply_rate") and message_store is not None:
+                reply_senders = message_store.senders()
             process_cold_outreach(
                 client=client,
                 llm_service=llm_service,
@@ -494,12 +841,38 @@ def _do_cold_outreach(ctx: dict[str, Any]) -> None:
                 csv_path=cold_outreach_csv_path,
                 daily_limit=cold_outreach_daily_limit,
                 salesforce_bcc=salesforce_bcc,
+                sent_index=ctx.get("sent_index"),
+                suppression=ctx.get("suppression"),
+                scoring_weights=weights,
+                reply_senders=reply_senders,
             )
     except Exception as e:
         print(f"Error during cold outreach: {e}")
         traceback.print_exc()
 
 
+def _report_llm_stats(ctx: dict[str, Any]) -> None:
+    """Prints end-of-run LLM statistics."""
+    cache = getattr(ctx["llm_service"], "cache", None)
+    if isinstance(cache, ResponseCache):
+        stats = cache.stats()
+        print(
+            f"LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%} hit rate), {stats['evictions']} evictions"
+        )
+    metrics = getattr(ctx["llm_service"], "metrics", None)
+    if isinstance(metrics, MetricsRecorder):
+        metrics.print_summary()
+    health = getattr(ctx["llm_service"], "health", None)
+    if isinstance(health, HealthTracker):
+        health.print_summary()
+    rate_limiter = getattr(ctx["llm_service"], "rate_limiter", None)
+    if isinstance(rate_limiter, RateLimiter) and (rate_limiter.retries or rate_limiter.throttled_s):
+        print(
+            f"LLM retries: {rate_limiter.retries}, time spent waiting on rate limits: {rate_limiter.throttled_s:.1f}s"
+        )
+
+
 def run_follow_up() -> None:
     """Run only the flagged-email follow-up step (scrape, reply, summarise)."""
     print("--- Outlook Bot: Follow Up ---")
@@ -508,6 +881,7 @@ def run_follow_up() -> None:
         if ctx is None:
             return
         _do_follow_up(ctx)
+        _report_llm_stats(ctx)
     except Exception as e:
         print(f"Error during execution: {e}")
         traceback.print_exc()
@@ -521,6 +895,7 @@ def run_cold_outreach() -> None:
         if ctx is None:
             return
         _do_cold_outreach(ctx)
+        _report_llm_stats(ctx)
     except Exception as e:
         print(f"Error during execution: {e}")
         traceback.print_exc()
@@ -535,6 +910,7 @@ def main() -> None:
             return
         _do_follow_up(ctx)
         _do_cold_outreach(ctx)
+        _report_llm_stats(ctx)
     except Exception as e:
         print(f"Error during execution: {e}")
         traceback.print_exc()
@@ -0,0 +1,293 @@
+"""
+Local SQLite message store for flagged threads.
+
+Keeps every scraped message keyed by its Outlook message ID so repeat runs only
+need Outlook to export bodies for messages newer than the stored high-water mark.
+Also keeps a per-conversation index of latest activity, so unchanged threads can be
+classified without rescanning their bodies.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Iterable
+
+from config import MESSAGE_STORE_PATH
+
+Message = dict[str, Any]
+Thread = list[Message]
+
+# Storage keys of messages exported without a message ID (see storage_key)
+_SYNTHETIC_ID_PREFIX = "local:"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    message_id TEXT PRIMARY KEY,
+    conversation_id TEXT NOT NULL,
+    sender TEXT,
+    date TEXT,
+    timestamp TEXT,
+    subject TEXT,
+    flag_status TEXT,
+    content TEXT,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id);
+CREATE TABLE IF NOT EXISTS thread_activity (
+    conversation_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    latest_header TEXT,
+    latest_body TEXT
+);
+"""
+
+
+def _to_iso(ts: datetime | None) -> str:
+    return (ts or datetime.min).isoformat()
+
+
+def _from_iso(value: str | None) -> datetime:
+    if not value:
+        return datetime.min
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.min
+
+
+def content_hash(content: str | None) -> str:
+    """Hash of a message body, used to detect edited or re-exported bodies."""
+    return hashlib.sha1((content or "").encode("utf-8")).hexdigest()
+
+
+def storage_key(msg: Message) -> str:
+    """
+    The message's Outlook ID, or a key derived from its headers when the export had none, so such
+    messages are still stored (and a header-only re-export finds them again).
+    """
+    message_id = msg.get("message_id")
+    if message_id:
+        return message_id
+    headers = "\x1f".join(str(msg.get(field) or "") for field in ("id", "from", "date", "subject"))
+    return _SYNTHETIC_ID_PREFIX + hashlib.sha1(headers.encode("utf-8")).hexdigest()
+
+
+def thread_fingerprint(thread: Thread) -> str:
+    """
+    Identifies the exact set of messages (IDs, timestamps and body hashes) in a thread.
+    Uses stored body hashes when present, so threads loaded from the store are not rehashed.
+    """
+    h = hashlib.sha1()
+    parts = sorted(
+        (
+            str(m.get("message_id") or ""),
+            _to_iso(m.get("timestamp")),
+            m.get("content_hash") or content_hash(m.get("content")),
+        )
+        for m in thread
+    )
+    for part in parts:
+        h.update("\0".join(part).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+class MessageStore:
+    """
+    Persistent store of flagged-thread messages.
+    The connection is opened lazily, so constructing a store is free until it is used.
+    """
+
+    def __init__(self, db_path: str = MESSAGE_STORE_PATH) -> None:
+        self.db_path = db_path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+            # Stores created before body hashes were tracked
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(messages)")}
+            if "content_hash" not in columns:
+                self._conn.execute("ALTER TABLE messages ADD COLUMN content_hash TEXT")
+                self._conn.commit()
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def upsert_message(self, msg: Message) -> None:
+        """
+        Stores (or replaces) a fully exported message. A message exported without a message ID is
+        stored under a key derived from its headers and loaded back with an empty message_id, so it
+        shows in its thread but is never used as a reply target.
+        """
+        message_id = storage_key(msg)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO messages "
+                "(message_id, conversation_id, sender, date, timestamp, subject, flag_status, content, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    message_id,
+                    msg.get("id", ""),
+                    msg.get("from"),
+                    msg.get("date"),
+                    _to_iso(msg.get("timestamp")),
+                    msg.get("subject"),
+                    msg.get("flag_status"),
+                    msg.get("content", ""),
+                    content_hash(msg.get("content", "")),
+                ),
+            )
+            conn.commit()
+
+    def refresh_headers(self, msg: Message) -> bool:
+        """
+        Updates the mutable header fields (flag status, subject, ...) of a message whose body was
+        not re-exported. Returns False if the message is unknown to the store.
+        """
+        message_id = storage_key(msg)
+        with self._lock:
+            conn = self._connect()
+            cur = conn.execute(
+                "UPDATE messages SET conversation_id = ?, sender = ?, date = ?, timestamp = ?, "
+                "subject = ?, flag_status = ? WHERE message_id = ?",
+                (
+                    msg.get("id", ""),
+                    msg.get("from"),
+                    msg.get("date"),
+                    _to_iso(msg.get("timestamp")),
+                    msg.get("subject"),
+                    msg.get("flag_status"),
+                    message_id,
+                ),
+            )
+            conn.commit()
+            return cur.rowcount > 0
+
+    def conversation_ids(self) -> list[str]:
+        with self._lock:
+            rows = self._connect().execute("SELECT DISTINCT conversation_id FROM messages").fetchall()
+        return [r[0] for r in rows]
+
+    def senders(self) -> list[str]:
+        """Distinct From fields of the stored messages (e.g. "Jane Doe <jane@acme.com>")."""
+        with self._lock:
+            rows = self._connect().execute("SELECT DISTINCT sender FROM messages WHERE sender IS NOT NULL").fetchall()
+        return [r[0] for r in rows]
+
+    def get_high_water_mark(self) -> datetime | None:
+        """Returns the newest stored message timestamp, or None if the store is empty."""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT MAX(timestamp) FROM messages WHERE timestamp > ?", (_to_iso(datetime.min),))
+                .fetchone()
+            )
+        if not row or not row[0]:
+            return None
+        return _from_iso(row[0])
+
+    def load_threads(self, conversation_ids: Iterable[str]) -> list[Thread]:
+        """Returns the stored threads for the given conversation IDs, in the order given."""
+        threads: list[Thread] = []
+        with self._lock:
+            conn = self._connect()
+            for conversation_id in conversation_ids:
+                rows = conn.execute(
+                    "SELECT message_id, conversation_id, sender, date, timestamp, subject, flag_status, content, "
+                    "content_hash FROM messages WHERE conversation_id = ? ORDER BY timestamp, message_id",
+                    (conversation_id,),
+                ).fetchall()
+                if rows:
+                    threads.append([self._row_to_message(r) for r in rows])
+        return threads
+
+    def prune(self, keep_conversation_ids: Iterable[str], seen_keys: Iterable[str] | None = None) -> int:
+        """
+        Deletes conversations that are no longer flagged. Returns the number of messages removed.
+
+        Args:
+            keep_conversation_ids: Conversations still flagged; every other conversation is deleted
+            seen_keys: Optional storage keys (see storage_key) of every message in the latest export.
+                Stored messages of kept conversations that are not among them (deleted, or moved out
+                of the scraped folders) are deleted too.
+        """
+        keep = set(keep_conversation_ids)
+        stale = [cid for cid in self.conversation_ids() if cid not in keep]
+        with self._lock:
+            conn = self._connect()
+            removed = 0
+            for conversation_id in stale:
+                removed += conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,)).rowcount
+                conn.execute("DELETE FROM thread_activity WHERE conversation_id = ?", (conversation_id,))
+            if seen_keys is not None:
+                seen = set(seen_keys)
+                gone = [
+                    (message_id,)
+                    for message_id, conversation_id in conn.execute("SELECT message_id, conversation_id FROM messages")
+                    if conversation_id in keep and message_id not in seen
+                ]
+                removed += conn.executemany("DELETE FROM messages WHERE message_id = ?", gone).rowcount
+            conn.commit()
+        return removed
+
+    def get_activity(self, conversation_id: str, fingerprint: str) -> tuple[datetime | None, datetime | None] | None:
+        """
+        Returns the indexed (latest header date, latest date found in bodies) for a conversation,
+        or None if it is not indexed or its messages changed since (fingerprint mismatch).
+        """
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT fingerprint, latest_header, latest_body FROM thread_activity WHERE conversation_id = ?",
+                    (conversation_id,),
+                )
+                .fetchone()
+            )
+        if row is None or row[0] != fingerprint:
+            return None
+        return (_from_iso(row[1]) if row[1] else None, _from_iso(row[2]) if row[2] else None)
+
+    def put_activities(self, entries: Iterable[tuple[str, str, datetime | None, datetime | None]]) -> None:
+        """Stores (conversation_id, fingerprint, latest_header, latest_body) entries in one transaction."""
+        rows = [
+            (cid, fp, header.isoformat() if header else None, body.isoformat() if body else None)
+            for cid, fp, header, body in entries
+        ]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO thread_activity (conversation_id, fingerprint, latest_header, latest_body) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+
+    @staticmethod
+    def _row_to_message(row: tuple) -> Message:
+        message_id, conversation_id, sender, date, timestamp, subject, flag_status, content, body_hash = row
+        return {
+            "id": conversation_id,
+            "message_id": "" if message_id.startswith(_SYNTHETIC_ID_PREFIX) else message_id,
+            "from": sender,
+            "date": date,
+            "timestamp": _from_iso(timestamp),
+            "subject": subject,
+            "flag_status": flag_status,
+            "content": content or "",
+            "content_hash": body_hash,
+        }
@@ -0,0 +1,73 @@
+"""
+Persisted catalog of discovered LLM models.
+
+Listing models is a network round-trip per provider, so discovered catalogs are stored
+per provider with a TTL and keyed by a fingerprint of the API key used to list them.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import MODEL_CATALOG_PATH
+
+
+def key_fingerprint(api_key: Optional[str]) -> str:
+    """Short, non-reversible fingerprint of an API key so a key change invalidates its catalog."""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+class ModelCatalog:
+    """
+    JSON file of {provider: {"fingerprint", "fetched_at", "models"}} entries.
+    """
+
+    def __init__(self, path: str = MODEL_CATALOG_PATH, ttl_seconds: float = 24 * 3600) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Could not read model catalog: {e}")
+            return {}
+
+    def get(self, provider: str, fingerprint: str, allow_stale: bool = False) -> Optional[List[Dict[str, Any]]]:
+        """Returns the cached models for a provider, or None if missing, expired or listed with another key."""
+        with self._lock:
+            entry = self._read().get(provider)
+        if not isinstance(entry, dict) or entry.get("fingerprint") != fingerprint:
+            return None
+        if not allow_stale and time.time() - entry.get("fetched_at", 0) > self.ttl_seconds:
+            return None
+        models = entry.get("models")
+        return models if isinstance(models, list) else None
+
+    def put(self, provider: str, fingerprint: str, models: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            data = self._read()
+            data[provider] = {"fingerprint": fingerprint, "fetched_at": time.time(), "models": models}
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Warning: Could not write model catalog: {e}")
+
+    def invalidate(self) -> None:
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
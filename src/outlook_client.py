@@ -1,16 +1,50 @@
 import os
 import subprocess
-from typing import Optional
+import tempfile
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
 
 from config import APPLESCRIPTS_DIR
+from script_host import ScriptDeliveredError, ScriptError, ScriptHostError, ScriptWorker
+
+DEFAULT_FOLLOW_UP = "Hey, when you have the chance, please send me an update."
+
+# Script host wait for a reply_to_messages call: a base allowance plus time per draft (each
+# draft opens a window, waits and types its body)
+REPLY_BATCH_BASE_TIMEOUT = 300.0
+REPLY_SECONDS_PER_DRAFT = 30.0
+
+
+class AppleScriptError(Exception):
+    """An osascript run exited with an error, or a script reported one in its output."""
 
 
 class OutlookClient:
-    def __init__(self, scripts_dir: str) -> None:
+    def __init__(self, scripts_dir: str, worker: Optional[ScriptWorker] = None) -> None:
         self.scripts_dir = scripts_dir
+        # Optional persistent script host; without one each call forks a fresh osascript
+        self.worker = worker if worker is not None and worker.available else None
 
-    def _run_script(self, script_name: str, args: Optional[list[str]] = None) -> Optional[str]:
+    def _run_script(
+        self, script_name: str, args: Optional[list[str]] = None, timeout: Optional[float] = None
+    ) -> Optional[str]:
         script_path = os.path.join(self.scripts_dir, script_name)
+
+        if self.worker is not None:
+            try:
+                return self.worker.run(script_path, args, timeout=timeout)
+            except ScriptError as e:
+                print(f"Error running AppleScript {script_name}: {e}")
+                return None
+            except ScriptDeliveredError as e:
+                # The script may have run (drafts created); running it again would duplicate its effects
+                print(f"Error running AppleScript {script_name}: {e}; not retried, check Outlook for its results.")
+                return None
+            except ScriptHostError as e:
+                print(f"Warning: Script host unavailable ({e}); falling back to osascript per call.")
+                self.worker.close()
+                self.worker = None
+
         cmd = ["osascript", script_path]
         if args:
             cmd.extend(args)
@@ -22,6 +56,46 @@ class OutlookClient:
             print(f"Error running AppleScript {script_name}: {e.stderr}")
             return None
 
+    def stream_script(
+        self, script_name: str, args: Optional[list[str]] = None, chunk_size: int = 64 * 1024
+    ) -> Iterator[str]:
+        """
+        Runs a script and yields its stdout in chunks, so callers parse it piece by piece instead
+        of holding the full output (hundreds of MB for big mailboxes) as one string.
+
+        osascript only prints a script's result when the script returns, so the first chunk
+        arrives after Outlook has finished the whole export: this bounds memory, not latency.
+        stderr goes to a temporary file rather than a pipe, so a script that logs a lot can't
+        block on a full stderr pipe while we are still reading stdout.
+        Always uses its own osascript process: the script host replies with whole results.
+
+        Raises AppleScriptError after the last chunk if osascript exited with an error, so a
+        failed run is never mistaken for a short export.
+        """
+        script_path = os.path.join(self.scripts_dir, script_name)
+        cmd = ["osascript", script_path]
+        if args:
+            cmd.extend(args)
+
+        with tempfile.TemporaryFile() as stderr_file:
+            with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file, text=True) as proc:
+                assert proc.stdout is not None
+                while True:
+                    chunk = proc.stdout.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+                returncode = proc.wait()
+            if returncode != 0:
+                stderr_file.seek(0)
+                stderr = stderr_file.read().decode("utf-8", errors="replace").strip()
+                raise AppleScriptError(f"{script_name} exited with status {returncode}: {stderr}")
+
+    def close(self) -> None:
+        """Stops the persistent script host, if one is running."""
+        if self.worker is not None:
+            self.worker.close()
+
     def activate_outlook(self) -> None:
         """
         Activates the Microsoft Outlook application, bringing it to the foreground.
@@ -49,13 +123,19 @@ class OutlookClient:
 
     def get_sent_recipients(self) -> set[str]:
         """
-        Fetches all recipient email addresses from Outlook Sent Items (last 1000 messages).
+        Fetches all recipient email addresses from Outlook Sent Items.
         Returns a set of lowercase email addresses for fast lookup.
         """
-        result = self._run_script("check_sent_to.scpt")
-        if not result:
-            return set()
-        return {addr.strip().lower() for addr in result.splitlines() if addr.strip()}
+        return {address for _, addresses in self.iter_sent_messages() for address in addresses}
+
+    def iter_sent_messages(self, since_seconds: Optional[int] = None) -> Iterator[tuple[datetime, list[str]]]:
+        """
+        Streams (sent time, lowercase recipient addresses) for every Sent Items message, or only
+        those sent within the last since_seconds.
+        Raises AppleScriptError if Outlook could not list Sent Items.
+        """
+        args = [str(since_seconds)] if since_seconds is not None else None
+        yield from parse_sent_lines(self.stream_script("check_sent_to.scpt", args), datetime.now())
 
     def reply_to_message(
         self, message_id: str, content: Optional[str] = None, bcc_address: Optional[str] = None
@@ -67,13 +147,47 @@ class OutlookClient:
         if content:
             args.append(content)
         else:
-            args.append("Hey, when you have the chance, please send me an update.")
+            args.append(DEFAULT_FOLLOW_UP)
 
         if bcc_address:
             args.append(bcc_address)
 
         return self._run_script("reply_to_message.scpt", args)
 
+    def reply_to_messages(self, items: list[tuple[str, str, str]], max_per_call: int = 50) -> list[str]:
+        """
+        Creates 'Reply All' drafts for many messages, in one script invocation per max_per_call items.
+
+        Args:
+            items: (message_id, content, bcc_address) tuples; bcc_address may be ""
+            max_per_call: Upper bound on drafts per invocation (keeps argv well under the OS limit)
+
+        Returns:
+            One status string per item, in order ("Success: ..." or "Error: ...")
+        """
+        statuses: list[str] = []
+        for start in range(0, len(items), max_per_call):
+            chunk = items[start : start + max_per_call]
+            args: list[str] = []
+            for message_id, content, bcc_address in chunk:
+                args += [str(message_id), content or DEFAULT_FOLLOW_UP, bcc_address or ""]
+
+            timeout = REPLY_BATCH_BASE_TIMEOUT + REPLY_SECONDS_PER_DRAFT * len(chunk)
+            result = self._run_script("reply_to_messages.scpt", args, timeout=timeout)
+            statuses += _parse_batch_status(result, len(chunk))
+        return statuses
+
+
+def _parse_batch_status(result: Optional[str], count: int) -> list[str]:
+    """Maps "index<TAB>status" lines back to items; items without a line are reported as errors."""
+    by_index: dict[int, str] = {}
+    for line in (result or "").splitlines():
+        index, sep, status = line.partition("\t")
+        if sep and index.strip().isdigit():
+            by_index[int(index)] = status.strip()
+    fallback = "Error: No status reported by Outlook" if result is not None else "Error: Script failed"
+    return [by_index.get(i, fallback) for i in range(1, count + 1)]
+
 
 def get_outlook_version() -> Optional[str]:
     """
@@ -94,3 +208,29 @@ def get_outlook_version() -> Optional[str]:
     except subprocess.CalledProcessError as e:
         print(f"Error detecting Outlook version: {e.stderr}")
         return None
+
+
+def parse_sent_lines(chunks: Iterable[str], now: datetime) -> Iterator[tuple[datetime, list[str]]]:
+    """
+    Parses check_sent_to.scpt output ("<seconds ago>\t<address>\t..." per message) delivered in
+    arbitrary chunks. Ages are converted to sent times relative to now.
+    Raises AppleScriptError on the script's "ERROR\t<message>" line.
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split("\n")
+        yield from _parse_sent_line_batch(lines, now)
+    yield from _parse_sent_line_batch([buffer], now)
+
+
+def _parse_sent_line_batch(lines: list[str], now: datetime) -> Iterator[tuple[datetime, list[str]]]:
+    for line in lines:
+        age, _, rest = line.strip().partition("\t")
+        if age == "ERROR":
+            raise AppleScriptError(f"check_sent_to.scpt: {rest.strip()}")
+        if not age.isdigit():
+            continue
+        addresses = [a.strip().lower() for a in rest.split("\t") if a.strip()]
+        if addresses:
+            yield now - timedelta(seconds=int(age)), addresses
@@ -0,0 +1,239 @@
+"""
+Staged producer/consumer pipeline joined by bounded queues.
+
+The follow-up run used to go phase by phase (scrape everything, filter, one batch LLM call, all
+drafts, all summaries), so its wall time was the sum of the phases. Pipeline runs every stage in
+its own worker threads: items reach the last stage while later ones are still being produced,
+and a slow stage blocks its producer once its input queue is full instead of letting work pile
+up in memory. Each stage reports items, busy time, throughput and queue depth.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class StageStats:
+    """Counters for one stage, updated by its workers."""
+
+    def __init__(self, name: str, workers: int) -> None:
+        self.name = name
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy_s = 0.0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.max_depth = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+
+    def sample_depth(self, depth: int) -> None:
+        self.max_depth = max(self.max_depth, depth)
+        self._depth_total += depth
+        self._depth_samples += 1
+
+    @property
+    def mean_depth(self) -> float:
+        return self._depth_total / self._depth_samples if self._depth_samples else 0.0
+
+    @property
+    def elapsed_s(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Items per second over the span from the stage's first item to its last."""
+        count = self.items_in or self.items_out
+        return count / self.elapsed_s if self.elapsed_s else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "errors": self.errors,
+            "busy_s": round(self.busy_s, 3),
+            "elapsed_s": round(self.elapsed_s, 3),
+            "throughput": round(self.throughput, 2),
+            "max_queue": self.max_depth,
+            "mean_queue": round(self.mean_depth, 2),
+        }
+
+
+class _Stage:
+    def __init__(
+        self, name: str, fn: Callable[[Any], Optional[Iterable[Any]]], workers: int, batch_size: int, max_wait: float
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.stats = StageStats(name, self.workers)
+        self.inbox: Optional[queue.Queue] = None
+        self.running = self.workers
+
+
+class Pipeline:
+    """
+    Feeds the items of source through stages added with add_stage, in order.
+
+    Args:
+        source: Iterable consumed on its own thread (e.g. a streaming scrape)
+        queue_size: Capacity of the queue in front of each stage
+        source_name: Name of the source in the stage report
+    """
+
+    def __init__(self, source: Iterable[Any], queue_size: int = 32, source_name: str = "source") -> None:
+        self.source = source
+        self.queue_size = max(1, queue_size)
+        self.source_stats = StageStats(source_name, 1)
+        self.stages: list[_Stage] = []
+        self._lock = threading.Lock()
+        self._results: list[Any] = []
+
+    def add_stage(
+        self,
+        name: str,
+        fn: Callable[[Any], Optional[Iterable[Any]]],
+        workers: int = 1,
+        batch_size: int = 1,
+        max_wait: float = 0.0,
+    ) -> "Pipeline":
+        """
+        Appends a stage. fn gets one item (or, with batch_size > 1, a list of up to batch_size
+        items) and returns an iterable of items for the next stage, or None for none. A batch is
+        whatever is queued when a worker becomes free, waiting at most max_wait seconds to fill it.
+        An exception from fn is logged and drops that item (or batch); the run continues.
+        """
+        self.stages.append(_Stage(name, fn, workers, batch_size, max_wait))
+        return self
+
+    def run(self) -> list[Any]:
+        """Runs all stages to completion and returns the items produced by the last stage."""
+        self._results = []
+        for stage in self.stages:
+            stage.inbox = queue.Queue(maxsize=self.queue_size)
+            stage.running = stage.workers
+            stage.stats = StageStats(stage.name, stage.workers)
+        self.source_stats = StageStats(self.source_stats.name, 1)
+
+        threads = [threading.Thread(target=self._produce, name=f"pipeline-{self.source_stats.name}", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads += [
+                threading.Thread(target=self._work, args=(index,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                for n in range(stage.workers)
+            ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self._results
+
+    def _emit(self, index: int, item: Any) -> None:
+        """Passes an item to stage index (or to the results, past the last stage)."""
+        if index >= len(self.stages):
+            if item is _DONE:
+                return
+            with self._lock:
+                self._results.append(item)
+            return
+        stage = self.stages[index]
+        inbox = stage.inbox
+        assert inbox is not None
+        inbox.put(item)
+        if item is not _DONE:
+            with self._lock:
+                stage.stats.sample_depth(inbox.qsize())
+
+    def _produce(self) -> None:
+        stats = self.source_stats
+        stats.started = time.perf_counter()
+        try:
+            for item in self.source:
+                stats.items_out += 1
+                self._emit(0, item)
+        except Exception as e:
+            stats.errors += 1
+            print(f"  -> Warning: pipeline source '{stats.name}' failed: {e}")
+        finally:
+            stats.finished = time.perf_counter()
+            self._emit(0, _DONE)
+
+    def _next_batch(self, stage: _Stage) -> tuple[list[Any], bool]:
+        """Blocks for one item, then takes what else is queued up to batch_size. Returns (batch, done)."""
+        inbox = stage.inbox
+        assert inbox is not None
+        first = inbox.get()
+        if first is _DONE:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + stage.max_wait
+        while len(batch) < stage.batch_size:
+            try:
+                remaining = deadline - time.perf_counter()
+                item = inbox.get(timeout=remaining) if remaining > 0 else inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _work(self, index: int) -> None:
+        stage = self.stages[index]
+        stats = stage.stats
+        done = False
+        while not done:
+            batch, done = self._next_batch(stage)
+            if batch:
+                start = time.perf_counter()
+                try:
+                    outputs = list(stage.fn(batch if stage.batch_size > 1 else batch[0]) or ())
+                except Exception as e:
+                    outputs = []
+                    with self._lock:
+                        stats.errors += len(batch)
+                    print(f"  -> Warning: pipeline stage '{stage.name}' failed: {e}")
+                end = time.perf_counter()
+                with self._lock:
+                    stats.items_in += len(batch)
+                    stats.items_out += len(outputs)
+                    stats.busy_s += end - start
+                    stats.started = start if stats.started is None else min(stats.started, start)
+                    stats.finished = end if stats.finished is None else max(stats.finished, end)
+                for output in outputs:
+                    self._emit(index + 1, output)
+
+        # Let sibling workers see the end marker too; the last one to stop closes the next stage
+        assert stage.inbox is not None
+        stage.inbox.put(_DONE)
+        with self._lock:
+            stage.running -= 1
+            last = stage.running == 0
+        if last:
+            self._emit(index + 1, _DONE)
+
+    def summary(self) -> list[dict[str, Any]]:
+        return [self.source_stats.as_dict()] + [stage.stats.as_dict() for stage in self.stages]
+
+    def print_summary(self) -> None:
+        print("\n--- Pipeline Stages ---")
+        source = self.source_stats
+        print(f"  {source.name}: {source.items_out} items in {source.elapsed_s:.1f}s ({source.throughput:.1f}/s)")
+        for stage in self.stages:
+            s = stage.stats
+            errors = f", {s.errors} failed" if s.errors else ""
+            print(
+                f"  {s.name}: {s.items_in} in, {s.items_out} out{errors}, {s.workers} worker(s), "
+                f"busy {s.busy_s:.1f}s, {s.throughput:.1f}/s, queue max {s.max_depth} (avg {s.mean_depth:.1f})"
+            )
@@ -1,79 +1,128 @@
 import os
 import re
-from typing import Any
+from datetime import datetime
+from typing import Any, Iterable, Iterator
 
 from config import APPLESCRIPTS_DIR, BODY_END, BODY_START, MSG_DELIMITER, OUTPUT_DIR
 from date_utils import parse_date_string
+from mail_backend import FLAGGED_SCRIPT, RECENT_SCRIPT, MailBackend
+from message_store import MessageStore, storage_key
 from outlook_client import OutlookClient
 
 # Type aliases for clarity
 Message = dict[str, Any]
 Thread = list[Message]
 
+# Re-export bodies slightly older than the high-water mark to absorb clock skew and late deliveries
+SYNC_OVERLAP_SECONDS = 3600
 
-def parse_raw_data(raw_data: str) -> list[Message]:
+# Number of threads written to OUTPUT_DIR and returned by a scrape
+SAVED_THREAD_LIMIT = 50
+
+
+def parse_message_block(raw_msg: str) -> Message | None:
     """
-    Parses the raw string from AppleScript into a list of message dicts.
+    Parses a single AppleScript message block (the text between delimiters) into a message dict.
+    Returns None for empty or unparseable blocks.
     """
-    messages: list[Message] = []
-    # Split by message delimiter (added regex for robustness against newline variations)
-    raw_msgs = raw_data.split(MSG_DELIMITER)
+    if not raw_msg.strip():
+        return None
 
-    for raw_msg in raw_msgs:
-        if not raw_msg.strip():
-            continue
+    msg: Message = {}
+    try:
+        lines = raw_msg.splitlines()
+        content_lines: list[str] = []
+        in_body = False
 
-        msg: Message = {}
-        try:
-            lines = raw_msg.splitlines()
-            content_lines: list[str] = []
-            in_body = False
-
-            for line in lines:
-                if line.strip() == BODY_START:
-                    in_body = True
-                    continue
-                if line.strip() == BODY_END:
-                    in_body = False
-                    continue
-
-                if in_body:
-                    content_lines.append(line)
-                else:
-                    if line.startswith("ID: "):
-                        msg["id"] = line[4:].strip()
-                    elif line.startswith("From: "):
-                        msg["from"] = line[6:].strip()
-                    elif line.startswith("Date: "):
-                        date_str = line[6:].strip()
-                        msg["date"] = date_str
-                        msg["timestamp"] = parse_date_string(date_str)
-                    elif line.startswith("Subject: "):
-                        msg["subject"] = line[9:].strip()
-                    elif line.startswith("FlagStatus: "):
-                        msg["flag_status"] = line[12:].strip()
-                    elif line.startswith("MessageID: "):
-                        msg["message_id"] = line[11:].strip()
-
-            msg["content"] = "\n".join(content_lines)
-
-            # Fallback for subject grouping if ID is missing or generic
-            if not msg.get("id") or msg.get("id") == "NO_ID":
-                # Normalize subject (remove Re:, Fwd:)
-                subj = msg.get("subject", "No Subject")
-                norm_subj = re.sub(r"^(Re|Fwd|FW|RE):\s*", "", subj, flags=re.IGNORECASE).strip()
-                msg["id"] = norm_subj
-
-            messages.append(msg)
-        except Exception as e:
-            print(f"Warning: Failed to parse message block. Error: {e}")
+        for line in lines:
+            if line.strip() == BODY_START:
+                in_body = True
+                continue
+            if line.strip() == BODY_END:
+                in_body = False
+                continue
+
+            if in_body:
+                content_lines.append(line)
+            else:
+                if line.startswith("ID: "):
+                    msg["id"] = line[4:].strip()
+                elif line.startswith("From: "):
+                    msg["from"] = line[6:].strip()
+                elif line.startswith("Date: "):
+                    date_str = line[6:].strip()
+                    msg["date"] = date_str
+                    msg["timestamp"] = parse_date_string(date_str)
+                elif line.startswith("Subject: "):
+                    msg["subject"] = line[9:].strip()
+                elif line.startswith("FlagStatus: "):
+                    msg["flag_status"] = line[12:].strip()
+                elif line.startswith("MessageID: "):
+                    msg["message_id"] = line[11:].strip()
+                elif line.startswith("BodyOmitted: "):
+                    msg["body_omitted"] = line[13:].strip().lower() == "true"
+
+        msg["content"] = "\n".join(content_lines)
+
+        # Fallback for subject grouping if ID is missing or generic
+        if not msg.get("id") or msg.get("id") == "NO_ID":
+            # Normalize subject (remove Re:, Fwd:)
+            subj = msg.get("subject", "No Subject")
+            norm_subj = re.sub(r"^(Re|Fwd|FW|RE):\s*", "", subj, flags=re.IGNORECASE).strip()
+            msg["id"] = norm_subj
+
+        return msg
+    except Exception as e:
+        print(f"Warning: Failed to parse message block. Error: {e}")
+        return None
+
+
+def iter_parse_chunks(chunks: Iterable[str]) -> Iterator[Message]:
+    """
+    Incrementally parses AppleScript output delivered in arbitrary chunks.
+    Yields each message as soon as its delimiter arrives, so only the current
+    partial message is buffered regardless of how large the full output is.
+    """
+    buffer = ""
+    delim_len = len(MSG_DELIMITER)
+
+    for chunk in chunks:
+        if not chunk:
             continue
-    return messages
+        # Only rescan the tail of the old buffer that could hold a split delimiter
+        search_from = max(len(buffer) - delim_len + 1, 0)
+        buffer += chunk
+
+        start = 0
+        while True:
+            idx = buffer.find(MSG_DELIMITER, max(search_from, start))
+            if idx == -1:
+                break
+            msg = parse_message_block(buffer[start:idx])
+            if msg is not None:
+                yield msg
+            start = idx + delim_len
 
+        if start:
+            buffer = buffer[start:]
 
-def group_into_threads(messages: list[Message]) -> list[Thread]:
+    # The script joins messages with the delimiter, so the last block has no trailing one
+    msg = parse_message_block(buffer)
+    if msg is not None:
+        yield msg
+
+
+def parse_raw_data(raw_data: str) -> list[Message]:
+    """
+    Parses the raw string from AppleScript into a list of message dicts.
+    """
+    return list(iter_parse_chunks([raw_data]))
+
+
+def group_into_threads(messages: Iterable[Message]) -> list[Thread]:
     """
     Groups messages by their ID (conversation ID or Subject).
+    Accepts any iterable, so grouping can consume the chunked parser without a full list of messages.
     Returns a list of threads (lists of messages).
     """
     threads_map: dict[str, Thread] = {}
@@ -88,66 +137,213 @@ def group_into_threads(messages: list[Message]) -> list[Thread]:
     return list(threads_map.values())
 
 
-def scrape_messages(script_name: str, file_prefix: str = "thread") -> list[Thread] | None:
+def iter_threads(messages: Iterable[Message]) -> Iterator[Thread]:
     """
-    Generic function to run a scraping script and save the results.
+    Yields each thread as soon as the next conversation starts, for exports that emit a
+    conversation's messages together (get_flagged_threads.scpt does). Unlike group_into_threads,
+    a conversation that reappears later in the stream is yielded again as a separate thread.
     """
-    client = OutlookClient(APPLESCRIPTS_DIR)
+    thread: Thread = []
+    for msg in messages:
+        if msg.get("id") is None:
+            continue
+        if thread and msg["id"] != thread[0]["id"]:
+            yield thread
+            thread = []
+        thread.append(msg)
+    if thread:
+        yield thread
+
 
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
+def scrape_messages(
+    script_name: str, file_prefix: str = "thread", client: MailBackend | None = None
+) -> list[Thread] | None:
+    """
+    Generic function to run a scraping script and save the results.
+    Uses the given mail backend, or a fresh OutlookClient if none is given.
+    """
+    if client is None:
+        client = OutlookClient(APPLESCRIPTS_DIR)
 
     print(f"Running {script_name}...")
+    message_count = 0
+
+    def _counted(messages: Iterable[Message]) -> Iterator[Message]:
+        nonlocal message_count
+        for msg in messages:
+            message_count += 1
+            yield msg
+
     try:
-        raw_data = client._run_script(script_name)
+        # Parse and group chunk by chunk, never materialising the full output as one string
+        threads = group_into_threads(_counted(iter_parse_chunks(client.stream_script(script_name))))
     except Exception as e:
         print(f"Error executing AppleScript: {e}")
         return None
 
-    if not raw_data:
+    if not message_count:
         print("No data returned from Outlook.")
         return None
 
-    messages = parse_raw_data(raw_data)
-    print(f"Parsed {len(messages)} messages.")
-
-    threads = group_into_threads(messages)
+    print(f"Parsed {message_count} messages.")
     print(f"Identified {len(threads)} unique threads.")
 
-    # Save first 50 threads
-    top_threads = threads[:50]
+    return save_threads(threads, file_prefix)
+
+
+def save_threads(threads: list[Thread], file_prefix: str = "thread") -> list[Thread]:
+    """
+    Writes the first SAVED_THREAD_LIMIT threads to text files in OUTPUT_DIR and returns them.
+    """
+    top_threads = threads[:SAVED_THREAD_LIMIT]
 
     for i, thread in enumerate(top_threads):
-        # Determine filename from subject of the first message
-        first_msg = thread[0]
-        safe_subject = "".join(
-            [c for c in first_msg.get("subject", "thread") if c.isalnum() or c in (" ", "-", "_")]
-        ).strip()[:50]
-        filename = f"{file_prefix}_{i + 1}_{safe_subject}.txt"
-        filepath = os.path.join(OUTPUT_DIR, filename)
-
-        with open(filepath, "w", encoding="utf-8") as f:
-            for msg in thread:
-                f.write(f"From: {msg.get('from')}\n")
-                f.write(f"Date: {msg.get('date')}\n")
-                f.write(f"Subject: {msg.get('subject')}\n")
-                f.write(f"Flag Status: {msg.get('flag_status', 'None')}\n")
-                f.write("-" * 20 + "\n")
-                f.write(msg.get("content", "") + "\n")
-                f.write("=" * 80 + "\n\n")
+        save_thread(thread, i + 1, file_prefix)
 
     print(f"Successfully saved {len(top_threads)} threads to {os.path.abspath(OUTPUT_DIR)}")
     return top_threads
 
 
-def run_scraper(mode: str = "recent") -> list[Thread]:
-    """Run the scraper in the specified mode ('recent' or 'flagged')."""
+def save_thread(thread: Thread, number: int, file_prefix: str = "thread") -> None:
+    """Writes one thread to OUTPUT_DIR as {file_prefix}_{number}_{subject}.txt."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # Determine filename from subject of the first message
+    first_msg = thread[0]
+    safe_subject = "".join(
+        [c for c in first_msg.get("subject", "thread") if c.isalnum() or c in (" ", "-", "_")]
+    ).strip()[:50]
+    filename = f"{file_prefix}_{number}_{safe_subject}.txt"
+    filepath = os.path.join(OUTPUT_DIR, filename)
+
+    with open(filepath, "w", encoding="utf-8") as f:
+        for msg in thread:
+            f.write(f"From: {msg.get('from')}\n")
+            f.write(f"Date: {msg.get('date')}\n")
+            f.write(f"Subject: {msg.get('subject')}\n")
+            f.write(f"Flag Status: {msg.get('flag_status', 'None')}\n")
+            f.write("-" * 20 + "\n")
+            f.write(msg.get("content", "") + "\n")
+            f.write("=" * 80 + "\n\n")
+
+
+def iter_flagged_threads(
+    store: MessageStore | None = None, client: MailBackend | None = None, file_prefix: str = "flagged"
+) -> Iterator[Thread]:
+    """
+    Generator counterpart of run_scraper(mode="flagged"): yields each flagged thread (saving it,
+    like save_threads) as the parser reaches the next conversation, stopping after
+    SAVED_THREAD_LIMIT threads.
+
+    osascript delivers the export only once the script has returned, so the first thread is
+    yielded after Outlook has finished exporting. With a message store the incremental sync also
+    completes first: the store can only prune and detect missing bodies once the whole export is in.
+    """
+    if store is not None:
+        yield from run_scraper(mode="flagged", store=store, client=client)
+        return
+
+    print("--- Scraping Flagged Emails (Full Threads) ---")
+    if client is None:
+        client = OutlookClient(APPLESCRIPTS_DIR)
+
+    print(f"Running {FLAGGED_SCRIPT}...")
+    count = 0
+    try:
+        for thread in iter_threads(iter_parse_chunks(client.stream_script(FLAGGED_SCRIPT))):
+            count += 1
+            save_thread(thread, count, file_prefix)
+            yield thread
+            if count >= SAVED_THREAD_LIMIT:
+                break
+    except Exception as e:
+        print(f"Error executing AppleScript: {e}")
+    if not count:
+        print("No data returned from Outlook.")
+    else:
+        print(f"Parsed {count} threads; saved to {os.path.abspath(OUTPUT_DIR)}")
+
+
+def sync_flagged_threads(
+    store: MessageStore, client: MailBackend | None = None, file_prefix: str = "flagged"
+) -> list[Thread] | None:
+    """
+    Incrementally syncs flagged threads into the local message store and returns them from the store.
+
+    Outlook only exports bodies for messages newer than the store's high-water mark; older messages
+    of known conversations come back header-only and are filled in from the store. If a header-only
+    message is missing from the store, a full sync is run instead.
+    """
+    if client is None:
+        client = OutlookClient(APPLESCRIPTS_DIR)
+
+    high_water = store.get_high_water_mark()
+    known_ids = store.conversation_ids()
+    args: list[str] | None = None
+    if high_water is not None and known_ids:
+        since_seconds = int((datetime.now() - high_water).total_seconds()) + SYNC_OVERLAP_SECONDS
+        args = [str(max(since_seconds, 0))] + known_ids
+        print(f"Running {FLAGGED_SCRIPT} (incremental since {high_water.strftime('%Y-%m-%d %H:%M:%S')})...")
+    else:
+        print(f"Running {FLAGGED_SCRIPT} (full sync)...")
+
+    conversation_ids: dict[str, None] = {}
+    seen_keys: set[str] = set()
+    exported = 0
+    reused = 0
+    missing = 0
+    try:
+        for msg in iter_parse_chunks(client.stream_script(FLAGGED_SCRIPT, args)):
+            conversation_ids.setdefault(msg["id"], None)
+            seen_keys.add(storage_key(msg))
+            if msg.get("body_omitted"):
+                if store.refresh_headers(msg):
+                    reused += 1
+                else:
+                    missing += 1
+            else:
+                store.upsert_message(msg)
+                exported += 1
+    except Exception as e:
+        print(f"Error executing AppleScript: {e}")
+        return None
+
+    if missing and args is not None:
+        print(f"  -> {missing} messages missing from the local store. Falling back to a full sync.")
+        store.prune([])
+        return sync_flagged_threads(store, client, file_prefix)
+
+    if not conversation_ids:
+        print("No data returned from Outlook.")
+        return None
+
+    # Every run exports all headers, so a stored message missing from this export was deleted or moved
+    removed = store.prune(conversation_ids, seen_keys)
+    print(f"Exported {exported} new message bodies, reused {reused} from the local store.")
+    if removed:
+        print(f"Dropped {removed} messages that are no longer flagged or no longer in Outlook.")
+
+    threads = store.load_threads(conversation_ids)
+    print(f"Identified {len(threads)} unique threads.")
+    return save_threads(threads, file_prefix)
+
+
+def run_scraper(
+    mode: str = "recent", store: MessageStore | None = None, client: MailBackend | None = None
+) -> list[Thread]:
+    """
+    Run the scraper in the specified mode ('recent' or 'flagged').
+    When a message store is given, flagged threads are synced incrementally through it.
+    client selects the mail backend (defaults to Outlook via AppleScript).
+    """
     if mode == "recent":
         print("--- Scraping Recent Emails ---")
-        return scrape_messages("get_recent_threads.scpt", file_prefix="recent") or []
+        return scrape_messages(RECENT_SCRIPT, file_prefix="recent", client=client) or []
     elif mode == "flagged":
         print("--- Scraping Flagged Emails (Full Threads) ---")
-        return scrape_messages("get_flagged_threads.scpt", file_prefix="flagged") or []
+        if store is not None:
+            return sync_flagged_threads(store, client=client, file_prefix="flagged") or []
+        return scrape_messages(FLAGGED_SCRIPT, file_prefix="flagged", client=client) or []
     else:
         print(f"Unknown mode: {mode}")
         return []
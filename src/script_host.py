@@ -0,0 +1,212 @@
+"""
+Persistent script host for AppleScript calls.
+
+Running `osascript script.scpt` per call costs a process start plus a script compile (about a
+second each). ScriptWorker keeps one host process alive and sends it one JSON request per line
+over a pipe; the host compiles each script once and answers in milliseconds.
+
+Backends:
+- macOS: `osascript -l JavaScript apple_scripts/script_host.js` (runs scripts via NSAppleScript)
+- Anywhere (tests, Linux): `python script_host.py --stub`, a stand-in that speaks the same protocol
+  and echoes the script name and arguments instead of talking to Outlook.
+"""
+
+import atexit
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+from typing import IO, Optional
+
+from config import APPLESCRIPTS_DIR
+
+HOST_SCRIPT = os.path.join(APPLESCRIPTS_DIR, "script_host.js")
+
+
+class ScriptHostError(Exception):
+    """The host process is unavailable, died or stopped answering."""
+
+
+class ScriptDeliveredError(ScriptHostError):
+    """
+    The host accepted the request but gave no usable answer (timeout, exit, garbled reply).
+    The script may have run, in part or in full, so it must not be run again.
+    """
+
+
+class ScriptError(Exception):
+    """A script ran inside the host and failed."""
+
+
+def osascript_command() -> Optional[list[str]]:
+    """Command for the macOS host, or None if osascript is not available."""
+    if not shutil.which("osascript") or not os.path.exists(HOST_SCRIPT):
+        return None
+    return ["osascript", "-l", "JavaScript", HOST_SCRIPT]
+
+
+def stub_command() -> list[str]:
+    """Command for the stand-in host used on Linux and in tests."""
+    return [sys.executable, os.path.abspath(__file__), "--stub"]
+
+
+class ScriptWorker:
+    """
+    Client for a long-lived script host process.
+
+    The process is started lazily on the first call and restarted if it has died between calls.
+    Calls are serialised (the host handles one request at a time) and thread-safe.
+    """
+
+    def __init__(self, command: Optional[list[str]] = None, timeout: float = 300.0) -> None:
+        self.command = command or osascript_command()
+        self.timeout = timeout
+        self.calls = 0
+        self._proc: Optional[subprocess.Popen] = None
+        self._replies: queue.Queue = queue.Queue()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    @property
+    def available(self) -> bool:
+        return self.command is not None
+
+    def _start(self) -> subprocess.Popen:
+        if self.command is None:
+            raise ScriptHostError("No script host available on this platform")
+        try:
+            proc = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as e:
+            raise ScriptHostError(f"Could not start script host: {e}") from e
+
+        # Replies are read on a background thread so a hung host can be timed out
+        self._replies = queue.Queue()
+        threading.Thread(target=self._read_replies, args=(proc.stdout, self._replies), daemon=True).start()
+        return proc
+
+    @staticmethod
+    def _read_replies(stream: IO[bytes], replies: queue.Queue) -> None:
+        for line in stream:
+            replies.put(line)
+        replies.put(None)  # EOF
+
+    def _ensure_running(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = self._start()
+        return self._proc
+
+    @staticmethod
+    def _send(proc: subprocess.Popen, line: str) -> None:
+        assert proc.stdin is not None
+        proc.stdin.write(line.encode("ascii"))
+        proc.stdin.flush()
+
+    def _request(self, script_path: str, args: list[str], timeout: float) -> dict:
+        proc = self._ensure_running()
+        self._next_id += 1
+        request_id = self._next_id
+        # ensure_ascii keeps the request stream 7-bit so the host can split it on any byte
+        line = json.dumps({"id": request_id, "script": script_path, "args": args}, ensure_ascii=True) + "\n"
+
+        try:
+            self._send(proc, line)
+        except OSError:
+            # The host died between calls; nothing was delivered, so a fresh host can take the request
+            self.close()
+            proc = self._ensure_running()
+            try:
+                self._send(proc, line)
+            except OSError as e:
+                raise ScriptHostError(f"Script host pipe closed: {e}") from e
+
+        # From here on the host has the request: failures are ScriptDeliveredError (no retry)
+        try:
+            raw = self._replies.get(timeout=timeout)
+        except queue.Empty:
+            self.close()
+            raise ScriptDeliveredError(f"Script host did not answer within {timeout:.0f}s") from None
+        if raw is None:
+            self.close()
+            raise ScriptDeliveredError("Script host exited")
+
+        try:
+            reply = json.loads(raw.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            self.close()
+            raise ScriptDeliveredError(f"Malformed reply from script host: {e}") from e
+        if reply.get("id") != request_id:
+            self.close()
+            raise ScriptDeliveredError("Script host reply out of sequence")
+        return reply
+
+    def run(self, script_path: str, args: Optional[list[str]] = None, timeout: Optional[float] = None) -> str:
+        """
+        Runs a script in the host and returns its result text.
+
+        Args:
+            timeout: Seconds to wait for the answer (defaults to the worker's timeout); scripts
+                whose run time grows with their input should pass a scaled value
+
+        Raises:
+            ScriptError: The script itself failed.
+            ScriptDeliveredError: The host took the request, then died, timed out or garbled the reply.
+            ScriptHostError: The request could not be delivered (host unavailable or would not start).
+        """
+        args = [str(a) for a in (args or [])]
+        with self._lock:
+            reply = self._request(script_path, args, self.timeout if timeout is None else timeout)
+            self.calls += 1
+
+        if not reply.get("ok"):
+            raise ScriptError(reply.get("error") or "Unknown script error")
+        return (reply.get("output") or "").strip()
+
+    def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if proc.stdin:
+                proc.stdin.close()
+            proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+
+
+def _serve_stub(stdin: IO[str] = sys.stdin, stdout: IO[str] = sys.stdout) -> None:
+    """
+    Stand-in host: same protocol as script_host.js, but "running" a script just echoes
+    its file name and arguments (tab-separated). Missing scripts fail like a load error does.
+    """
+    for line in stdin:
+        if not line.strip():
+            continue
+        request: dict = {}
+        try:
+            request = json.loads(line)
+            script = request["script"]
+            if not os.path.exists(script):
+                raise FileNotFoundError(f"Could not load script {script}")
+            output = "\t".join([os.path.basename(script)] + request.get("args", []))
+            reply = {"id": request.get("id"), "ok": True, "output": output}
+        except Exception as e:
+            reply = {"id": request.get("id"), "ok": False, "error": str(e)}
+        stdout.write(json.dumps(reply) + "\n")
+        stdout.flush()
+
+
+if __name__ == "__main__":
+    if "--stub" in sys.argv[1:]:
+        _serve_stub()
+    else:
+        print("Usage: script_host.py --stub", file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,160 @@
+"""
+Persisted index of Sent Items recipients, used by cold outreach to skip contacted leads.
+
+check_sent_to.scpt used to walk the last 1000 Sent Items on every run, so the check was slow
+and missed anyone emailed before those 1000 messages. SentRecipientIndex keeps every recipient
+in SQLite with the last time they were emailed, plus the newest sent time seen; refresh() only
+asks the mail backend for messages sent since then.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Iterable
+
+from config import SENT_INDEX_PATH
+from mail_backend import MailBackend
+
+# Re-list messages slightly older than the newest indexed one, to absorb clock differences
+# between Outlook and this process and late-arriving Sent Items
+REFRESH_OVERLAP_SECONDS = 3600
+
+# Rows written per executemany call, so a full first scan is not held in memory at once
+_WRITE_BATCH = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sent_recipients (
+    address TEXT PRIMARY KEY,
+    last_sent TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sent_index_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SentRecipientIndex:
+    """
+    Sent-recipient addresses (lowercased) with their last sent time.
+    The connection is opened lazily, so constructing an index is free until it is used.
+    """
+
+    def __init__(self, db_path: str = SENT_INDEX_PATH) -> None:
+        self.db_path = db_path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_high_water_mark(self) -> datetime | None:
+        """Newest sent time indexed so far, or None before the first refresh."""
+        with self._lock:
+            row = self._connect().execute("SELECT value FROM sent_index_meta WHERE key = 'high_water'").fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def add_messages(self, messages: Iterable[tuple[datetime, Iterable[str]]]) -> int:
+        """
+        Indexes (sent time, recipient addresses) pairs, keeping each address's latest sent time.
+        Returns the number of addresses that were not indexed before. If messages raises, nothing
+        is written and the error propagates.
+        """
+        newest = self.get_high_water_mark()
+        with self._lock:
+            conn = self._connect()
+            before = conn.execute("SELECT COUNT(*) FROM sent_recipients").fetchone()[0]
+            rows: list[tuple[str, str]] = []
+            try:
+                for sent, addresses in messages:
+                    newest = sent if newest is None else max(newest, sent)
+                    rows += [(a.strip().lower(), sent.isoformat()) for a in addresses if a.strip()]
+                    if len(rows) >= _WRITE_BATCH:
+                        self._write(conn, rows)
+                        rows = []
+            except BaseException:
+                conn.rollback()
+                raise
+            self._write(conn, rows)
+            if newest is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sent_index_meta (key, value) VALUES ('high_water', ?)",
+                    (newest.isoformat(),),
+                )
+            conn.commit()
+            after = conn.execute("SELECT COUNT(*) FROM sent_recipients").fetchone()[0]
+        return after - before
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, rows: list[tuple[str, str]]) -> None:
+        conn.executemany(
+            "INSERT INTO sent_recipients (address, last_sent) VALUES (?, ?) "
+            "ON CONFLICT(address) DO UPDATE SET last_sent = MAX(last_sent, excluded.last_sent)",
+            rows,
+        )
+
+    def refresh(self, client: MailBackend) -> int:
+        """
+        Adds messages sent since the high-water mark (everything on the first run).
+        Returns the number of newly indexed addresses. A failed listing leaves the index as it was.
+        """
+        high_water = self.get_high_water_mark()
+        since_seconds = None
+        if high_water is not None:
+            since_seconds = max(int((datetime.now() - high_water).total_seconds()), 0) + REFRESH_OVERLAP_SECONDS
+        return self.add_messages(client.iter_sent_messages(since_seconds))
+
+    def __contains__(self, address: object) -> bool:
+        if not isinstance(address, str):
+            return False
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT 1 FROM sent_recipients WHERE address = ?", (address.strip().lower(),))
+                .fetchone()
+            )
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM sent_recipients").fetchone()[0]
+
+    def addresses(self) -> set[str]:
+        with self._lock:
+            rows = self._connect().execute("SELECT address FROM sent_recipients").fetchall()
+        return {r[0] for r in rows}
+
+    def domain_counts(self) -> dict[str, int]:
+        """Number of indexed recipients per domain."""
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT substr(address, instr(address, '@') + 1) AS domain, COUNT(*) FROM sent_recipients "
+                    "WHERE instr(address, '@') > 0 GROUP BY domain"
+                )
+                .fetchall()
+            )
+        return dict(rows)
+
+    def last_sent(self, address: str) -> datetime | None:
+        """When address was last emailed, or None if it never was."""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT last_sent FROM sent_recipients WHERE address = ?", (address.strip().lower(),))
+                .fetchone()
+            )
+        return datetime.fromisoformat(row[0]) if row else None
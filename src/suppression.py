@@ -0,0 +1,251 @@
+"""
+Do-not-contact lists for cold outreach (bounces, unsubscribes, competitors).
+
+These lists run to millions of addresses, too many to load into a Python set on every run.
+SuppressionList imports them once into SQLite, which holds the exact set, and writes a Bloom
+filter file next to it. The filter is memory-mapped, so opening it is instant and only the
+pages a lookup touches are read. A lead the filter rules out (nearly every lead) never reaches
+SQLite, and the rare positive is confirmed with one indexed lookup, so false positives cost a
+query, never a wrongly skipped lead. The import only runs again when a list file changes.
+
+List files hold one entry per line (CSV rows and "Name <address>" are fine: the first address
+on the line is used). An entry of the form "@example.com" suppresses the whole domain; "#" starts a comment.
+"""
+
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import threading
+from typing import Iterable, Iterator
+
+from config import SUPPRESSION_DB_PATH, USER_DATA_DIR
+
+# File layout: magic, number of bits, number of hash functions, number of keys added
+_HEADER = struct.Struct("<4sQIQ")
+_MAGIC = b"BLM1"
+
+# An address, or "@domain" for a whole domain (empty local part)
+_ENTRY = re.compile(r"[\w.+'-]*@[\w-]+(?:\.[\w-]+)+")
+
+# Bumped when list parsing changes, so lists imported by an older version are imported again
+_IMPORT_FORMAT = 2
+
+# Rows written per executemany call while importing list files
+_WRITE_BATCH = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS suppressed (
+    address TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS suppression_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class BloomFilter:
+    """
+    Bloom filter over a bit array: a bytearray while building, a read-only mmap once loaded.
+    Membership can be wrong only one way: a key that was added is always found.
+    """
+
+    def __init__(self, size_bits: int, hashes: int, bits=None, count: int = 0, offset: int = 0) -> None:
+        self.size_bits = max(8, size_bits)
+        self.hashes = max(1, hashes)
+        self.count = count
+        self._bits = bits if bits is not None else bytearray((self.size_bits + 7) // 8)
+        self._offset = offset
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float) -> "BloomFilter":
+        """Sized for capacity keys at the given false-positive rate."""
+        capacity = max(1, capacity)
+        size_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        return cls(size_bits, round(size_bits / capacity * math.log(2)))
+
+    def _positions(self, key: str) -> Iterator[int]:
+        # Double hashing: k positions from the two halves of one 128-bit digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size_bits
+
+    def add(self, key: str) -> None:
+        bits = self._bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        bits, offset = self._bits, self._offset
+        return all(bits[offset + (pos >> 3)] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def save(self, path: str) -> None:
+        """Writes the filter atomically, so a reader never maps a half-written file."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.size_bits, self.hashes, self.count))
+            f.write(self._bits[self._offset :])
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BloomFilter":
+        """Maps a saved filter read-only. Raises ValueError if the file is not one."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped) >= _HEADER.size:
+            magic, size_bits, hashes, count = _HEADER.unpack_from(mapped)
+            if magic == _MAGIC and len(mapped) >= _HEADER.size + (size_bits + 7) // 8:
+                return cls(size_bits, hashes, bits=mapped, count=count, offset=_HEADER.size)
+        mapped.close()
+        raise ValueError(f"Not a Bloom filter file: {path}")
+
+    def close(self) -> None:
+        if isinstance(self._bits, mmap.mmap):
+            self._bits.close()
+
+
+def normalize_entry(line: str) -> str | None:
+    """
+    The first address (or "@domain") on one list line, lowercased; None for blank and comment
+    lines. Display names and quoting are dropped: "Doe, Jane" <jane@acme.com> gives jane@acme.com.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    match = _ENTRY.search(line)
+    return match.group(0).lower() if match else None
+
+
+def _read_entries(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            entry = normalize_entry(line)
+            if entry:
+                yield entry
+
+
+class SuppressionList:
+    """
+    Addresses and domains that cold outreach must never draft to.
+
+    Args:
+        paths: List files; relative paths are resolved against the project root
+        db_path: SQLite file with the exact set; the filter is stored beside it as .bloom
+        error_rate: Bloom filter false-positive rate (each false positive costs one SQLite lookup)
+    """
+
+    def __init__(self, paths: Iterable[str], db_path: str = SUPPRESSION_DB_PATH, error_rate: float = 0.001) -> None:
+        self.paths = [p if os.path.isabs(p) else os.path.join(USER_DATA_DIR, p) for p in paths]
+        self.db_path = db_path
+        self.bloom_path = os.path.splitext(db_path)[0] + ".bloom"
+        self.error_rate = error_rate
+        self.filter_hits = 0
+        self.false_positives = 0
+        self._conn: sqlite3.Connection | None = None
+        self._filter: BloomFilter | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._filter is not None:
+                self._filter.close()
+                self._filter = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _signature(self) -> str:
+        """Identifies the current list files and settings; a change triggers a re-import."""
+        files = []
+        for path in self.paths:
+            if os.path.exists(path):
+                st = os.stat(path)
+                files.append([path, st.st_size, st.st_mtime_ns])
+            else:
+                print(f"  -> Warning: suppression list not found: {path}")
+        return json.dumps({"files": files, "error_rate": self.error_rate, "format": _IMPORT_FORMAT})
+
+    def sync(self) -> bool:
+        """
+        Re-imports the list files if any of them changed since the last import (or the filter
+        file is missing). Returns True if an import ran.
+        """
+        signature = self._signature()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM suppression_meta WHERE key = 'signature'").fetchone()
+            if row and row[0] == signature and os.path.exists(self.bloom_path):
+                return False
+
+            if self._filter is not None:
+                self._filter.close()
+                self._filter = None
+            conn.execute("DELETE FROM suppressed")
+            for path in json.loads(signature)["files"]:
+                rows: list[tuple[str]] = []
+                for entry in _read_entries(path[0]):
+                    rows.append((entry,))
+                    if len(rows) >= _WRITE_BATCH:
+                        conn.executemany("INSERT OR IGNORE INTO suppressed (address) VALUES (?)", rows)
+                        rows = []
+                conn.executemany("INSERT OR IGNORE INTO suppressed (address) VALUES (?)", rows)
+
+            count = conn.execute("SELECT COUNT(*) FROM suppressed").fetchone()[0]
+            bloom = BloomFilter.for_capacity(count, self.error_rate)
+            for (address,) in conn.execute("SELECT address FROM suppressed"):
+                bloom.add(address)
+            bloom.save(self.bloom_path)
+            conn.execute("INSERT OR REPLACE INTO suppression_meta (key, value) VALUES ('signature', ?)", (signature,))
+            conn.commit()
+        return True
+
+    def _loaded_filter(self) -> BloomFilter | None:
+        """The mapped filter, or None before the first sync."""
+        if self._filter is None and os.path.exists(self.bloom_path):
+            self._filter = BloomFilter.load(self.bloom_path)
+        return self._filter
+
+    def __contains__(self, address: object) -> bool:
+        if not isinstance(address, str):
+            return False
+        address = address.strip().lower()
+        keys = [address]
+        if "@" in address:
+            keys.append("@" + address.rsplit("@", 1)[1])
+
+        with self._lock:
+            bloom = self._loaded_filter()
+            candidates = [key for key in keys if bloom is not None and key in bloom]
+            if not candidates:
+                return False
+            self.filter_hits += 1
+            placeholders = ", ".join("?" * len(candidates))
+            row = (
+                self._connect()
+                .execute(f"SELECT 1 FROM suppressed WHERE address IN ({placeholders})", candidates)
+                .fetchone()
+            )
+            if row is None:
+                self.false_positives += 1
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM suppressed").fetchone()[0]
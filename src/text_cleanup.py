@@ -0,0 +1,208 @@
+"""
+Text cleanup stages applied to message bodies before they are sent to the LLM.
+
+Plain-text bodies carry every earlier message of the thread as quoted history, so a thread
+serialized message by message grows roughly quadratically. strip_quoted_history drops the
+quoted part of a body when it only repeats messages that are already in the thread.
+FooterStripper removes configured legal footers, disclaimers and signatures.
+"""
+
+import heapq
+import re
+from typing import Any, Iterable, Iterator, Mapping, Optional
+
+Message = dict[str, Any]
+Thread = list[Message]
+
+QUOTE_OMITTED_MARKER = "[Quoted history omitted: already included above]"
+
+# "On Dec 18, 2025, at 12:45 PM, Name <a@b.com> wrote:", possibly wrapped onto a second line
+_ON_WROTE_PATTERN = r"^[ \t>]*On\b[^\n]{0,300}?(?:\n[ \t>]*[^\n]{0,300}?)?\bwrote:[ \t]*$"
+
+# Start of a quoted-history block (first match in a body wins):
+#   "On ... wrote:"
+#   "-----Original Message-----"
+#   "From: ..." followed by a "Sent:" or "Date:" line (Outlook reply header)
+#   ">"-prefixed lines
+_QUOTE_START = re.compile(
+    _ON_WROTE_PATTERN + r"|^[ \t>]*-{2,}[ \t]*Original Message[ \t]*-{2,}"
+    r"|^[ \t>]*From:[^\n]*\n[ \t>]*(?:Sent|Date):"
+    r"|^[ \t]*>",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Reply headers, removed before comparing text
+_ON_WROTE = re.compile(_ON_WROTE_PATTERN, re.IGNORECASE | re.MULTILINE)
+_QUOTE_HEADER_LINE = re.compile(
+    r"^(?:-{2,}\s*Original Message\s*-{2,}|(?:From|Sent|Date|To|Cc|Subject):.*)$",
+    re.IGNORECASE,
+)
+
+_WORD = re.compile(r"\w+")
+
+# Word shingle length used to compare quoted text with earlier messages (robust to re-wrapping)
+SHINGLE_SIZE = 6
+
+
+def _content_lines(text: str) -> Iterator[tuple[bool, tuple[str, ...]]]:
+    """
+    (whether the line is '>'-quoted, its lowercased words) for each line of a body that has words.
+    '>' prefixes and reply headers are removed, so a message and a quoted copy of it (at any depth)
+    produce the same word sequence.
+    """
+    for line in _ON_WROTE.sub("", text).splitlines():
+        quoted = line.lstrip(" \t").startswith(">")
+        line = line.lstrip(" \t>").strip()
+        if not line or _QUOTE_HEADER_LINE.match(line):
+            continue
+        words = tuple(_WORD.findall(line.lower()))
+        if words:
+            yield quoted, words
+
+
+def _shingles(words: list[str]) -> set[tuple[str, ...]]:
+    return {tuple(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def strip_quoted_history(thread: Thread, min_coverage: float = 0.9) -> tuple[list[str], int]:
+    """
+    Removes quoted-reply history that duplicates earlier messages of the same thread.
+
+    A body's quoted block (from the first reply header or '>' line to the end) is dropped when at
+    least min_coverage of its word shingles occur in earlier messages and every line in it that is
+    not '>'-quoted already occurs in an earlier message. Blocks quoting mail that is not in the
+    thread, or with new text between the quoted lines (an inline answer), are kept as they are.
+
+    Args:
+        thread: Messages of one conversation, oldest first
+        min_coverage: Fraction of the quoted text that must already be present
+
+    Returns:
+        (cleaned bodies in thread order, UTF-8 bytes saved)
+    """
+    cleaned: list[str] = [m.get("content", "") or "" for m in thread]
+    seen_shingles: set[tuple[str, ...]] = set()
+    seen_words: set[str] = set()
+    seen_lines: set[tuple[str, ...]] = set()
+    saved = 0
+
+    def seen_line(words: tuple[str, ...]) -> bool:
+        # Long lines may be re-wrapped, so they are compared shingle by shingle
+        if words in seen_lines:
+            return True
+        return len(words) >= SHINGLE_SIZE and _shingles(list(words)) <= seen_shingles
+
+    for i, body in enumerate(cleaned):
+        match = _QUOTE_START.search(body) if seen_words else None
+        if match:
+            lines = list(_content_lines(body[match.start() :]))
+            words = [word for _, line_words in lines for word in line_words]
+            if len(words) >= SHINGLE_SIZE:
+                shingles = _shingles(words)
+                covered = sum(1 for s in shingles if s in seen_shingles) / len(shingles)
+            else:
+                covered = 1.0 if all(w in seen_words for w in words) else 0.0
+            # A single new unquoted line (e.g. "Agreed, go ahead." between quoted paragraphs) is a
+            # reply in its own right, however little of the block it is
+            new_text = any(not quoted and not seen_line(line_words) for quoted, line_words in lines)
+
+            if covered >= min_coverage and not new_text:
+                kept = body[: match.start()].rstrip()
+                cleaned[i] = f"{kept}\n\n{QUOTE_OMITTED_MARKER}" if kept else QUOTE_OMITTED_MARKER
+                saved += len(body.encode("utf-8")) - len(cleaned[i].encode("utf-8"))
+
+        # Later messages may quote anything in this one, including its own quoted history
+        original_lines = [line_words for _, line_words in _content_lines(body)]
+        original_words = [word for line_words in original_lines for word in line_words]
+        seen_shingles |= _shingles(original_words)
+        seen_words.update(original_words)
+        seen_lines.update(original_lines)
+
+    return cleaned, max(saved, 0)
+
+
+class FooterStripper:
+    """
+    Removes every occurrence of a configurable set of footers from a body in linear time.
+
+    Each footer is a mapping with a "start" phrase and an optional "end" phrase:
+    - start and end: the text from start through end is removed. A start with no end after it
+      (a truncated footer) is removed to the end of the body when it sits in the last
+      tail_fraction of what remains after complete footers are removed, and kept otherwise.
+    - start only: just the phrase itself is removed (one-line disclaimers, "Sent from my iPhone").
+
+    Phrases match case-insensitively, with any run of whitespace or '>' quote prefixes between
+    words (optional after punctuation, so "NOTICE:Unless" matches "NOTICE: Unless"), so footers
+    repeated in quoted history are removed as well. Each phrase is a plain
+    literal pattern (found with the regex engine's fast prefix search) and the matches of all
+    phrases are merged in document order, so a body is processed in linear time. The previous
+    lazy DOTALL regex rescanned the rest of the body for every footer start without an end.
+    """
+
+    def __init__(self, footers: Iterable[Mapping[str, Optional[str]]], tail_fraction: float = 0.3) -> None:
+        self.footers = [(f["start"], f.get("end") or None) for f in footers if f.get("start")]
+        self.tail_fraction = tail_fraction
+
+        # (pattern, is_start, footer index)
+        self._phrases: list[tuple[re.Pattern, bool, int]] = []
+        for i, (start, end) in enumerate(self.footers):
+            self._phrases.append((_phrase_pattern(start), True, i))
+            if end:
+                self._phrases.append((_phrase_pattern(end), False, i))
+
+    def _matches(self, text: str) -> Iterator[tuple[int, int, bool, int]]:
+        """(start, end, is_start, footer index) of every phrase occurrence, in document order."""
+        return heapq.merge(*(_scan(pattern, text, is_start, i) for pattern, is_start, i in self._phrases))
+
+    def strip(self, text: str) -> str:
+        """Returns text with all footer occurrences removed."""
+        if not text or not self._phrases:
+            return text
+
+        # Spans to remove. Each footer tracks its own pending start, so a truncated footer does not
+        # stop a different footer after it from closing; a repeated start of the same footer means
+        # the earlier one was truncated, so only the latest can close.
+        spans: list[tuple[int, int]] = []
+        pending: dict[int, int] = {}
+        for start, end, is_start, index in self._matches(text):
+            if is_start and self.footers[index][1] is None:
+                spans.append((start, end))
+            elif is_start:
+                pending[index] = start
+            elif index in pending:
+                spans.append((pending.pop(index), end))
+        spans.sort()
+
+        kept: list[tuple[int, int]] = []  # (start, end) of the text that is kept
+        kept_from = 0
+        for start, end in spans:
+            if start < kept_from:
+                continue  # Overlaps text that was already removed
+            kept.append((kept_from, start))
+            kept_from = end
+        kept.append((kept_from, len(text)))
+
+        # A start that never closed is cut to the end when it sits in the tail of what is left once
+        # complete footers are gone; the earliest such start wins
+        truncated = sorted(pos for pos in pending.values() if any(a <= pos < b for a, b in kept))
+        if truncated:
+            kept_total = sum(b - a for a, b in kept)
+            for pos in truncated:
+                kept_before = sum(min(b, pos) - a for a, b in kept if a < pos)
+                if kept_before > kept_total * (1 - self.tail_fraction):
+                    return "".join(text[a : min(b, pos)] for a, b in kept if a < pos).rstrip()
+
+        return "".join(text[a:b] for a, b in kept)
+
+
+def _scan(pattern: re.Pattern, text: str, is_start: bool, index: int) -> Iterator[tuple[int, int, bool, int]]:
+    for m in pattern.finditer(text):
+        yield m.start(), m.end(), is_start, index
+
+
+def _phrase_pattern(phrase: str) -> re.Pattern:
+    words = phrase.split()
+    pattern = re.escape(words[0])
+    for previous, word in zip(words, words[1:]):
+        pattern += (r"[\s>]+" if previous[-1].isalnum() else r"[\s>]*") + re.escape(word)
+    return re.compile(pattern, re.IGNORECASE)
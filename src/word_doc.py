@@ -2,65 +2,38 @@
 Word Document Generator for Email Thread Summaries
 """
 
-import re
 from datetime import datetime
 
 from docx import Document
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.shared import Pt
 
-# Gen II footer text to exclude from LLM processing
-GEN_II_FOOTER_START = "NOTICE: Unless otherwise stated, the content of this e-mail"
-GEN_II_FOOTER_END = "which can be found here."
+from config import EMAIL_FOOTERS
+from text_cleanup import FooterStripper, strip_quoted_history
 
+_FOOTER_STRIPPER = FooterStripper(EMAIL_FOOTERS)
 
-def strip_gen_ii_footer(content):
+
+def format_thread_content(thread, strip_quotes=True):
     """
-    Removes the Gen II legal footer from email content to save tokens.
+    Formats a thread (list of messages) into a readable string for LLM processing.
 
     Args:
-        content: Email content string
+        thread: List of message dictionaries
+        strip_quotes: Drop quoted history that repeats earlier messages of the thread
 
     Returns:
-        Content with footer removed if found, original content otherwise
+        Formatted string containing the thread content
     """
-    if not content:
-        return content
-
-    # Look for the footer start marker
-    # Use case-insensitive search and handle variations in whitespace
-    footer_pattern = re.compile(
-        r"NOTICE:\s*Unless otherwise stated.*?which can be found here\.", re.IGNORECASE | re.DOTALL
-    )
-
-    # Try to find and remove the footer
-    cleaned = footer_pattern.sub("", content)
-
-    # Also try a more flexible approach - look for just the start phrase
-    # and remove everything from there to the end if it's near the end of the content
-    start_marker = re.compile(r"NOTICE:\s*Unless otherwise stated", re.IGNORECASE)
-    match = start_marker.search(cleaned)
-
-    if match:
-        # If the marker appears in the last 30% of the content, it's likely a footer
-        marker_pos = match.start()
-        content_length = len(cleaned)
-        if marker_pos > content_length * 0.7:
-            # Remove everything from the marker to the end
-            cleaned = cleaned[:marker_pos].rstrip()
+    return format_thread_content_with_stats(thread, strip_quotes=strip_quotes)[0]
 
-    return cleaned
 
-
-def format_thread_content(thread):
+def format_thread_content_with_stats(thread, strip_quotes=True):
     """
-    Formats a thread (list of messages) into a readable string for LLM processing.
-
-    Args:
-        thread: List of message dictionaries
+    Same as format_thread_content, but also returns the number of bytes of quoted history removed.
 
     Returns:
-        Formatted string containing the thread content
+        Tuple of (formatted string, bytes saved)
     """
     formatted_lines = []
 
@@ -83,7 +56,12 @@ def format_thread_content(thread):
 
     sorted_thread = sorted(thread, key=normalize_timestamp)
 
-    for i, msg in enumerate(sorted_thread, 1):
+    if strip_quotes:
+        bodies, saved = strip_quoted_history(sorted_thread)
+    else:
+        bodies, saved = [msg.get("content", "") for msg in sorted_thread], 0
+
+    for i, (msg, body) in enumerate(zip(sorted_thread, bodies), 1):
         formatted_lines.append(f"\n--- Message {i} ---")
         formatted_lines.append(f"From: {msg.get('from', 'Unknown')}")
         formatted_lines.append(f"Date: {msg.get('date', 'Unknown')}")
@@ -91,12 +69,12 @@ def format_thread_content(thread):
         if msg.get("flag_status"):
             formatted_lines.append(f"Flag Status: {msg.get('flag_status')}")
         formatted_lines.append("\nContent:")
-        # Strip Gen II footer before adding content to save tokens
-        content = strip_gen_ii_footer(msg.get("content", ""))
+        # Strip legal footers and signatures before adding content to save tokens
+        content = _FOOTER_STRIPPER.strip(body)
         formatted_lines.append(content)
         formatted_lines.append("\n" + "=" * 80)
 
-    return "\n".join(formatted_lines)
+    return "\n".join(formatted_lines), saved
 
 
 def create_summary_document(threads_with_summaries, output_path):
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark for footer removal on 1 MB message bodies.
+
+Compares FooterStripper with the previous strip_gen_ii_footer (a lazy DOTALL regex per body,
+reproduced below) on two shapes of body:
+- quoted: a long reply chain where the legal footer repeats after every quoted message
+- truncated: many footer starts without an end phrase (clipped footers), where every start makes
+  the lazy regex scan the rest of the body
+
+Usage:
+    python tests/benchmarks/bench_footer_strip.py [--mb 1] [--bodies 5]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+# Adjust path to import src modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+
+from config import EMAIL_FOOTERS  # noqa: E402
+from text_cleanup import FooterStripper  # noqa: E402
+
+FOOTER = (
+    "NOTICE: Unless otherwise stated, the content of this e-mail is confidential and intended for the "
+    "addressee only. Please review our privacy notice, which can be found here."
+)
+TRUNCATED = "NOTICE: Unless otherwise stated, the content of this e-mail"
+PARAGRAPH = "Thanks for the update. The capital call figures look right to us, see the comments below.\n"
+
+
+def legacy_strip_gen_ii_footer(content):
+    footer_pattern = re.compile(
+        r"NOTICE:\s*Unless otherwise stated.*?which can be found here\.", re.IGNORECASE | re.DOTALL
+    )
+    cleaned = footer_pattern.sub("", content)
+    match = re.compile(r"NOTICE:\s*Unless otherwise stated", re.IGNORECASE).search(cleaned)
+    if match and match.start() > len(cleaned) * 0.7:
+        cleaned = cleaned[: match.start()].rstrip()
+    return cleaned
+
+
+def body(size, footer, seed=0):
+    """About `size` characters of quoted reply chain with `footer` after every message."""
+    parts = []
+    total = 0
+    i = seed
+    while total < size:
+        part = f"On Monday, Person {i} wrote:\n{PARAGRAPH * 4}{footer}\n\n"
+        parts.append(part)
+        total += len(part)
+        i += 1
+    return "".join(parts)
+
+
+def bench(name, fn, bodies):
+    start = time.perf_counter()
+    removed = sum(len(b) - len(fn(b)) for b in bodies)
+    elapsed = time.perf_counter() - start
+    mb = sum(len(b) for b in bodies) / 1e6
+    print(f"  {name:<12} {elapsed:7.3f}s  {removed / 1e6:6.2f} MB removed  {mb / elapsed:8.1f} MB/s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--mb", type=float, default=1.0, help="Size of each body in MB")
+    arg_parser.add_argument("--bodies", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    stripper = FooterStripper(EMAIL_FOOTERS)
+    size = int(args.mb * 1e6)
+
+    for label, footer in (("quoted", FOOTER), ("truncated", TRUNCATED)):
+        bodies = [body(size, footer, seed=i) for i in range(args.bodies)]
+        count = bodies[0].count("NOTICE:")
+        print(f"{label}: {args.bodies} bodies x {size / 1e6:.1f} MB ({count:,} footer starts each)")
+        if label == "quoted":
+            assert stripper.strip(bodies[0]) == legacy_strip_gen_ii_footer(bodies[0])
+
+        legacy = bench("legacy", legacy_strip_gen_ii_footer, bodies)
+        current = bench("stripper", stripper.strip, bodies)
+        print(f"  speedup: {legacy / current:.1f}x")
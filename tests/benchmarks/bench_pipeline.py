@@ -0,0 +1,169 @@
+"""
+End-to-end throughput benchmark against the synthetic mailbox (runs anywhere, no Outlook needed).
+
+Stages: export streaming, parse + thread grouping, incremental sync through the message store,
+reply-candidate filtering and batched draft creation (LLM replaced by a canned reply).
+Finally the whole follow-up run (filter, replies, drafts, summaries) is timed phase by phase and
+as a pipeline, with the canned LLM sleeping --llm-latency seconds per request and the export
+slowed to --scrape-latency seconds per thread (Outlook exports far slower than the synthetic box).
+
+Usage:
+    python tests/benchmarks/bench_pipeline.py [--messages 100000] [--per-thread 5] [--flag-every 10]
+        [--llm-latency 0.2] [--scrape-latency 0.05]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+# Adjust path to import src modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+
+import main  # noqa: E402
+import scraper  # noqa: E402
+from mail_backend import RECENT_SCRIPT, FakeMailbox  # noqa: E402
+from message_store import MessageStore  # noqa: E402
+
+
+class _CannedLLM:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate_batch_replies(self, batch, system_prompt, preferred_model=None):
+        time.sleep(self.latency)
+        return {item["id"]: "Thanks for the update.\nBest," for item in batch}
+
+    def generate_summary_and_sf_note(self, content, preferred_model=None, label=None):
+        time.sleep(self.latency)
+        return "Summary.", "1/1/26 followed up"
+
+    @property
+    def aio(self):
+        return _CannedAsyncLLM(self.latency)
+
+
+class _CannedAsyncLLM:
+    def __init__(self, latency):
+        self.latency = latency
+
+    async def generate_summary_and_sf_note(self, content, preferred_model=None, label=None):
+        await asyncio.sleep(self.latency)
+        return "Summary.", "1/1/26 followed up"
+
+    async def aclose(self):
+        pass
+
+
+def _stage(name, fn, count_label="messages"):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result, count = fn()
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else float("inf")
+    print(f"  {name:<28} {elapsed:8.2f}s  {count:>9,} {count_label:<10} {rate:>12,.0f}/s")
+    return result
+
+
+def _slow_threads(threads, latency):
+    for thread in threads:
+        time.sleep(latency)
+        yield thread
+
+
+def run(message_count, per_thread, flag_every, llm_latency, scrape_latency):
+    box = FakeMailbox(message_count=message_count, messages_per_thread=per_thread, flag_every=flag_every)
+    print(f"Synthetic mailbox: {message_count:,} messages, {box.conversation_count:,} threads")
+
+    def export():
+        chars = sum(len(chunk) for chunk in box.stream_script(RECENT_SCRIPT))
+        return chars, message_count
+
+    def parse_and_group():
+        messages = 0
+
+        def counted(it):
+            nonlocal messages
+            for m in it:
+                messages += 1
+                yield m
+
+        threads = scraper.group_into_threads(counted(scraper.iter_parse_chunks(box.stream_script(RECENT_SCRIPT))))
+        return threads, messages
+
+    chars = _stage("export (stream only)", export)
+    print(f"  {'':<28} {chars / 1e6:8.1f} MB exported")
+    _stage("parse + group (recent)", parse_and_group)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MessageStore(os.path.join(tmp, "store.db"))
+        flagged_count = sum(1 for _ in box.iter_blocks(flagged_only=True))
+        original_save = scraper.save_threads
+        scraper.save_threads = lambda threads, prefix="thread": threads
+        try:
+            _stage("flagged sync (full)", lambda: (scraper.sync_flagged_threads(store, box), flagged_count))
+            threads = _stage(
+                "flagged sync (incremental)", lambda: (scraper.sync_flagged_threads(store, box), flagged_count)
+            )
+        finally:
+            scraper.save_threads = original_save
+            store.close()
+
+    threads = threads or []
+    candidates = _stage(
+        "filter reply candidates",
+        lambda: (main.filter_threads_for_replies(threads, days_threshold=-1), len(threads)),
+        "threads",
+    )
+    _stage(
+        "batched draft creation",
+        lambda: (main.process_replies(candidates, box, "sys", _CannedLLM()), len(candidates)),
+        "drafts",
+    )
+    print(f"  Drafts recorded by the synthetic mailbox: {len(box.drafts):,}")
+
+    # Both runs see the first SAVED_THREAD_LIMIT flagged threads, as a real scrape would
+    slow_llm = _CannedLLM(llm_latency)
+    original_save_thread = scraper.save_thread
+    original_write = main._write_summary_document
+    scraper.save_thread = lambda thread, number, prefix="thread": None
+    main._write_summary_document = lambda entries: None
+    try:
+
+        def phased():
+            threads = list(_slow_threads(scraper.iter_flagged_threads(client=box), scrape_latency))
+            candidates = main.filter_threads_for_replies(threads, days_threshold=-1)
+            main.process_replies(candidates, box, "sys", slow_llm)
+            main.generate_thread_summaries([c["thread"] for c in candidates], slow_llm)
+            return None, len(threads)
+
+        def pipelined():
+            pipeline = main.run_follow_up_pipeline(
+                _slow_threads(scraper.iter_flagged_threads(client=box), scrape_latency),
+                box,
+                "sys",
+                slow_llm,
+                days_threshold=-1,
+            )
+            return None, pipeline.source_stats.items_out
+
+        _stage("follow-up (phased)", phased, "threads")
+        _stage("follow-up (pipelined)", pipelined, "threads")
+    finally:
+        scraper.save_thread = original_save_thread
+        main._write_summary_document = original_write
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--per-thread", type=int, default=5)
+    parser.add_argument("--flag-every", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per canned LLM request")
+    parser.add_argument("--scrape-latency", type=float, default=0.05, help="Seconds per exported thread")
+    args = parser.parse_args()
+    run(args.messages, args.per_thread, args.flag_every, args.llm_latency, args.scrape_latency)
@@ -0,0 +1,165 @@
+import csv
+
+from cold_outreach import detect_csv_encoding, iter_csv_leads, load_csv_leads, process_cold_outreach
+from mail_backend import FakeMailbox
+from outlook_client import AppleScriptError
+
+FIELDS = [
+    "eMail",
+    "Account Name",
+    "Authorized Signatory",
+    "Technology Solution",
+    "Opportunity Name",
+    "Opportunity ID",
+    "Pipeline Comments/Next Steps",
+    "Description",
+    "Account Description",
+]
+
+
+def write_csv(path, rows, encoding="utf-8"):
+    with open(path, "w", newline="", encoding=encoding) as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({field: row.get(field, "") for field in FIELDS})
+
+
+def test_leads_are_merged_per_email(tmp_path):
+    path = tmp_path / "leads.csv"
+    write_csv(
+        path,
+        [
+            {
+                "eMail": "Jane@Acme.com, ops@acme.com",
+                "Account Name": "Acme",
+                "Technology Solution": "Sensr Portal",
+                "Opportunity Name": "Acme Portal",
+                "Opportunity ID": "006A",
+                "Pipeline Comments/Next Steps": "Demo",
+                "Description": "short",
+            },
+            {"eMail": "", "Account Name": "No email"},
+            {
+                "eMail": "jane@acme.com",
+                "Account Name": "Acme",
+                "Technology Solution": "Sensr Analytics",
+                "Opportunity Name": "Acme Portal",
+                "Opportunity ID": "006B",
+                "Pipeline Comments/Next Steps": "Demo",
+                "Description": "a longer description",
+            },
+            {
+                "eMail": "jane@acme.com",
+                "Technology Solution": "Sensr Portal",
+                "Pipeline Comments/Next Steps": "Pricing sent",
+            },
+        ],
+    )
+
+    leads = load_csv_leads(str(path))
+
+    assert [lead["email"] for lead in leads] == ["jane@acme.com", "ops@acme.com"]
+    jane = leads[0]
+    assert jane["products"] == ["Sensr Portal", "Sensr Analytics"]
+    assert jane["opportunities"] == ["Acme Portal"]
+    assert jane["opportunity_ids"] == ["006A", "006B"]
+    assert jane["latest_interaction"] == "Demo; Pricing sent"
+    assert jane["description"] == "a longer description"
+
+
+def test_encoding_is_detected_once_from_a_sample(tmp_path, mocker):
+    path = tmp_path / "leads.csv"
+    write_csv(path, [{"eMail": "rene@cafe.fr", "Account Name": "Café “Noir”"}], encoding="cp1252")
+    assert detect_csv_encoding(str(path)) == "cp1252"
+
+    # A multi-byte character cut off by the sample boundary is still UTF-8
+    write_csv(path, [{"eMail": "rene@cafe.fr", "Account Name": "Café"}])
+    mocker.patch("cold_outreach._ENCODING_SAMPLE_BYTES", path.read_bytes().index("é".encode()) + 1)
+    assert detect_csv_encoding(str(path)) == "utf-8-sig"
+
+    opened = mocker.spy(__import__("builtins"), "open")
+    assert [lead["account_name"] for lead in iter_csv_leads(str(path))] == ["Café"]
+    assert opened.call_count == 2  # One sample read, one parse
+
+
+def test_bytes_past_the_sample_that_do_not_decode_trigger_a_re_read(tmp_path, mocker, capsys):
+    path = tmp_path / "leads.csv"
+    write_csv(
+        path,
+        [{"eMail": "ann@litware.com", "Account Name": "Litware"}, {"eMail": "rene@cafe.fr", "Account Name": "Café"}],
+        encoding="cp1252",
+    )
+    mocker.patch("cold_outreach._ENCODING_SAMPLE_BYTES", path.read_bytes().index(b"rene"))
+    assert detect_csv_encoding(str(path)) == "utf-8-sig"  # The sample is plain ASCII
+
+    assert [lead["account_name"] for lead in iter_csv_leads(str(path))] == ["Litware", "Café"]
+    out = capsys.readouterr().out
+    assert "does not decode as utf-8-sig" in out and "re-reading it as cp1252" in out
+    assert "(cp1252)" in out
+
+
+def test_process_cold_outreach_drafts_best_ranked_leads(tmp_path, mocker, capsys):
+    path = tmp_path / "leads.csv"
+    write_csv(
+        path,
+        [
+            {"eMail": "info@acme.com", "Account Name": "Acme"},
+            {"eMail": "contact0@northwind.com", "Account Name": "Northwind", "Technology Solution": "Sensr Portal"},
+            {"eMail": "jane@fabrikam.com", "Account Name": "Fabrikam"},
+            {"eMail": "bob@fabrikam.com", "Account Name": "Fabrikam"},
+            {"eMail": "ann@litware.com", "Account Name": "Litware", "Technology Solution": "Sensr Portal"},
+        ],
+    )
+    box = FakeMailbox(message_count=1, sent_recipient_count=1)  # contact0@northwind.com was emailed
+    llm_service = mocker.Mock()
+    llm_service.generate_reply.side_effect = lambda context, *args, **kwargs: None if "jane@" in context else "Hi"
+
+    process_cold_outreach(box, llm_service, "prompt", None, str(path), daily_limit=2, salesforce_bcc="")
+
+    # Failed drafts are replaced by the runner-up; the generic address ranks below personal ones
+    assert [draft["to"] for draft in box.drafts] == ["ann@litware.com", "bob@fabrikam.com"]
+    out = capsys.readouterr().out
+    assert "#1 ann@litware.com (Litware) score 5.00: product +3.00 (Sensr Portal)" in out
+    assert "Total leads in CSV: 5" in out
+
+
+def test_cold_outreach_is_skipped_when_sent_items_cannot_be_read(tmp_path, mocker, capsys):
+    path = tmp_path / "leads.csv"
+    write_csv(path, [{"eMail": "ann@litware.com", "Account Name": "Litware"}])
+    box = FakeMailbox(message_count=1)
+    mocker.patch.object(box, "get_sent_recipients", side_effect=AppleScriptError("check_sent_to.scpt: timed out"))
+    llm_service = mocker.Mock()
+
+    process_cold_outreach(box, llm_service, "prompt", None, str(path), daily_limit=2, salesforce_bcc="")
+
+    assert box.drafts == []
+    llm_service.generate_reply.assert_not_called()
+    assert "skipping cold outreach" in capsys.readouterr().out
+
+
+def test_reply_rates_use_the_refreshed_sent_index(tmp_path, mocker, capsys):
+    path = tmp_path / "leads.csv"
+    write_csv(path, [{"eMail": "ann@litware.com", "Account Name": "Litware"}])
+    sent_index = mocker.MagicMock()
+    sent_index.__contains__.return_value = False
+    counts = {}
+    sent_index.refresh.side_effect = lambda client: counts.update({"litware.com": 2}) or 2
+    sent_index.domain_counts.side_effect = lambda: counts
+    llm_service = mocker.Mock()
+    llm_service.generate_reply.return_value = "Hi"
+
+    process_cold_outreach(
+        FakeMailbox(message_count=1),
+        llm_service,
+        "prompt",
+        None,
+        str(path),
+        daily_limit=1,
+        salesforce_bcc="",
+        sent_index=sent_index,
+        scoring_weights={"reply_rate": 1.0},
+        reply_senders=["Ann <ann@litware.com>"],
+    )
+
+    assert "reply_rate +0.50 (domain reply rate 50%)" in capsys.readouterr().out
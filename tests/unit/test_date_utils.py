@@ -1,6 +1,14 @@
 from datetime import datetime
 
-from date_utils import get_latest_date, parse_date_string
+import date_utils
+from date_utils import (
+    clear_date_cache,
+    date_cache_stats,
+    extract_dates_from_text,
+    get_latest_date,
+    get_latest_note_date,
+    parse_date_string,
+)
 
 
 def test_parse_date_string_formats():
@@ -38,3 +46,62 @@ def test_get_latest_date():
 
     text_no_date = "Just some text"
     assert get_latest_date(text_no_date) is None
+
+
+def test_get_latest_note_date():
+    notes = "3/12/25 sent pricing; 2025-04-02 demo; 13/45/25 typo; follow up 03/28/2025"
+    assert get_latest_note_date(notes) == datetime(2025, 4, 2)
+    assert get_latest_note_date("Call next quarter, v1.2/3 release") is None
+
+
+def test_parse_date_string_fast_path_matches_dateutil(mocker):
+    clear_date_cache()
+    spy = mocker.spy(date_utils.parser, "parse")
+    samples = {
+        "Thursday, December 18, 2025 at 12:45:49 PM": datetime(2025, 12, 18, 12, 45, 49),
+        "Dec 18, 2025, at 12:45 AM": datetime(2025, 12, 18, 0, 45),
+        "Sept 1, 2025, 9:05 pm": datetime(2025, 9, 1, 21, 5),
+    }
+    for raw, expected in samples.items():
+        assert parse_date_string(raw) == expected
+    spy.assert_not_called()
+
+    # Anything else still goes through dateutil
+    assert parse_date_string("2025-12-18T10:00:00") == datetime(2025, 12, 18, 10)
+    spy.assert_called_once()
+
+
+def test_extract_dates_single_pass_patterns():
+    text = (
+        "Date: Thursday, December 18, 2025 at 12:45:49 PM\n"
+        "> Date: Friday, December 19, 2025 at 1:00:00 AM\n"
+        "On Dec 20, 2025, at 3:15 PM, Someone wrote:\n"
+        "Date: Monday, December 22, 2025 at 9:00:00 AM (sent from mobile)\n"
+        "Date: not a date\n"
+    )
+    assert extract_dates_from_text(text) == [
+        datetime(2025, 12, 18, 12, 45, 49),
+        datetime(2025, 12, 19, 1, 0),
+        datetime(2025, 12, 20, 15, 15),
+        datetime(2025, 12, 22, 9, 0),
+    ]
+
+
+def test_parse_date_string_memoized_per_thread(mocker):
+    clear_date_cache()
+    spy = mocker.spy(date_utils, "_parse_fast")
+    headers = [f"Date: Thursday, December {day}, 2025 at 12:45:49 PM" for day in range(1, 6)]
+    # A 50-message thread where every message quotes the same five headers
+    thread = ["\n".join(headers) for _ in range(50)]
+
+    for body in thread:
+        assert len(extract_dates_from_text(body)) == 5
+
+    assert spy.call_count == 5
+    stats = date_cache_stats()
+    assert stats["misses"] == 5
+    assert stats["hits"] == 245
+
+    # Whitespace variants normalize to the same entry
+    parse_date_string("  Thursday, December 1,  2025 at 12:45:49 PM ")
+    assert spy.call_count == 5
@@ -0,0 +1,20 @@
+import http_pool
+from ssl_utils import get_ssl_verify_option
+
+
+def test_clients_are_shared_per_verify_setting(tmp_path):
+    http_pool.close_http_clients()
+
+    # Every call builds a new non-verifying context, but they all map to one pool
+    unverified = http_pool.get_http_client(get_ssl_verify_option(disable_ssl=True))
+    assert http_pool.get_http_client(get_ssl_verify_option(disable_ssl=True)) is unverified
+
+    # A missing CA bundle falls back to default verification
+    default = http_pool.get_http_client(True)
+    assert http_pool.get_http_client(str(tmp_path / "missing.pem")) is default
+    assert default is not unverified
+
+    http_pool.close_http_clients()
+    assert default.is_closed
+    assert http_pool.get_http_client(True) is not default
+    http_pool.close_http_clients()
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+
+from lead_scoring import LeadScorer, domain_reply_rates, select_top_leads
+
+NOW = datetime(2026, 1, 1)
+
+
+def make_lead(email, products=(), latest_interaction="", opportunity_ids=()):
+    return {
+        "email": email,
+        "account_name": email.split("@")[1],
+        "products": list(products),
+        "latest_interaction": latest_interaction,
+        "opportunities": [],
+        "opportunity_ids": list(opportunity_ids),
+    }
+
+
+def test_score_breakdown_explains_each_signal():
+    scorer = LeadScorer(weights={"reply_rate": 1.0}, now=NOW, reply_rates={"acme.com": 0.75})
+    lead = make_lead("jane@acme.com", ["Other", "Sensr Analytics"], "10/3/25 demo", ["006A", "006B"])
+
+    scored = scorer.score(lead)
+
+    points = {name: p for name, p, _ in scored.contributions}
+    assert points["product"] == pytest.approx(3.0 * 0.5)
+    assert points["recency"] == pytest.approx(2.0 * 0.5)  # 90 days: one half-life
+    assert points["opportunities"] == pytest.approx(1.0 * 2 / 5)
+    assert points["domain"] == 2.0
+    assert points["reply_rate"] == 0.75
+    assert scored.score == pytest.approx(sum(points.values()))
+    assert "product +1.50 (Sensr Analytics)" in scored.explain()
+    assert "recency +1.00 (90 days ago)" in scored.explain()
+
+    assert scorer.score(make_lead("info@acme.com")).contributions[3][1:] == (0.0, "generic address")
+
+
+def test_weights_and_plugged_in_signals():
+    scorer = LeadScorer(weights={"product": 0, "recency": 0, "opportunities": 0, "domain": 0}, now=NOW)
+    scorer.add_signal("vip", lambda lead: (1.0 if lead["email"].startswith("ceo@") else 0.0, "vip"), weight=5)
+
+    assert [name for name, _, _ in scorer.signals] == ["vip"]
+    assert scorer.score(make_lead("ceo@acme.com")).score == 5.0
+
+
+def test_select_top_leads_single_pass_with_lazy_eligibility():
+    leads = [make_lead(f"user{i}@acme.com", opportunity_ids=[str(n) for n in range(i % 6)]) for i in range(60)]
+    scorer = LeadScorer(now=NOW)
+    checked = []
+
+    def eligible(lead):
+        checked.append(lead["email"])
+        return lead["email"] != "user5@acme.com"
+
+    top = select_top_leads(iter(leads), 3, scorer, eligible)
+
+    # Five opportunities is the best score; ties keep stream order and user5 is not eligible
+    assert [s.lead["email"] for s in top] == ["user11@acme.com", "user17@acme.com", "user23@acme.com"]
+    assert len(checked) < len(leads)  # Leads that can't make the top k are never checked
+    assert select_top_leads(leads, 0, scorer) == []
+
+
+def test_domain_reply_rates_are_smoothed():
+    rates = domain_reply_rates(
+        {"acme.com": 4, "quiet.com": 1},
+        ["Jane Doe <jane@acme.com>", "jane@acme.com", "Bob <bob@ACME.com>", "x@elsewhere.com", None],
+    )
+    assert rates == {"acme.com": (2 + 1) / (4 + 2), "quiet.com": 1 / 3}
+
+
+def test_reply_rate_is_opt_in():
+    scorer = LeadScorer(now=NOW, reply_rates={"acme.com": 0.75})
+    assert "reply_rate" not in [name for name, _, _ in scorer.signals]
+
+
+def test_recency_ignores_planned_follow_up_dates():
+    scorer = LeadScorer(now=NOW)
+
+    def recency(notes):
+        return scorer.score(make_lead("jane@acme.com", latest_interaction=notes)).contributions[1][2]
+
+    assert recency("10/3/25 demo; follow up 12/1/27") == "90 days ago"
+    assert recency("follow up 12/1/27") == "no dated interaction"
@@ -1,10 +1,19 @@
+import asyncio
 import json
 import os
+import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, cast
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import http_pool
 import llm
+from llm_health import HealthTracker
+from llm_retry import RateLimiter
+from model_catalog import ModelCatalog
 
 
 class TestLLMService(unittest.TestCase):
@@ -118,6 +127,77 @@ class TestLLMService(unittest.TestCase):
         # Check OpenRouter
         assert "anthropic/claude-3-haiku" in model_ids
 
+    def test_init_does_not_list_models(self):
+        """Construction is cheap: model discovery is deferred until models are needed."""
+        llm.LLMService()
+        self.mock_gemini_client.models.list.assert_not_called()
+
+    def test_preferred_model_tried_before_discovery(self):
+        """A configured preferred model is used without listing any provider."""
+        service = llm.LLMService()
+
+        with patch.object(service, "_generate_gemini", return_value="Gemini Reply"):
+            result = service.generate_reply("body", "prompt", preferred_model="gemini-flash")
+
+        assert result == "Gemini Reply"
+        self.mock_gemini_client.models.list.assert_not_called()
+
+    def test_preferred_model_failure_triggers_discovery(self):
+        """If the preferred model fails, discovered models are tried next."""
+        mock_model = MagicMock()
+        mock_model.name = "models/gemini-pro"
+        self.mock_gemini_client.models.list.return_value = [mock_model]
+        service = llm.LLMService()
+        service.openai_client = None
+        service.openrouter_client = None
+
+        with patch.object(service, "_generate_gemini", side_effect=[Exception("Fail"), "Fallback Reply"]) as mock_gen:
+            result = service.generate_reply("body", "prompt", preferred_model="gemini-flash")
+
+        assert result == "Fallback Reply"
+        assert mock_gen.call_args_list[1][0][0] == "gemini-pro"
+
+    def test_model_catalog_reused_across_instances(self):
+        """A fresh catalog avoids listing models again; refresh_models forces a new listing."""
+        mock_model = MagicMock()
+        mock_model.name = "models/gemini-pro"
+        self.mock_gemini_client.models.list.return_value = [mock_model]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            catalog = ModelCatalog(os.path.join(tmp, "catalog.json"))
+
+            first = llm.LLMService(catalog=catalog)
+            first.openai_client = None
+            first.openrouter_client = None
+            assert first.get_models_list() == ["gemini-pro"]
+            assert self.mock_gemini_client.models.list.call_count == 1
+
+            second = llm.LLMService(catalog=catalog)
+            second.openai_client = None
+            second.openrouter_client = None
+            assert second.get_models_list() == ["gemini-pro"]
+            assert self.mock_gemini_client.models.list.call_count == 1
+
+            with patch.object(second, "_init_clients"):
+                second.refresh_models()
+            assert self.mock_gemini_client.models.list.call_count == 2
+
+    def test_catalog_read_once_before_models_load(self):
+        """Requests for a preferred model found in the catalog don't re-read the catalog each time."""
+        catalog = MagicMock()
+        catalog.get.side_effect = lambda provider, *args, **kwargs: (
+            [{"id": "gemini-pro", "provider": "gemini", "context_window": 1000}] if provider == "gemini" else None
+        )
+        service = llm.LLMService(catalog=catalog)
+
+        with patch.object(service, "_generate_gemini", return_value="Gemini Reply"):
+            for _ in range(3):
+                assert service.generate_reply("body", "prompt", preferred_model="gemini-pro") == "Gemini Reply"
+                assert service._context_window("gemini-pro") == 1000
+
+        assert service._available_models is None
+        assert catalog.get.call_count == 3  # Once per provider
+
     def test_generate_reply_preferred(self):
         """Test using a preferred model."""
         service = llm.LLMService()
@@ -146,6 +226,142 @@ class TestLLMService(unittest.TestCase):
 
             assert result == "GPT Reply"
 
+    def test_open_breaker_skips_failing_model(self):
+        """After repeated failures a model is skipped without a request and healthy models go first."""
+        service = llm.LLMService(health=HealthTracker(failure_threshold=2))
+        service.available_models = [{"id": "gemini-flash", "provider": "gemini"}, {"id": "gpt-4", "provider": "openai"}]
+
+        with (
+            patch.object(service, "_generate_gemini", side_effect=Exception("Fail")) as mock_gemini,
+            patch.object(service, "_generate_openai", return_value="GPT Reply"),
+        ):
+            for _ in range(3):
+                assert service.generate_reply("body", "prompt", preferred_model="gemini-flash") == "GPT Reply"
+
+        assert mock_gemini.call_count == 2
+        assert [m["id"] for m in service._reorder_models(None)] == ["gpt-4"]
+
+    def test_model_errors_do_not_open_the_provider_breaker(self):
+        """Unknown model IDs and oversized prompts only count against the model, not its provider."""
+        service = llm.LLMService(health=HealthTracker(failure_threshold=5, provider_failure_threshold=2))
+        service.available_models = [{"id": f"org/model-{i}", "provider": "openrouter"} for i in range(4)]
+        not_found = Exception("model not found")
+        setattr(not_found, "status_code", 404)
+        too_large = Exception("prompt is too long for this model's context length")
+
+        with patch.object(service, "_generate_openrouter", side_effect=[not_found, too_large, too_large, "Reply"]):
+            assert service.generate_reply("body", "prompt") == "Reply"
+
+        assert service.health.summary()["providers"]["openrouter"] == "closed"
+
+    def test_filtered_models_do_not_spend_a_probe(self):
+        """A half-open model skipped by the caller's own filter keeps its probe for a real request."""
+        clock = [0.0]
+        service = llm.LLMService(health=HealthTracker(failure_threshold=1, reset_timeout=30, clock=lambda: clock[0]))
+        service.available_models = [{"id": "gpt-4", "provider": "openai"}, {"id": "gemini-flash", "provider": "gemini"}]
+        service.health.record("openai", "gpt-4", False, 1.0, provider_fault=False)
+        clock[0] = 30
+
+        usable = [m["id"] for m in service._reorder_models(None, lambda m: m["provider"] == "gemini")]
+
+        assert usable == ["gemini-flash"]
+        assert service.health.allow("openai", "gpt-4")
+        assert service.health.skipped == 0
+
+    def test_rate_limited_call_retried_on_same_model(self):
+        """A 429 is retried on the same model instead of falling over to the next one."""
+        error = Exception("rate limited")
+        setattr(error, "status_code", 429)
+        service = llm.LLMService(rate_limiter=RateLimiter(sleep=lambda seconds: None))
+        service.available_models = [{"id": "gemini-flash", "provider": "gemini"}, {"id": "gpt-4", "provider": "openai"}]
+
+        with (
+            patch.object(service, "_generate_gemini", side_effect=[error, "Gemini Reply"]),
+            patch.object(service, "_generate_openai") as mock_openai,
+        ):
+            assert service.generate_reply("body", "prompt", preferred_model="gemini-flash") == "Gemini Reply"
+
+        mock_openai.assert_not_called()
+        assert service.rate_limiter.retries == 1
+
+    def test_call_model_uses_cache(self):
+        """Identical prompts are served from the response cache on the second call."""
+        cache = MagicMock()
+        cache.get.side_effect = [None, "Cached Reply"]
+        service = llm.LLMService(cache=cache)
+        service.available_models = [{"id": "gemini-flash", "provider": "gemini"}]
+
+        with patch.object(service, "_generate_gemini", return_value="Gemini Reply") as mock_gen:
+            first = service.generate_reply("body", "prompt")
+            second = service.generate_reply("body", "prompt")
+
+        assert first == "Gemini Reply"
+        assert second == "Cached Reply"
+        mock_gen.assert_called_once()
+        cache.set.assert_called_once()
+
+    def test_batch_invalid_json_not_cached(self):
+        """A batch response that fails to parse is not written to the cache."""
+        cache = MagicMock()
+        cache.get.return_value = None
+        service = llm.LLMService(cache=cache)
+        service.available_models = [{"id": "gemini-flash", "provider": "gemini"}]
+
+        with patch.object(service, "_generate_gemini", return_value="not json"):
+            results = service.generate_batch_replies([{"id": "1", "subject": "S", "content": "C"}], "sys")
+
+        assert results == {}
+        cache.set.assert_not_called()
+
+    def test_call_model_records_metrics(self):
+        """Live calls, cache hits and failures each produce a metrics record."""
+        cache = MagicMock()
+        cache.get.side_effect = [None, "Cached Reply", None]
+        metrics = MagicMock()
+        service = llm.LLMService(cache=cache, metrics=metrics)
+        service.available_models = [{"id": "gemini-flash", "provider": "gemini"}]
+
+        with patch.object(service, "_generate_gemini", side_effect=["Gemini Reply", RuntimeError("boom")]):
+            service.generate_reply("body", "prompt", label="Subject A")
+            service.generate_reply("body", "prompt")
+            service.generate_reply("other", "prompt")
+
+        calls = metrics.record.call_args_list
+        assert len(calls) == 3
+        assert calls[0].args[:3] == ("reply", "gemini", "gemini-flash")
+        assert calls[0].args[6] is True
+        assert calls[0].kwargs["label"] == "Subject A"
+        assert calls[1].kwargs["cached"] is True
+        assert calls[2].args[6] is False
+        assert calls[2].kwargs["error"] == "boom"
+
+    def test_summary_and_sf_note_combined(self):
+        """One JSON request returns both fields; the SF Note gets its date prefix."""
+        service = llm.LLMService()
+        service.available_models = [{"id": "gemini-flash", "provider": "gemini"}]
+        response = json.dumps({"summary": "Fund II update.", "sf_note": "pushing for figures"})
+
+        with patch.object(service, "_generate_gemini", return_value=response) as mock_gen:
+            summary, sf_note = service.generate_summary_and_sf_note("thread")
+
+        assert summary == "Fund II update."
+        assert sf_note == f"{llm._sf_note_date()} pushing for figures"
+        mock_gen.assert_called_once()
+        assert mock_gen.call_args.kwargs["json_mode"] is True
+
+    def test_summary_and_sf_note_falls_back_to_separate_calls(self):
+        """A model that can't answer in the combined format is asked for the missing fields separately."""
+        service = llm.LLMService()
+        service.available_models = [{"id": "gemini-flash", "provider": "gemini"}]
+        replies = [json.dumps({"summary": "Fund II update."}), "reached out again"]
+
+        with patch.object(service, "_generate_gemini", side_effect=replies) as mock_gen:
+            summary, sf_note = service.generate_summary_and_sf_note("thread")
+
+        assert summary == "Fund II update."
+        assert sf_note == f"{llm._sf_note_date()} reached out again"
+        assert mock_gen.call_count == 2
+
     def test_extract_json(self):
         """Test JSON extraction helper."""
         text = '```json\n{"key": "value"}\n```'
@@ -173,6 +389,127 @@ class TestLLMService(unittest.TestCase):
 
         assert results["1"] == "Batch Reply"
 
+    @staticmethod
+    def _echo_batch(max_items=None):
+        """Fake _generate_gemini that answers every email in the prompt (or fails above max_items)."""
+
+        def _generate(model_id, prompt, json_mode=False):
+            items = json.loads(prompt[prompt.index("INPUT DATA:\n") + len("INPUT DATA:\n") :])
+            if max_items is not None and len(items) > max_items:
+                raise Exception("context length exceeded")
+            return json.dumps([{"id": item["id"], "reply_text": f"Reply {item['id']}"} for item in items])
+
+        return _generate
+
+    def test_generate_batch_replies_chunked(self):
+        """Large batches are split into token-budgeted sub-batches and merged back."""
+        service = llm.LLMService()
+        service.available_models = [{"id": "gemini-flash", "provider": "gemini", "context_window": 8000}]
+        email_batch = [{"id": str(i), "subject": "S", "content": "x" * 4000} for i in range(12)]
+
+        with patch.object(service, "_generate_gemini", side_effect=self._echo_batch()) as mock_gen:
+            results = service.generate_batch_replies(email_batch, "sys prompt", preferred_model="gemini-flash")
+
+        assert results == {str(i): f"Reply {i}" for i in range(12)}
+        assert mock_gen.call_count > 1
+
+    def test_generate_batch_replies_shrinks_failed_chunks(self):
+        """A sub-batch that fails is retried in smaller pieces until it succeeds."""
+        service = llm.LLMService()
+        service.available_models = [{"id": "gemini-flash", "provider": "gemini"}]
+        email_batch = [{"id": str(i), "subject": "S", "content": "Hi"} for i in range(5)]
+
+        with patch.object(service, "_generate_gemini", side_effect=self._echo_batch(max_items=2)):
+            results = service.generate_batch_replies(email_batch, "sys prompt")
+
+        assert results == {str(i): f"Reply {i}" for i in range(5)}
+
+    def test_generate_batch_replies_gives_up_when_every_model_fails(self):
+        """Failures that are not about size (auth, outage) are not retried in ever smaller pieces."""
+        service = llm.LLMService(rate_limiter=RateLimiter(max_retries=0))
+        service.available_models = [{"id": "gemini-flash", "provider": "gemini"}]
+        email_batch = [{"id": str(i), "subject": "S", "content": "Hi"} for i in range(8)]
+
+        with patch.object(service, "_generate_gemini", side_effect=Exception("API key not valid")) as mock_gen:
+            results = service.generate_batch_replies(email_batch, "sys prompt")
+
+        assert results == {}
+        assert mock_gen.call_count == 1
+
+    def test_live_requests_share_one_concurrency_bound(self):
+        """Calls from separate threads (e.g. two pipeline stages) never exceed max_concurrency in flight."""
+        service = llm.LLMService(max_concurrency=2)
+        service.available_models = [{"id": "gemini-flash", "provider": "gemini"}]
+        lock = threading.Lock()
+        in_flight = peak = 0
+
+        def generate(model_id, prompt, json_mode=False):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+            return "Reply"
+
+        with patch.object(service, "_generate_gemini", side_effect=generate):
+            with ThreadPoolExecutor(max_workers=6) as pool:
+                replies = list(pool.map(lambda i: service.generate_reply(f"body {i}", "sys"), range(6)))
+
+        assert replies == ["Reply"] * 6
+        assert peak == 2
+
+    def test_async_batch_replies_share_fallback_logic(self):
+        """service.aio runs sub-batches concurrently with the same splitting and shrinking as the sync path."""
+        service = llm.LLMService()
+        service.available_models = [{"id": "gemini-flash", "provider": "gemini"}]
+        email_batch = [{"id": str(i), "subject": "S", "content": "Hi"} for i in range(5)]
+        echo = self._echo_batch(max_items=2)
+
+        async def generate(model_id, prompt, json_mode=False):
+            return echo(model_id, prompt, json_mode)
+
+        with patch.object(service.aio, "_generate_gemini", side_effect=generate):
+            results = asyncio.run(service.aio.generate_batch_replies(email_batch, "sys prompt"))
+
+        assert results == {str(i): f"Reply {i}" for i in range(5)}
+
+    def test_async_reply_falls_back_and_records_health(self):
+        """A failing model falls through to the next one, and both outcomes feed the shared health tracker."""
+        service = llm.LLMService(rate_limiter=RateLimiter(max_retries=0))
+        service.available_models = [
+            {"id": "gpt-4o", "provider": "openai"},
+            {"id": "gemini-flash", "provider": "gemini"},
+        ]
+        failing = AsyncMock(side_effect=Exception("boom"))
+        with (
+            patch.object(service.aio, "_generate_openai", failing),
+            patch.object(service.aio, "_generate_gemini", AsyncMock(return_value="Async reply")),
+        ):
+            reply = asyncio.run(service.aio.generate_reply("body", "sys", preferred_model="gpt-4o"))
+
+        assert reply == "Async reply"
+        failing.assert_awaited_once()
+        assert service.health.score("openai", "gpt-4o") < service.health.score("gemini", "gemini-flash")
+
+    def test_async_aclose_releases_the_loops_clients(self):
+        service = llm.LLMService()
+
+        async def use_and_close():
+            pooled = http_pool.get_async_http_client()
+            service.aio._client("openai")
+            await service.aio.aclose()
+            return pooled
+
+        assert asyncio.run(use_and_close()).is_closed
+        assert not service.aio._clients
+
+    def test_chunk_batch_respects_item_cap(self):
+        items = [{"id": str(i), "subject": "S", "content": "Hi"} for i in range(7)]
+        chunks = llm._chunk_batch(items, budget_tokens=100_000, max_items=3)
+        assert [len(c) for c in chunks] == [3, 3, 1]
+
     def test_connections(self):
         """Test static connection methods."""
         # These are static methods that create their own clients.
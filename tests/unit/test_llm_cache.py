@@ -0,0 +1,57 @@
+from llm_cache import ResponseCache
+
+
+def test_make_key_depends_on_provider_model_and_prompt():
+    key = ResponseCache.make_key("gemini", "gemini-flash", "prompt")
+    assert key == ResponseCache.make_key("gemini", "gemini-flash", "prompt")
+    assert key != ResponseCache.make_key("openai", "gemini-flash", "prompt")
+    assert key != ResponseCache.make_key("gemini", "gemini-pro", "prompt")
+    assert key != ResponseCache.make_key("gemini", "gemini-flash", "prompt ")
+    assert key != ResponseCache.make_key("gemini", "gemini-flash", "prompt", json_mode=True)
+
+
+def test_get_set_and_counters(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    key = ResponseCache.make_key("gemini", "m", "p")
+
+    assert cache.get(key) is None
+    cache.set(key, "reply")
+    assert cache.get(key) == "reply"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(path).set("k", "v")
+    assert ResponseCache(path).get("k") == "v"
+
+
+def test_ttl_expiry(tmp_path, mocker):
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl_seconds=60)
+    mock_time = mocker.patch("llm_cache.time.time", return_value=1000.0)
+    cache.set("k", "v")
+
+    mock_time.return_value = 1061.0
+    assert cache.get("k") is None
+
+
+def test_lru_eviction_respects_size_cap(tmp_path, mocker):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_bytes=10)
+    mock_time = mocker.patch("llm_cache.time.time", return_value=1.0)
+    cache.set("a", "aaaa")
+    mock_time.return_value = 2.0
+    cache.set("b", "bbbb")
+    mock_time.return_value = 3.0
+    assert cache.get("a") == "aaaa"  # 'a' is now more recently used than 'b'
+
+    mock_time.return_value = 4.0
+    cache.set("c", "cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.evictions == 1
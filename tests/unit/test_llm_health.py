@@ -0,0 +1,76 @@
+from llm_health import UNTRIED_SCORE, CircuitBreaker, HealthTracker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_probes_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 30
+    assert breaker.allow()  # one probe
+    assert not breaker.allow()
+    breaker.record_failure()  # failed probe re-opens
+    assert breaker.state == "open"
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_provider_breaker_skips_all_models_of_a_dead_provider():
+    health = HealthTracker(failure_threshold=5, provider_failure_threshold=2, clock=FakeClock())
+    health.record("openai", "gpt-a", False, 1.0)
+    health.record("openai", "gpt-b", False, 1.0)
+
+    assert not health.allow("openai", "gpt-c")
+    assert health.allow("gemini", "gemini-flash")
+    assert health.skipped == 1
+
+
+def test_rank_prefers_healthy_fast_models():
+    health = HealthTracker(clock=FakeClock())
+    models = [{"id": m, "provider": "gemini"} for m in ("failing", "untried", "slow", "fast")]
+    health.record("gemini", "failing", False, 1.0)
+    health.record("gemini", "slow", True, 30.0)
+    health.record("gemini", "fast", True, 1.0)
+
+    assert [m["id"] for m in health.rank(models)] == ["fast", "untried", "slow", "failing"]
+    assert health.score("gemini", "untried") == UNTRIED_SCORE
+
+
+def test_model_faults_do_not_open_the_provider_breaker():
+    health = HealthTracker(failure_threshold=5, provider_failure_threshold=2, clock=FakeClock())
+    for model_id in ("bad-a", "bad-b", "bad-c"):
+        health.record("openrouter", model_id, False, 1.0, provider_fault=False)
+
+    assert health.allow("openrouter", "good")
+
+
+def test_probes_are_only_spent_when_both_breakers_let_the_request_through():
+    clock = FakeClock()
+    health = HealthTracker(failure_threshold=1, provider_failure_threshold=1, reset_timeout=30, clock=clock)
+    health.record("openai", "gpt-a", False, 1.0)  # opens gpt-a and openai
+    clock.now = 30
+
+    # The provider's probe is handed back when the model's own breaker rejects...
+    health.record("openai", "gpt-b", False, 1.0, provider_fault=False)
+    assert not health.allow("openai", "gpt-b")
+    # ...so the next model can use it
+    assert health.allow("openai", "gpt-c")
+    # gpt-a's probe was not spent while the provider had none left
+    assert not health.allow("openai", "gpt-a")
+    health.record("openai", "gpt-c", True, 1.0)
+    assert health.allow("openai", "gpt-a")
@@ -0,0 +1,46 @@
+import json
+
+from llm_metrics import CharRatioEstimator, MetricsRecorder, get_token_estimator
+
+
+def test_char_ratio_estimator():
+    est = CharRatioEstimator()
+    assert est.count("") == 0
+    assert est.count("a" * 400) == 101
+
+
+def test_get_token_estimator_falls_back_to_chars(mocker):
+    mocker.patch("llm_metrics.tiktoken", None)
+    assert isinstance(get_token_estimator("tiktoken"), CharRatioEstimator)
+    assert isinstance(get_token_estimator("auto"), CharRatioEstimator)
+
+
+def test_record_appends_jsonl(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    recorder = MetricsRecorder(str(path), estimator=CharRatioEstimator())
+
+    recorder.record("summary", "gemini", "gemini-flash", "p" * 40, "out", 1.23456, True, label="Subject")
+    recorder.record("reply", "openai", "gpt-4o", "p", None, 0.5, False, error="boom")
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == 2
+    assert lines[0]["prompt_tokens"] == 11
+    assert lines[0]["latency_s"] == 1.235
+    assert lines[0]["label"] == "Subject"
+    assert lines[1]["success"] is False
+    assert lines[1]["error"] == "boom"
+
+
+def test_summary_excludes_cached_tokens():
+    recorder = MetricsRecorder(None, estimator=CharRatioEstimator())
+    recorder.record("batch", "gemini", "m", "x" * 400, "y", 2.0, True)
+    recorder.record("batch", "gemini", "m", "x" * 400, "y", 0.0, True, cached=True)
+    recorder.record("summary", "gemini", "m", "x" * 40, "y", 1.0, True)
+
+    stats = recorder.summary()
+
+    assert stats["calls"] == 3
+    assert stats["cached"] == 1
+    assert stats["prompt_tokens"] == 101 + 11
+    assert stats["by_kind"]["batch"]["calls"] == 2
+    assert stats["largest"][0]["prompt_tokens"] == 101
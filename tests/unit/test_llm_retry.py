@@ -0,0 +1,106 @@
+import asyncio
+import random
+
+import pytest
+
+from llm_retry import RateLimiter, TokenBucket, is_retryable, retry_after_seconds
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = FakeResponse(headers or {})
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_retry_after_headers():
+    assert retry_after_seconds(FakeAPIError(429, {"retry-after": "7"})) == 7
+    assert retry_after_seconds(FakeAPIError(429, {"retry-after-ms": "250"})) == 0.25
+    reset = {"x-ratelimit-reset-requests": "1s", "x-ratelimit-reset-tokens": "6m0s"}
+    assert retry_after_seconds(FakeAPIError(429, reset)) == 360
+    assert retry_after_seconds(FakeAPIError(500)) is None
+
+    assert is_retryable(FakeAPIError(503)) and is_retryable(ConnectionError())
+    assert not is_retryable(FakeAPIError(401)) and not is_retryable(ValueError())
+
+
+def test_retries_honour_retry_after_then_succeed():
+    fake = FakeTime()
+    limiter = RateLimiter(clock=fake.clock, sleep=fake.sleep)
+    outcomes = [FakeAPIError(429, {"retry-after": "2"}), FakeAPIError(503), "ok"]
+
+    def call():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert limiter.call("openai", call) == "ok"
+    assert limiter.retries == 2
+    assert 2 <= fake.sleeps[0] <= 2.3
+    assert fake.sleeps[1] <= limiter.base_delay * 2
+
+
+def test_gives_up_on_permanent_errors_and_long_waits():
+    fake = FakeTime()
+    limiter = RateLimiter(max_delay=30, clock=fake.clock, sleep=fake.sleep)
+
+    for error in (FakeAPIError(401), FakeAPIError(429, {"retry-after": "120"})):
+        with pytest.raises(FakeAPIError):
+            limiter.call("gemini", lambda error=error: (_ for _ in ()).throw(error))
+    assert fake.sleeps == []
+
+
+def test_token_buckets_throttle_bursts():
+    fake = FakeTime()
+    limiter = RateLimiter(
+        limits={"openai": {"requests_per_minute": 60, "burst_seconds": 2}}, clock=fake.clock, sleep=fake.sleep
+    )
+
+    for _ in range(4):
+        limiter.call("openai", lambda: "ok")
+        limiter.call("gemini", lambda: "ok")  # No budget configured
+
+    assert fake.sleeps == [1.0, 1.0]
+
+    bucket = TokenBucket(rate=100, capacity=100, clock=fake.clock)
+    assert bucket.reserve(150) == 0.5
+
+
+def test_async_call_retries_without_blocking(monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter(rng=random.Random(0))
+    outcomes = [FakeAPIError(429, {"retry-after-ms": "500"}), "ok"]
+
+    async def call():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert asyncio.run(limiter.acall("openai", call)) == "ok"
+    assert limiter.retries == 1
+    assert 0.5 <= sleeps[0] <= 0.6
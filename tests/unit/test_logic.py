@@ -1,5 +1,6 @@
 from datetime import datetime
 
+import main
 from main import filter_threads_for_replies
 
 
@@ -44,3 +45,25 @@ def test_filter_threads_edge_case():
 
     # 7 <= 7 means it's still "recent" and should be ignored
     assert len(candidates) == 0
+
+
+def test_filter_threads_reuses_activity_index(tmp_path, mocker, mock_thread_list):
+    from message_store import MessageStore
+
+    store = MessageStore(str(tmp_path / "store.db"))
+    spy = mocker.spy(main, "get_latest_date")
+
+    first = filter_threads_for_replies(mock_thread_list, days_threshold=7, activity_index=store)
+    scans_first_run = spy.call_count
+    second = filter_threads_for_replies(mock_thread_list, days_threshold=7, activity_index=store)
+
+    assert scans_first_run == 2  # the two active threads
+    assert spy.call_count == scans_first_run
+    assert [c["subject"] for c in second] == [c["subject"] for c in first] == ["Active Old"]
+
+    # An edited body invalidates only that thread
+    mock_thread_list[1][0]["content"] = "Old message\nOn Dec 5, 2099, at 10:00 AM, someone wrote:"
+    third = filter_threads_for_replies(mock_thread_list, days_threshold=7, activity_index=store)
+
+    assert spy.call_count == scans_first_run + 1
+    assert third == []
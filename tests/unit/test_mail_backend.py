@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from mail_backend import FLAGGED_SCRIPT, RECENT_SCRIPT, FakeMailbox, MailBackend
+from message_store import MessageStore
+from outlook_client import OutlookClient
+from scraper import group_into_threads, iter_parse_chunks, sync_flagged_threads
+
+
+def test_backends_satisfy_protocol():
+    assert isinstance(FakeMailbox(message_count=1), MailBackend)
+    assert isinstance(OutlookClient("/scripts"), MailBackend)
+
+
+def test_fake_mailbox_streams_parseable_export():
+    box = FakeMailbox(message_count=1_000, messages_per_thread=4, flag_every=5)
+
+    chunks = list(box.stream_script(RECENT_SCRIPT, chunk_size=4096))
+    messages = list(iter_parse_chunks(chunks))
+    threads = group_into_threads(messages)
+
+    assert len(chunks) > 1
+    assert len(messages) == 1_000
+    assert len(threads) == 250
+    assert all(m["timestamp"] for m in messages)
+    assert messages[-1]["timestamp"] == box.now
+
+
+def test_fake_mailbox_flagged_export_and_incremental_sync(tmp_path, mocker):
+    mocker.patch("scraper.save_threads", side_effect=lambda threads, prefix: threads)
+    box = FakeMailbox(message_count=200, messages_per_thread=5, flag_every=4, now=datetime(2026, 1, 1, 12))
+    store = MessageStore(str(tmp_path / "store.db"))
+
+    flagged = list(iter_parse_chunks(box.stream_script(FLAGGED_SCRIPT)))
+    assert {m["flag_status"] for m in flagged} == {"Active"}
+    assert len(flagged) == 50
+
+    first = sync_flagged_threads(store, box)
+    second = sync_flagged_threads(store, box)
+
+    assert first is not None and second is not None
+    assert len(second) == len(first) == 10
+    assert second[0][0]["content"] == first[0][0]["content"]
+
+
+def test_fake_mailbox_records_drafts():
+    box = FakeMailbox(message_count=10)
+
+    statuses = box.reply_to_messages([("3", "Reply", ""), ("999", "Reply", "")])
+    box.create_draft("a@b.com", "Subject", "Body")
+
+    assert statuses == ["Success: Draft created.", "Error: Message not found with ID 999"]
+    assert [d.get("reply_to") or d.get("to") for d in box.drafts] == ["3", "a@b.com"]
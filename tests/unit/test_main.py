@@ -1,6 +1,7 @@
+import asyncio
 import unittest
 from datetime import datetime, timedelta
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import main
 
@@ -71,11 +72,11 @@ class TestMainLogic(unittest.TestCase):
         # Mock batch response
         mock_service.generate_batch_replies.return_value = {"mid1": "Generated Reply"}
 
-        with patch("main.create_draft_reply") as mock_create_draft:
+        with patch("main.create_draft_replies") as mock_create_drafts:
             main.process_replies(candidates, mock_client, "sys prompt", mock_service, preferred_model="gpt-4")
 
             mock_service.generate_batch_replies.assert_called_once()
-            mock_create_draft.assert_called_once_with(mock_client, "mid1", "Subj", "Generated Reply")
+            mock_create_drafts.assert_called_once_with(mock_client, [("mid1", "Subj", "Generated Reply")], "")
 
     def test_process_replies_no_candidates(self):
         """Test early return if no candidates."""
@@ -85,6 +86,117 @@ class TestMainLogic(unittest.TestCase):
         main.process_replies([], mock_client, "sys", mock_service, preferred_model="gpt-4")
         mock_service.generate_batch_replies.assert_not_called()
 
+    def test_generate_thread_summaries_concurrent_order(self):
+        """Summaries run concurrently on service.aio but the document keeps thread order."""
+        threads = [[{"subject": f"Thread {i}", "from": "a@client.com", "content": f"body {i}"}] for i in range(6)]
+        in_flight = 0
+        peak = 0
+
+        async def slow_summary(content, preferred_model=None, label=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            # Earlier threads finish last
+            await asyncio.sleep(0.01 * (6 - int(content.split("body ")[1][0])))
+            in_flight -= 1
+            return f"summary of {content.split('body ')[1][0]}"
+
+        mock_service = MagicMock()
+        mock_service.aio.generate_thread_summary = AsyncMock(side_effect=slow_summary)
+        mock_service.aio.generate_sf_note = AsyncMock(return_value="1/1/26 note")
+        mock_service.aio.aclose = AsyncMock()
+
+        with (
+            patch("main.create_summary_document", return_value="out.docx") as mock_doc,
+            patch("main.os.makedirs"),
+        ):
+            main.generate_thread_summaries(threads, mock_service, max_workers=3, combined=False)
+
+        items = mock_doc.call_args[0][0]
+        assert [item["subject"] for item in items] == [f"Thread {i}" for i in range(6)]
+        assert [item["summary"] for item in items] == [f"summary of {i}" for i in range(6)]
+        assert 1 < peak <= 3
+        mock_service.aio.aclose.assert_awaited_once()
+        mock_service.generate_thread_summary.assert_not_called()
+
+    def test_generate_thread_summaries_job_failure(self):
+        """A raising SF Note job does not drop the thread."""
+        mock_service = MagicMock()
+        mock_service.aio.generate_thread_summary = AsyncMock(return_value="summary")
+        mock_service.aio.generate_sf_note = AsyncMock(side_effect=RuntimeError("boom"))
+        mock_service.aio.aclose = AsyncMock()
+
+        with (
+            patch("main.create_summary_document", return_value="out.docx") as mock_doc,
+            patch("main.os.makedirs"),
+        ):
+            main.generate_thread_summaries([[{"subject": "S", "content": "c"}]], mock_service, combined=False)
+
+        items = mock_doc.call_args[0][0]
+        assert items[0]["sf_note"] == "SF Note generation failed."
+
+    def test_generate_thread_summaries_combined(self):
+        """In combined mode each thread costs one request returning both fields."""
+        mock_service = MagicMock()
+        mock_service.aio.generate_summary_and_sf_note = AsyncMock(return_value=("summary", "1/1/26 note"))
+        mock_service.aio.generate_thread_summary = AsyncMock()
+        mock_service.aio.generate_sf_note = AsyncMock()
+        mock_service.aio.aclose = AsyncMock()
+
+        with (
+            patch("main.create_summary_document", return_value="out.docx") as mock_doc,
+            patch("main.os.makedirs"),
+        ):
+            main.generate_thread_summaries([[{"subject": "S", "content": "c"}]], mock_service, combined=True)
+
+        items = mock_doc.call_args[0][0]
+        assert (items[0]["summary"], items[0]["sf_note"]) == ("summary", "1/1/26 note")
+        mock_service.aio.generate_summary_and_sf_note.assert_awaited_once()
+        mock_service.aio.generate_thread_summary.assert_not_called()
+        mock_service.aio.generate_sf_note.assert_not_called()
+
+    def test_follow_up_pipeline_drafts_and_summarizes_in_order(self):
+        """Candidates flow through generate -> draft -> summarize; stale flags only, document in thread order."""
+        old = datetime.now() - timedelta(days=30)
+        threads = [
+            [
+                {
+                    "id": f"conv-{i}",
+                    "message_id": str(i),
+                    "subject": f"Thread {i}",
+                    "from": "a@client.com",
+                    "flag_status": "Active",
+                    "timestamp": old if i != 2 else datetime.now(),
+                    "content": f"body {i}",
+                }
+            ]
+            for i in range(5)
+        ]
+        mock_client = MagicMock()
+        mock_client.reply_to_messages.side_effect = lambda items: ["Success"] * len(items)
+        mock_service = MagicMock()
+        mock_service.generate_batch_replies.side_effect = lambda jobs, *a, **k: {
+            job["id"]: f"reply {job['id']}" for job in jobs if job["id"] != "3"
+        }
+        mock_service.generate_summary_and_sf_note.side_effect = lambda content, **k: (f"summary of {content}", "note")
+
+        with (
+            patch("main.create_summary_document", return_value="out.docx") as mock_doc,
+            patch("main.os.makedirs"),
+        ):
+            pipeline = main.run_follow_up_pipeline(
+                iter(threads), mock_client, "sys", mock_service, days_threshold=7, max_workers=2, combined=True
+            )
+
+        drafted = [item[0] for call in mock_client.reply_to_messages.call_args_list for item in call.args[0]]
+        assert sorted(drafted) == ["0", "1", "4"]
+        items = mock_doc.call_args[0][0]
+        assert [item["subject"] for item in items] == ["Thread 0", "Thread 1", "Thread 3", "Thread 4"]
+        stats = {s["stage"]: s for s in pipeline.summary()}
+        assert stats["scrape"]["items_out"] == 5
+        assert stats["filter"]["items_out"] == 4
+        assert stats["summarize"]["items_in"] == 4
+
     def test_wait_for_outlook_ready_success(self):
         """Test wait loop success."""
         with patch("main.get_outlook_version", return_value="16.0"):
@@ -97,8 +209,8 @@ class TestMainLogic(unittest.TestCase):
             assert main.wait_for_outlook_ready(timeout=1) is False
 
     @patch("main.wait_for_outlook_ready", return_value=True)
-    @patch("main.run_scraper")
-    @patch("main.OutlookClient")
+    @patch("main.iter_flagged_threads")
+    @patch("main.create_mail_backend")
     @patch("main.llm.LLMService")
     @patch("main.yaml.safe_load")
     @patch("builtins.open")
@@ -111,4 +223,5 @@ class TestMainLogic(unittest.TestCase):
 
         mock_client_instance = mock_client_cls.return_value
         mock_client_instance.activate_outlook.assert_called_once()
+        assert mock_scraper.call_args.kwargs["client"] is mock_client_instance
         mock_wait.assert_called_once()
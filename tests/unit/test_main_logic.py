@@ -3,24 +3,28 @@ from main import process_replies
 
 def test_process_replies_flow(mocker):
     # Mock candidates
-    candidates = [{"thread": [], "target_msg": {"message_id": "123", "content": "Body"}, "subject": "Test Subj"}]
+    candidates = [
+        {"thread": [], "target_msg": {"message_id": "123", "content": "Body"}, "subject": "Test Subj"},
+        {"thread": [], "target_msg": {"message_id": "456", "content": "Body"}, "subject": "Other"},
+    ]
 
     # Mock LLM Service
     mock_llm = mocker.Mock()
-    mock_llm.generate_batch_replies.return_value = {"123": "Generated Reply"}
+    mock_llm.generate_batch_replies.return_value = {"123": "Generated\nReply", "456": "Second"}
 
     # Mock Outlook Client
     mock_client = mocker.Mock()
-    mock_client.reply_to_message.return_value = "Draft Created"
+    mock_client.reply_to_messages.return_value = ["Success: Draft created.", "Success: Draft created."]
 
     # Run
-    process_replies(candidates, mock_client, "System Prompt", mock_llm)
+    process_replies(candidates, mock_client, "System Prompt", mock_llm, salesforce_bcc="bcc@example.com")
 
-    # Verify
+    # Verify: all drafts go to Outlook in one batched call, newlines converted to <br>
     mock_llm.generate_batch_replies.assert_called_once()
-    mock_client.reply_to_message.assert_called_once_with("123", "Generated Reply")  # wait, formatting logic
-    # The code escapes HTML and replaces newlines.
-    # If "Generated Reply" is simple, it matches.
+    mock_client.reply_to_messages.assert_called_once_with(
+        [("123", "Generated<br>Reply", "bcc@example.com"), ("456", "Second", "bcc@example.com")]
+    )
+    mock_client.reply_to_message.assert_not_called()
 
 
 def test_process_replies_no_candidates():
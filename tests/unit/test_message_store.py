@@ -0,0 +1,164 @@
+from datetime import datetime
+
+from message_store import MessageStore, thread_fingerprint
+from scraper import sync_flagged_threads
+
+
+def _raw_block(msg_id, conv_id="conv1", day=18, body="Body", omitted=False):
+    lines = [
+        f"ID: {conv_id}",
+        f"MessageID: {msg_id}",
+        "From: Sender <sender@example.com>",
+        f"Date: Thursday, December {day}, 2025 at 12:45:49 PM",
+        "Subject: Re: Project Update",
+        "FlagStatus: Active",
+    ]
+    if omitted:
+        lines.append("BodyOmitted: true")
+    else:
+        lines += ["---BODY_START---", body, "---BODY_END---"]
+    return "\n".join(lines)
+
+
+def _raw(*blocks):
+    return "\n///END_OF_MESSAGE///\n".join(blocks)
+
+
+def test_upsert_and_load_threads(tmp_path):
+    store = MessageStore(str(tmp_path / "store.db"))
+    store.upsert_message(
+        {"id": "c1", "message_id": "m1", "timestamp": datetime(2025, 12, 18), "content": "Hello", "subject": "S"}
+    )
+    store.upsert_message({"id": "c2", "message_id": "m2", "timestamp": datetime(2025, 12, 19), "content": "Hi"})
+
+    threads = store.load_threads(["c2", "c1"])
+
+    assert [t[0]["message_id"] for t in threads] == ["m2", "m1"]
+    assert threads[1][0]["content"] == "Hello"
+    assert threads[1][0]["timestamp"] == datetime(2025, 12, 18)
+    assert store.get_high_water_mark() == datetime(2025, 12, 19)
+
+
+def test_message_without_id_is_kept_but_never_a_reply_target(tmp_path):
+    store = MessageStore(str(tmp_path / "store.db"))
+    msg = {"id": "c1", "from": "Jane <jane@acme.com>", "date": "Monday", "subject": "S", "content": "No ID"}
+    store.upsert_message({**msg, "timestamp": datetime(2025, 12, 18)})
+    store.upsert_message({**msg, "message_id": "m2", "timestamp": datetime(2025, 12, 19)})
+
+    thread = store.load_threads(["c1"])[0]
+    assert [(m["message_id"], m["content"]) for m in thread] == [("", "No ID"), ("m2", "No ID")]
+    # A header-only re-export of the same message finds it again
+    assert store.refresh_headers({**msg, "flag_status": "Active", "content": ""}) is True
+
+
+def test_refresh_headers_unknown_message(tmp_path):
+    store = MessageStore(str(tmp_path / "store.db"))
+    assert store.refresh_headers({"id": "c1", "message_id": "nope", "flag_status": "Active"}) is False
+
+
+def test_sync_full_then_incremental(tmp_path, mocker):
+    mocker.patch("scraper.save_threads", side_effect=lambda threads, prefix: threads)
+    store = MessageStore(str(tmp_path / "store.db"))
+    client = mocker.Mock()
+
+    # First run: empty store, full export
+    client.stream_script.return_value = iter([_raw(_raw_block("m1", body="First body"))])
+    threads = sync_flagged_threads(store, client)
+    assert client.stream_script.call_args[0] == ("get_flagged_threads.scpt", None)
+    assert threads is not None and threads[0][0]["content"] == "First body"
+
+    # Second run: old message comes back header-only, new message with body
+    client.stream_script.return_value = iter(
+        [_raw(_raw_block("m1", omitted=True), _raw_block("m2", day=20, body="Second body"))]
+    )
+    threads = sync_flagged_threads(store, client)
+
+    args = client.stream_script.call_args[0][1]
+    assert int(args[0]) > 0
+    assert args[1:] == ["conv1"]
+    assert threads is not None
+    assert [m["content"] for m in threads[0]] == ["First body", "Second body"]
+
+
+def test_sync_falls_back_to_full_when_body_missing(tmp_path, mocker):
+    mocker.patch("scraper.save_threads", side_effect=lambda threads, prefix: threads)
+    store = MessageStore(str(tmp_path / "store.db"))
+    store.upsert_message({"id": "conv1", "message_id": "m1", "timestamp": datetime(2025, 12, 18), "content": "x"})
+    client = mocker.Mock()
+    client.stream_script.side_effect = [
+        iter([_raw(_raw_block("m9", omitted=True))]),
+        iter([_raw(_raw_block("m9", body="Recovered"))]),
+    ]
+
+    threads = sync_flagged_threads(store, client)
+
+    assert client.stream_script.call_count == 2
+    assert client.stream_script.call_args[0][1] is None
+    assert threads is not None
+    assert [m["message_id"] for m in threads[0]] == ["m9"]
+    assert threads[0][0]["content"] == "Recovered"
+
+
+def test_sync_prunes_unflagged_conversations(tmp_path, mocker):
+    mocker.patch("scraper.save_threads", side_effect=lambda threads, prefix: threads)
+    store = MessageStore(str(tmp_path / "store.db"))
+    store.upsert_message({"id": "old", "message_id": "m0", "timestamp": datetime(2025, 1, 1), "content": "x"})
+    client = mocker.Mock()
+    client.stream_script.return_value = iter([_raw(_raw_block("m1"))])
+
+    sync_flagged_threads(store, client)
+
+    assert store.conversation_ids() == ["conv1"]
+
+
+def test_sync_drops_messages_no_longer_exported_from_a_flagged_conversation(tmp_path, mocker):
+    mocker.patch("scraper.save_threads", side_effect=lambda threads, prefix: threads)
+    store = MessageStore(str(tmp_path / "store.db"))
+    client = mocker.Mock()
+    client.stream_script.return_value = iter([_raw(_raw_block("m1", body="Kept"), _raw_block("m2", day=19))])
+    sync_flagged_threads(store, client)
+
+    # m2 was deleted in Outlook; the conversation is still flagged
+    client.stream_script.return_value = iter([_raw(_raw_block("m1", omitted=True))])
+    threads = sync_flagged_threads(store, client)
+
+    assert threads is not None
+    assert [m["message_id"] for m in threads[0]] == ["m1"]
+    assert store.load_threads(["conv1"])[0][0]["content"] == "Kept"
+
+
+def test_activity_index_invalidated_by_fingerprint(tmp_path):
+    store = MessageStore(str(tmp_path / "store.db"))
+    store.upsert_message({"id": "c1", "message_id": "m1", "timestamp": datetime(2025, 12, 18), "content": "Hello"})
+    thread = store.load_threads(["c1"])[0]
+    fingerprint = thread_fingerprint(thread)
+
+    store.put_activities([("c1", fingerprint, datetime(2025, 12, 18), None)])
+
+    assert store.get_activity("c1", fingerprint) == (datetime(2025, 12, 18), None)
+    # Same messages built outside the store hash to the same fingerprint
+    assert thread_fingerprint([{**thread[0], "content_hash": None}]) == fingerprint
+    # Changed body -> different fingerprint -> miss
+    assert store.get_activity("c1", thread_fingerprint([{**thread[0], "content_hash": None, "content": "x"}])) is None
+
+    store.prune([])
+    assert store.get_activity("c1", fingerprint) is None
+
+
+def test_adds_content_hash_column_to_old_store(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "store.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE messages (message_id TEXT PRIMARY KEY, conversation_id TEXT NOT NULL, sender TEXT, "
+        "date TEXT, timestamp TEXT, subject TEXT, flag_status TEXT, content TEXT)"
+    )
+    conn.execute("INSERT INTO messages (message_id, conversation_id, content) VALUES ('m1', 'c1', 'Body')")
+    conn.commit()
+    conn.close()
+
+    threads = MessageStore(path).load_threads(["c1"])
+
+    assert threads[0][0]["content"] == "Body"
+    assert threads[0][0]["content_hash"] is None
@@ -0,0 +1,35 @@
+from model_catalog import ModelCatalog, key_fingerprint
+
+
+def test_put_and_get(tmp_path):
+    catalog = ModelCatalog(str(tmp_path / "catalog.json"))
+    models = [{"id": "gemini-pro", "provider": "gemini"}]
+    catalog.put("gemini", key_fingerprint("key"), models)
+
+    assert catalog.get("gemini", key_fingerprint("key")) == models
+    assert catalog.get("openai", key_fingerprint("key")) is None
+
+
+def test_key_change_invalidates(tmp_path):
+    catalog = ModelCatalog(str(tmp_path / "catalog.json"))
+    catalog.put("gemini", key_fingerprint("old"), [{"id": "gemini-pro", "provider": "gemini"}])
+
+    assert catalog.get("gemini", key_fingerprint("new")) is None
+
+
+def test_ttl_expiry_and_stale_read(tmp_path, mocker):
+    catalog = ModelCatalog(str(tmp_path / "catalog.json"), ttl_seconds=60)
+    mock_time = mocker.patch("model_catalog.time.time", return_value=1000.0)
+    catalog.put("gemini", "fp", [{"id": "gemini-pro", "provider": "gemini"}])
+
+    mock_time.return_value = 1061.0
+    assert catalog.get("gemini", "fp") is None
+    assert catalog.get("gemini", "fp", allow_stale=True) == [{"id": "gemini-pro", "provider": "gemini"}]
+
+
+def test_missing_or_corrupt_file(tmp_path):
+    path = tmp_path / "catalog.json"
+    assert ModelCatalog(str(path)).get("gemini", "fp") is None
+
+    path.write_text("{not json")
+    assert ModelCatalog(str(path)).get("gemini", "fp") is None
@@ -1,6 +1,11 @@
 import subprocess
+import sys
+from datetime import datetime, timedelta
 
-from outlook_client import OutlookClient, get_outlook_version
+import pytest
+
+from outlook_client import AppleScriptError, OutlookClient, get_outlook_version, parse_sent_lines
+from script_host import ScriptDeliveredError, ScriptHostError
 
 
 def test_run_script_success(mocker):
@@ -22,6 +27,73 @@ def test_run_script_failure(mocker):
     assert res is None
 
 
+def test_stream_script_yields_chunks(mocker):
+    proc = mocker.MagicMock()
+    proc.stdout.read.side_effect = ["abc", "def", ""]
+    proc.wait.return_value = 0
+    mock_popen = mocker.patch("subprocess.Popen")
+    mock_popen.return_value.__enter__.return_value = proc
+
+    client = OutlookClient("/scripts")
+    chunks = list(client.stream_script("test.scpt", ["arg"], chunk_size=3))
+
+    assert chunks == ["abc", "def"]
+    assert mock_popen.call_args[0][0] == ["osascript", "/scripts/test.scpt", "arg"]
+    assert mock_popen.call_args.kwargs["stderr"] is not subprocess.PIPE
+
+
+def test_stream_script_survives_a_chatty_stderr(mocker):
+    # Far more stderr than a pipe buffer holds, written before any stdout
+    script = "import sys; sys.stderr.write('warn ' * 100_000); sys.stdout.write('out' * 1000); sys.exit(1)"
+    popen = subprocess.Popen
+    mocker.patch("subprocess.Popen", side_effect=lambda cmd, **kwargs: popen([sys.executable, "-c", script], **kwargs))
+
+    chunks = []
+    with pytest.raises(AppleScriptError, match="test.scpt exited with status 1: warn warn"):
+        for chunk in OutlookClient("/scripts").stream_script("test.scpt", chunk_size=1024):
+            chunks.append(chunk)
+
+    assert "".join(chunks) == "out" * 1000
+
+
+def test_run_script_uses_worker(mocker):
+    mock_run = mocker.patch("subprocess.run")
+    worker = mocker.Mock(available=True)
+    worker.run.return_value = "Done"
+
+    client = OutlookClient("/scripts", worker=worker)
+    assert client._run_script("test.scpt", ["a"]) == "Done"
+
+    worker.run.assert_called_once_with("/scripts/test.scpt", ["a"], timeout=None)
+    mock_run.assert_not_called()
+
+
+def test_run_script_falls_back_when_worker_unavailable(mocker):
+    mock_run = mocker.patch("subprocess.run", return_value=mocker.Mock(stdout="Output", returncode=0))
+    worker = mocker.Mock(available=True)
+    worker.run.side_effect = ScriptHostError("dead")
+
+    client = OutlookClient("/scripts", worker=worker)
+
+    assert client._run_script("test.scpt") == "Output"
+    assert client.worker is None
+    mock_run.assert_called_once()
+
+
+def test_run_script_does_not_rerun_a_delivered_script(mocker):
+    mock_run = mocker.patch("subprocess.run")
+    worker = mocker.Mock(available=True)
+    worker.run.side_effect = ScriptDeliveredError("Script host did not answer within 1800s")
+
+    client = OutlookClient("/scripts", worker=worker)
+    statuses = client.reply_to_messages([(f"m{i}", "B", "") for i in range(50)])
+
+    assert statuses == ["Error: Script failed"] * 50
+    assert worker.run.call_args.kwargs["timeout"] == 300 + 30 * 50
+    mock_run.assert_not_called()  # No osascript re-run, which would create every draft twice
+    assert client.worker is worker
+
+
 def test_get_outlook_version(mocker):
     # Mock osascript output
     mocker.patch("subprocess.run", return_value=mocker.Mock(stdout="16.0", returncode=0))
@@ -42,6 +114,36 @@ def test_reply_to_message(mocker):
     assert "Body" in args
 
 
+def test_reply_to_messages_single_invocation(mocker):
+    mock_run = mocker.patch(
+        "subprocess.run",
+        return_value=mocker.Mock(stdout="1\tSuccess: Draft created.\n2\tError: Message not found with ID m2\n"),
+    )
+
+    client = OutlookClient("/scripts")
+    statuses = client.reply_to_messages([("m1", "Body 1", "bcc@x.com"), ("m2", "Body 2", ""), ("m3", "", "")])
+
+    mock_run.assert_called_once()
+    cmd = mock_run.call_args[0][0]
+    assert cmd[1] == "/scripts/reply_to_messages.scpt"
+    assert cmd[2:8] == ["m1", "Body 1", "bcc@x.com", "m2", "Body 2", ""]
+    assert statuses == [
+        "Success: Draft created.",
+        "Error: Message not found with ID m2",
+        "Error: No status reported by Outlook",
+    ]
+
+
+def test_reply_to_messages_chunks(mocker):
+    mock_run = mocker.patch("subprocess.run", return_value=mocker.Mock(stdout="1\tSuccess\n2\tSuccess"))
+
+    client = OutlookClient("/scripts")
+    statuses = client.reply_to_messages([(f"m{i}", "B", "") for i in range(3)], max_per_call=2)
+
+    assert mock_run.call_count == 2
+    assert statuses == ["Success", "Success", "Success"]
+
+
 def test_activate_outlook(mocker):
     """Test calling activate_outlook script."""
     mocker.patch("os.path.exists", return_value=True)
@@ -53,3 +155,22 @@ def test_activate_outlook(mocker):
     # Verify correct script name was used
     args = mock_run.call_args[0][0]
     assert "activate_outlook.scpt" in args[-1]
+
+
+def test_iter_sent_messages_parses_streamed_lines(mocker):
+    client = OutlookClient("/scripts")
+    stream = mocker.patch.object(
+        client, "stream_script", return_value=iter(["60\tA@x.com\tb@", "x.com\n", "bad\n3600"])
+    )
+
+    messages = list(client.iter_sent_messages(since_seconds=7200))
+
+    assert stream.call_args.args == ("check_sent_to.scpt", ["7200"])
+    assert [addresses for _, addresses in messages] == [["a@x.com", "b@x.com"]]
+    now = datetime(2026, 1, 1)
+    parsed = list(parse_sent_lines(["10\ta@x.com\n20\t\n"], now))
+    assert parsed == [(now - timedelta(seconds=10), ["a@x.com"])]
+
+    # A failed listing must not read as "nobody was emailed"
+    with pytest.raises(AppleScriptError, match="AppleEvent timed out"):
+        list(parse_sent_lines(["ERROR\tAppleEvent timed out."], now))
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from pipeline import Pipeline
+
+
+def test_stages_run_in_order_and_overlap():
+    """Items reach the last stage while the source is still producing."""
+    first_done = threading.Event()
+    produced_after_first = []
+
+    def source():
+        for i in range(6):
+            if first_done.is_set():
+                produced_after_first.append(i)
+            yield i
+            time.sleep(0.01)
+
+    def finish(item):
+        first_done.set()
+        return [item * 10]
+
+    pipeline = Pipeline(source(), queue_size=2).add_stage("double", lambda x: [x * 2]).add_stage("finish", finish)
+    results = pipeline.run()
+
+    assert sorted(results) == [0, 20, 40, 60, 80, 100]
+    assert produced_after_first
+    stats = {s["stage"]: s for s in pipeline.summary()}
+    assert stats["source"]["items_out"] == 6
+    assert stats["finish"]["items_in"] == 6
+
+
+def test_batching_filtering_and_errors():
+    batches = []
+
+    def batch_stage(items):
+        batches.append(list(items))
+        if 7 in items:
+            raise RuntimeError("boom")
+        return items
+
+    pipeline = (
+        Pipeline(range(10), queue_size=20)
+        .add_stage("evens", lambda x: [x] if x % 2 == 0 or x == 7 else None)
+        .add_stage("batch", batch_stage, batch_size=3, max_wait=0.05)
+    )
+    results = pipeline.run()
+
+    assert all(len(b) <= 3 for b in batches)
+    failed = next(b for b in batches if 7 in b)
+    assert sorted(results) == sorted(x for x in (0, 2, 4, 6, 8) if x not in failed)
+    assert pipeline.summary()[2]["errors"] == len(failed)
+
+
+def test_bounded_queue_limits_depth():
+    release = threading.Event()
+
+    def slow(item):
+        release.wait()
+        return [item]
+
+    pipeline = Pipeline(range(20), queue_size=3).add_stage("slow", slow)
+    runner = threading.Thread(target=pipeline.run)
+    runner.start()
+    time.sleep(0.05)
+    release.set()
+    runner.join()
+
+    assert pipeline.stages[0].stats.max_depth <= 3
+    assert pipeline.source_stats.items_out == 20
@@ -1,4 +1,4 @@
-from scraper import group_into_threads, parse_raw_data
+from scraper import group_into_threads, iter_parse_chunks, iter_threads, parse_raw_data
 
 
 def test_parse_raw_data(mock_raw_applescript_output):
@@ -22,6 +22,37 @@ def test_parse_raw_data_empty():
     assert parse_raw_data("") == []
 
 
+def test_iter_parse_chunks_split_across_chunks(mock_raw_applescript_output):
+    # Feed tiny chunks so delimiters and body markers are split between reads
+    chunks = [mock_raw_applescript_output[i : i + 7] for i in range(0, len(mock_raw_applescript_output), 7)]
+
+    msgs = list(iter_parse_chunks(chunks))
+
+    assert [m["id"] for m in msgs] == ["101", "102"]
+    assert msgs[0]["content"] == "This is the email body.\nIt has multiple lines."
+    assert msgs[1]["message_id"] == "<456@example.com>"
+
+
+def test_iter_parse_chunks_without_trailing_delimiter(mock_raw_applescript_output):
+    # AppleScript joins with the delimiter, so the final message has none after it
+    raw = mock_raw_applescript_output.rstrip().removesuffix("///END_OF_MESSAGE///").rstrip()
+
+    msgs = list(iter_parse_chunks([raw[:50], raw[50:]]))
+
+    assert len(msgs) == 2
+    assert msgs[1]["content"] == "Please reply asap."
+
+
+def test_iter_parse_chunks_is_lazy(mock_raw_applescript_output):
+    first_block = mock_raw_applescript_output.split("///END_OF_MESSAGE///")[0] + "///END_OF_MESSAGE///\n"
+
+    def chunks():
+        yield first_block
+        raise AssertionError("parser read past the first complete message")
+
+    assert next(iter_parse_chunks(chunks()))["id"] == "101"
+
+
 def test_group_into_threads():
     # Mock data: 2 messages same ID, 1 different
     msgs = [{"id": "A", "timestamp": 1}, {"id": "A", "timestamp": 2}, {"id": "B", "timestamp": 3}]
@@ -33,3 +64,18 @@ def test_group_into_threads():
     # Let's verify lengths
     lengths = sorted([len(t) for t in threads])
     assert lengths == [1, 2]  # One thread size 1, one size 2
+
+
+def test_iter_threads_yields_each_conversation_when_the_next_starts():
+    msgs = [{"id": "A"}, {"id": "A"}, {"id": "B"}, {"no_id": True}, {"id": "C"}]
+    seen = []
+
+    def source():
+        for msg in msgs:
+            seen.append(msg)
+            yield msg
+
+    threads = iter_threads(source())
+    assert [m["id"] for m in next(threads)] == ["A", "A"]
+    assert len(seen) == 3  # Thread A was complete as soon as B arrived
+    assert [[m["id"] for m in t] for t in threads] == [["B"], ["C"]]
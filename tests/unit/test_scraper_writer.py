@@ -7,7 +7,7 @@ def test_scrape_messages_success(mocker, mock_raw_applescript_output):
     # Mock OutlookClient
     mock_client_cls = mocker.patch("scraper.OutlookClient")
     mock_client = mock_client_cls.return_value
-    mock_client._run_script.return_value = mock_raw_applescript_output
+    mock_client.stream_script.return_value = iter([mock_raw_applescript_output])
 
     # Mock file writing
     m = mocker.patch("builtins.open", mocker.mock_open())
@@ -30,7 +30,15 @@ def test_scrape_messages_success(mocker, mock_raw_applescript_output):
 def test_scrape_messages_error(mocker):
     mock_client_cls = mocker.patch("scraper.OutlookClient")
     mock_client = mock_client_cls.return_value
-    mock_client._run_script.side_effect = Exception("Outlook Error")
+    mock_client.stream_script.side_effect = Exception("Outlook Error")
 
     threads = scrape_messages("test.scpt")
     assert threads is None
+
+
+def test_scrape_messages_no_output(mocker):
+    mock_client_cls = mocker.patch("scraper.OutlookClient")
+    mock_client_cls.return_value.stream_script.return_value = iter([])
+    mocker.patch("os.makedirs")
+
+    assert scrape_messages("test.scpt") is None
@@ -0,0 +1,56 @@
+import sys
+
+import pytest
+
+from script_host import ScriptDeliveredError, ScriptError, ScriptHostError, ScriptWorker, stub_command
+
+
+@pytest.fixture
+def worker():
+    w = ScriptWorker(stub_command(), timeout=30)
+    yield w
+    w.close()
+
+
+def test_worker_reuses_one_process(worker, tmp_path):
+    script = tmp_path / "reply.scpt"
+    script.write_text("")
+
+    first = worker.run(str(script), ["msg1", "Body with ünïcode\nand lines"])
+    pid = worker._proc.pid
+    second = worker.run(str(script), ["msg2"])
+
+    assert first == "reply.scpt\tmsg1\tBody with ünïcode\nand lines"
+    assert second == "reply.scpt\tmsg2"
+    assert worker._proc.pid == pid
+    assert worker.calls == 2
+
+
+def test_worker_script_error(worker, tmp_path):
+    with pytest.raises(ScriptError):
+        worker.run(str(tmp_path / "missing.scpt"))
+
+
+def test_worker_restarts_after_host_dies(worker, tmp_path):
+    script = tmp_path / "x.scpt"
+    script.write_text("")
+    worker.run(str(script))
+    worker._proc.kill()
+    worker._proc.wait()
+
+    assert worker.run(str(script), ["again"]) == "x.scpt\tagain"
+
+
+def test_worker_host_cannot_start(tmp_path):
+    worker = ScriptWorker([str(tmp_path / "no-such-host")])
+    with pytest.raises(ScriptHostError) as excinfo:
+        worker.run("/scripts/x.scpt")
+    assert not isinstance(excinfo.value, ScriptDeliveredError)  # Never delivered: safe to run elsewhere
+
+
+def test_worker_timeout_after_delivery_is_not_retryable(tmp_path):
+    # A host that reads the request and never answers, like a long-running batch
+    worker = ScriptWorker([sys.executable, "-c", "import sys; sys.stdin.readline(); sys.stdin.readline()"])
+    with pytest.raises(ScriptDeliveredError):
+        worker.run("/scripts/x.scpt", timeout=0.5)
+    assert worker._proc is None
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from mail_backend import FakeMailbox
+from outlook_client import AppleScriptError
+from sent_index import REFRESH_OVERLAP_SECONDS, SentRecipientIndex
+
+
+def test_refresh_is_incremental_and_uncapped(tmp_path, mocker):
+    now = datetime(2026, 1, 1, 12)
+    box = FakeMailbox(message_count=1, sent_recipient_count=2_500, now=now)
+    index = SentRecipientIndex(str(tmp_path / "sent.db"))
+    calls = mocker.spy(box, "iter_sent_messages")
+
+    assert index.refresh(box) == 2_500
+    assert calls.call_args.args == (None,)
+    assert index.get_high_water_mark() == now
+    assert "Contact2499@Tailspin.com" in index  # Beyond the old 1000-message cap
+
+    mocker.patch("sent_index.datetime", wraps=datetime, now=lambda: now + timedelta(hours=2))
+    assert index.refresh(box) == 0
+    assert calls.call_args.args == (2 * 3600 + REFRESH_OVERLAP_SECONDS,)
+    index.close()
+
+    # Persisted across instances
+    assert len(SentRecipientIndex(str(tmp_path / "sent.db"))) == 2_500
+
+
+def test_add_messages_keeps_latest_sent_time(tmp_path):
+    index = SentRecipientIndex(str(tmp_path / "sent.db"))
+    older, newer = datetime(2025, 1, 1), datetime(2025, 6, 1)
+
+    added = index.add_messages([(newer, ["A@x.com ", "b@x.com"]), (older, ["a@x.com", ""])])
+
+    assert added == 2
+    assert "a@x.com" in index and "B@X.COM" in index and "c@x.com" not in index
+    assert index.last_sent("a@x.com") == newer
+    assert index.get_high_water_mark() == newer
+    assert index.addresses() == {"a@x.com", "b@x.com"}
+    assert index.domain_counts() == {"x.com": 2}
+
+
+def test_failed_refresh_leaves_index_unchanged(tmp_path, mocker):
+    index = SentRecipientIndex(str(tmp_path / "sent.db"))
+    index.add_messages([(datetime(2025, 1, 1), ["a@x.com"])])
+
+    def failing_listing(since_seconds):
+        yield datetime(2025, 6, 1), ["b@x.com"]
+        raise AppleScriptError("check_sent_to.scpt: AppleEvent timed out.")
+
+    with pytest.raises(AppleScriptError):
+        index.refresh(mocker.Mock(iter_sent_messages=failing_listing))
+
+    assert index.addresses() == {"a@x.com"}
+    assert index.get_high_water_mark() == datetime(2025, 1, 1)
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from suppression import BloomFilter, SuppressionList, normalize_entry
+
+
+def test_bloom_filter_round_trip_through_mmap(tmp_path):
+    bloom = BloomFilter.for_capacity(10_000, 0.01)
+    keys = [f"user{i}@example.com" for i in range(10_000)]
+    for key in keys:
+        bloom.add(key)
+    path = str(tmp_path / "f.bloom")
+    bloom.save(path)
+
+    loaded = BloomFilter.load(path)
+    assert all(key in loaded for key in keys)
+    false_positives = sum(f"other{i}@example.com" in loaded for i in range(10_000))
+    assert false_positives < 300  # ~1% expected
+    loaded.close()
+
+    (tmp_path / "junk.bloom").write_bytes(b"nope")
+    with pytest.raises(ValueError):
+        BloomFilter.load(str(tmp_path / "junk.bloom"))
+
+
+def test_normalize_entry():
+    assert normalize_entry(' "Jane@Acme.com" ') == "jane@acme.com"
+    assert normalize_entry("Jane Doe, <jane@acme.com>, bounced") == "jane@acme.com"
+    assert normalize_entry("Jane Doe <jane@acme.com>") == "jane@acme.com"
+    assert normalize_entry('"Doe, Jane" <Jane@Acme.com>, unsubscribed') == "jane@acme.com"
+    assert normalize_entry("mailto:jane.o'neil+news@mail.acme.co.uk;") == "jane.o'neil+news@mail.acme.co.uk"
+    assert normalize_entry("@Competitor.com") == "@competitor.com"
+    assert normalize_entry("# unsubscribes") is None
+    assert normalize_entry("no address here") is None
+
+
+def test_suppression_list_syncs_only_on_change(tmp_path):
+    bounces = tmp_path / "bounces.txt"
+    bounces.write_text("# bounces\nA@x.com\nb@x.com\n@rival.com\n")
+    suppression = SuppressionList([str(bounces)], db_path=str(tmp_path / "suppression.db"))
+
+    assert "a@x.com" not in suppression  # Nothing imported yet
+    assert suppression.sync() is True
+    assert suppression.sync() is False
+    assert len(suppression) == 3
+    assert "a@X.com" in suppression and "b@x.com" in suppression
+    assert "anyone@rival.com" in suppression  # Domain entry
+    assert "c@x.com" not in suppression
+
+    bounces.write_text("c@x.com\n")
+    os.utime(bounces, ns=(1, 1))
+    assert suppression.sync() is True
+    assert "c@x.com" in suppression and "a@x.com" not in suppression
+    suppression.close()
+
+    # The filter and exact set persist across instances
+    reopened = SuppressionList([str(bounces)], db_path=str(tmp_path / "suppression.db"))
+    assert reopened.sync() is False
+    assert "c@x.com" in reopened
@@ -0,0 +1,108 @@
+from datetime import datetime
+
+from config import EMAIL_FOOTERS
+from text_cleanup import QUOTE_OMITTED_MARKER, FooterStripper, strip_quoted_history
+
+FIRST = "Hi team,\nPlease send over the Q3 capital call figures when you have a moment.\nThanks,\nAlex"
+SECOND = "Alex,\nWe are still waiting on the administrator and expect the numbers by Friday.\nBest,\nJordan"
+
+
+def _msg(content, day):
+    return {"content": content, "timestamp": datetime(2025, 12, day)}
+
+
+def _quote(text):
+    return "\n".join("> " + line for line in text.splitlines())
+
+
+def test_drops_quotes_of_earlier_messages():
+    reply = f"{SECOND}\n\nOn Dec 1, 2025, at 9:00 AM, Alex <alex@example.com>\nwrote:\n{_quote(FIRST)}"
+    outlook_style = (
+        "Thanks Jordan, Friday works.\n\n"
+        "From: Jordan <jordan@example.com>\nSent: Tuesday, December 2, 2025 10:00 AM\nTo: Alex\n"
+        f"Subject: RE: Q3\n\n{reply}"
+    )
+    thread = [_msg(FIRST, 1), _msg(reply, 2), _msg(outlook_style, 3)]
+
+    cleaned, saved = strip_quoted_history(thread)
+
+    assert cleaned[0] == FIRST
+    assert cleaned[1] == f"{SECOND}\n\n{QUOTE_OMITTED_MARKER}"
+    assert cleaned[2] == f"Thanks Jordan, Friday works.\n\n{QUOTE_OMITTED_MARKER}"
+    assert saved == sum(len(m["content"]) for m in thread) - sum(len(c) for c in cleaned)
+
+
+def test_keeps_quotes_not_in_thread_and_inline_replies():
+    older = _quote("An older message that was never exported to this thread at all.")
+    unknown = f"Sounds good.\n\nOn Nov 1, 2025, at 9:00 AM, Someone wrote:\n{older}"
+    inline = f"{_quote(FIRST)}\nHere are the figures you asked for: 1.2m called, 0.8m outstanding as of today."
+    thread = [_msg(FIRST, 1), _msg(unknown, 2), _msg(inline, 3)]
+
+    cleaned, saved = strip_quoted_history(thread)
+
+    assert cleaned == [FIRST, unknown, inline]
+    assert saved == 0
+
+
+def test_keeps_a_short_answer_inside_a_long_quoted_block():
+    paragraphs = [f"Point {n}: the administrator will confirm the figure for fund {n} this week." for n in range(40)]
+    earlier = "\n".join(paragraphs)
+    answered = "\n".join(_quote(p) for p in paragraphs[:20]) + "\nAgreed, go ahead.\n"
+    answered += "\n".join(_quote(p) for p in paragraphs[20:])
+    thread = [_msg(earlier, 1), _msg(answered, 2)]
+
+    cleaned, saved = strip_quoted_history(thread)
+
+    assert cleaned[1] == answered
+    assert saved == 0
+
+
+NOTICE = "NOTICE: Unless otherwise stated, the content of this e-mail is confidential, which can be found here."
+FOOTERS = [
+    {"start": "NOTICE: Unless otherwise stated", "end": "which can be found here."},
+    {"start": "Sent from my iPhone"},
+]
+
+
+def test_footer_stripper_removes_every_occurrence():
+    quoted_notice = "> NOTICE: Unless otherwise\n> stated, the content is confidential,\n> which can be found here."
+    quote = "On Monday, Alex wrote:\n> Any update?"
+    body = f"Figures attached.\n{NOTICE}\nSent from my iPhone\n\n{quote}\n{quoted_notice}\n> Thanks"
+
+    assert FooterStripper(FOOTERS).strip(body) == f"Figures attached.\n\n\n\n{quote}\n> \n> Thanks"
+
+
+def test_footer_stripper_truncated_footer_only_removed_near_the_end():
+    stripper = FooterStripper(FOOTERS)
+    request = "Please review the attached figures before Friday's call. " * 3
+    truncated = f"{request}\n\nnotice: unless otherwise stated"
+    mid_body = "NOTICE: Unless otherwise stated below, all figures are final. " + "More detail. " * 20
+
+    assert stripper.strip(truncated) == request.rstrip()
+    assert stripper.strip(mid_body) == mid_body
+    assert FooterStripper([]).strip(NOTICE) == NOTICE
+
+    # The tail is judged on the text left after complete footers are removed, as the old regex did
+    long_notice = NOTICE.replace("confidential", "confidential " * 60)
+    cut_short = f"Short note.\n{long_notice}\nnotice: unless otherwise stated below, {request}"
+    assert stripper.strip(cut_short) == f"Short note.\n\nnotice: unless otherwise stated below, {request}"
+
+
+def test_default_footer_matches_what_the_old_regex_matched():
+    stripper = FooterStripper(EMAIL_FOOTERS)
+    variant = "NOTICE:Unless otherwise stated, the contents of this email are private, which can be found here."
+
+    assert stripper.strip(f"Thanks!\n{variant}") == "Thanks!\n"
+
+
+def test_footer_stripper_truncated_footer_does_not_block_later_footers():
+    stripper = FooterStripper(
+        [
+            {"start": "CONFIDENTIAL NOTICE", "end": "intended recipient only."},
+            {"start": "LEGAL DISCLAIMER", "end": "end of disclaimer."},
+        ]
+    )
+    request = "Please review the attached figures before Friday's call. " * 3
+    body = f"CONFIDENTIAL NOTICE: see below.\n{request}\nLEGAL DISCLAIMER: no advice is given here, end of disclaimer."
+
+    assert stripper.strip(body) == f"CONFIDENTIAL NOTICE: see below.\n{request}\n"